@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 from os.path import exists, join
 from typing import TYPE_CHECKING
 
@@ -9,6 +10,7 @@ import git
 from git import Actor
 from ruyaml import YAML
 
+from sbem.experiment import git_utils
 from sbem.record.Author import Author
 from sbem.record.Citation import Citation
 from sbem.record.Info import Info
@@ -31,40 +33,49 @@ class Experiment(ReferenceMixin, Info):
         license: str = "Creative Commons Attribution licence (CC " "BY)",
         cite: List[Citation] = [],
         logger=logging,
+        git_mode: str = "full",
     ):
+        """
+        :param git_mode: "full" checks the whole worktree of the experiment
+            repository for uncommitted changes. "scoped" only checks the
+            experiment and sample files, commits the files written by `save`
+            and keeps per-section artefacts (tile-id-maps, meshes) out of the
+            repository while tracking their hashes.
+        """
         super().__init__(name=name, license=license, authors=authors, cite=cite)
+        assert git_mode in git_utils.GIT_MODES, f"Unknown git_mode {git_mode}."
         self._description = description
         self._root_dir = root_dir
         self._documentation = documentation
         self._samples: Dict[str, Sample] = {}
+        self._lock = threading.RLock()
         self._git_author = Actor("sbem.Experiment", "")
+        self._git_mode = git_mode
         self.logger = logger
 
         if self._root_dir is not None:
             os.makedirs(self._root_dir, exist_ok=exist_ok)
 
-        if exists(join(self._root_dir, self.get_name(), ".git")):
-            with git.Repo(join(self._root_dir, self.get_name())) as r:
-                assert not r.is_dirty(), (
-                    "[git-error]: Resolve untracked "
-                    "changes before loading the "
-                    "experiment."
-                )
+        repo_dir = join(self._root_dir, self.get_name())
+        if exists(join(repo_dir, ".git")):
+            assert not git_utils.is_dirty(repo_dir, self._git_pathspecs()), (
+                "[git-error]: Resolve untracked "
+                "changes before loading the "
+                "experiment."
+            )
 
     def add_sample(self, sample: Sample):
-        if sample.get_experiment() is None:
-            sample.set_experiment(self)
-        else:
-            assert sample.get_experiment() == self, (
-                "Sample belongs to " "another experiment."
-            )
-        self._samples[sample.get_name()] = sample
+        with self._lock:
+            if sample.get_experiment() is None:
+                sample.set_experiment(self)
+            else:
+                assert sample.get_experiment() == self, (
+                    "Sample belongs to " "another experiment."
+                )
+            self._samples[sample.get_name()] = sample
 
     def get_sample(self, name: str) -> Sample:
-        if name in self._samples.keys():
-            return self._samples[name]
-        else:
-            return None
+        return self._samples.get(name, None)
 
     def get_description(self) -> str:
         return self._description
@@ -75,6 +86,19 @@ class Experiment(ReferenceMixin, Info):
     def get_root_dir(self) -> str:
         return self._root_dir
 
+    def get_git_mode(self) -> str:
+        return self._git_mode
+
+    def _git_pathspecs(self):
+        if self._git_mode == "full":
+            return None
+        else:
+            return [
+                "experiment.yaml",
+                git_utils.ARTEFACT_MANIFEST,
+                ":(glob)*/sample.yaml",
+            ]
+
     def to_dict(self) -> Dict:
         samples = []
         for k in self._samples.keys():
@@ -91,15 +115,23 @@ class Experiment(ReferenceMixin, Info):
             "authors": [a.to_dict() for a in self._authors],
             "cite": [c.to_dict() for c in self._cite],
             "samples": samples,
+            "git_mode": self._git_mode,
         }
 
-    def _dump(self, path: str, overwrite: bool = False, section_to_subdir: bool = True):
+    def _dump(
+        self, path: str, overwrite: bool = False, section_to_subdir: bool = True
+    ) -> List[str]:
         yaml = YAML(typ="rt")
         with open(join(path, "experiment.yaml"), "w") as f:
             yaml.dump(self.to_dict(), f)
 
+        written = [join(path, "experiment.yaml")]
         for s in self._samples.values():
-            s.save(path, overwrite=overwrite, section_to_subdir=section_to_subdir)
+            written += s.save(
+                path, overwrite=overwrite, section_to_subdir=section_to_subdir
+            )
+
+        return written
 
     def _init_git(self):
         repo_dir = join(self._root_dir, self.get_name())
@@ -108,17 +140,50 @@ class Experiment(ReferenceMixin, Info):
             with repo.config_writer() as config:
                 config.set_value("core", "filemode", False)
 
+        if self._git_mode == "scoped":
+            git_utils.ignore_artefacts(repo_dir)
+
+    def commit(self, paths: List[str], message: str = None):
+        """
+        Commit `paths` to the experiment repository.
+
+        In "scoped" mode the artefact hashes of all section directories
+        containing one of `paths` are updated and committed as well.
+
+        :param paths: files to commit.
+        :param message: commit message.
+        :return: the created commit or None if nothing changed.
+        """
+        repo_dir = join(self._root_dir, self.get_name())
+        paths = list(paths)
+        if self._git_mode == "scoped":
+            section_dirs = {
+                os.path.dirname(p)
+                for p in paths
+                if os.path.basename(p) == "section.yaml"
+            }
+            paths.append(git_utils.update_artefact_manifest(repo_dir, section_dirs))
+            if exists(join(repo_dir, ".gitignore")):
+                paths.append(join(repo_dir, ".gitignore"))
+
+        if message is None:
+            message = f"Update {self.get_name()}."
+
+        return git_utils.commit_paths(
+            repo_dir, paths, message=message, author=self._git_author
+        )
+
     def save(self, overwrite: bool = False, section_to_subdir: bool = True):
         out_path = join(self._root_dir, self.get_name())
         if not exists(out_path):
             os.makedirs(out_path, exist_ok=True)
-            self._dump(
+            written = self._dump(
                 path=out_path, overwrite=overwrite, section_to_subdir=section_to_subdir
             )
             self._init_git()
         else:
             if overwrite:
-                self._dump(
+                written = self._dump(
                     path=out_path,
                     overwrite=overwrite,
                     section_to_subdir=section_to_subdir,
@@ -127,6 +192,9 @@ class Experiment(ReferenceMixin, Info):
             else:
                 raise FileExistsError()
 
+        if self._git_mode == "scoped":
+            self.commit(written, message=f"Save {self.get_name()}.")
+
     @staticmethod
     def load(path: str) -> Experiment:
         yaml = YAML(typ="rt")
@@ -148,6 +216,7 @@ class Experiment(ReferenceMixin, Info):
                 Citation(doi=d["doi"], text=d["text"], url=d["url"])
                 for d in data["cite"]
             ],
+            git_mode=data.get("git_mode", "full"),
         )
 
         for s in data["samples"]:
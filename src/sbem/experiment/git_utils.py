@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+from os.path import exists, join, relpath
+from typing import Dict, List
+
+import git
+from git import Actor
+
+GIT_MODES = ("full", "scoped")
+
+# Per-section files which are regenerated by the pipeline and can be large.
+# In "scoped" mode they are ignored by git and only their hashes are tracked.
+DEFAULT_ARTEFACTS = [
+    "tile_id_map.json",
+    "tile_id_map.npy",
+    "tile_coords.npz",
+    "meshes.npz",
+]
+
+ARTEFACT_MANIFEST = "artefact_hashes.json"
+
+# Size, mtime and hash of the hashed artefacts. Local to the worktree and
+# ignored by git.
+ARTEFACT_STAT_CACHE = ".artefact_stats.json"
+
+
+def is_dirty(repo_dir: str, pathspecs: List[str] = None) -> bool:
+    """
+    Check if tracked files of the repository have uncommitted changes.
+
+    If `pathspecs` are given only the matching paths are compared with the
+    index, which avoids a stat of every file in the worktree.
+
+    :param repo_dir: root of the git repository.
+    :param pathspecs: git pathspecs to restrict the check to.
+    :return: True if any (matching) tracked file is modified.
+    """
+    with git.Repo(repo_dir) as r:
+        if pathspecs is None:
+            return r.is_dirty()
+
+        if not r.head.is_valid():
+            # Nothing committed yet.
+            return False
+
+        return r.git.diff("HEAD", "--name-only", "--", *pathspecs) != ""
+
+
+def commit_paths(
+    repo_dir: str,
+    paths: List[str],
+    message: str,
+    author: Actor,
+    batch_size: int = 1000,
+):
+    """
+    Stage and commit only the given paths.
+
+    Paths are staged in batches of `batch_size` to stay below the command
+    line length limit. Paths which are ignored by git are skipped.
+
+    :param repo_dir: root of the git repository.
+    :param paths: absolute or repository relative file paths.
+    :param message: commit message.
+    :param author: author and committer of the commit.
+    :param batch_size: number of paths staged per `git add` call.
+    :return: the created commit or None if nothing changed.
+    """
+    rel_paths = sorted({relpath(p, repo_dir) for p in paths})
+    with git.Repo(repo_dir) as r:
+        for i in range(0, len(rel_paths), batch_size):
+            batch = rel_paths[i : i + batch_size]
+            ignored = set(r.ignored(*batch))
+            batch = [p for p in batch if p not in ignored]
+            if len(batch) > 0:
+                r.git.add("--", *batch)
+
+        if r.head.is_valid():
+            staged = r.git.diff("--cached", "--name-only")
+        else:
+            staged = r.git.ls_files("--cached")
+
+        if staged == "":
+            return None
+
+        return r.index.commit(message, author=author, committer=author)
+
+
+def ignore_artefacts(repo_dir: str, artefacts: List[str] = DEFAULT_ARTEFACTS):
+    """
+    Add the artefact file names and the artefact stat cache to the
+    .gitignore of the repository.
+
+    :param repo_dir: root of the git repository.
+    :param artefacts: file names to ignore.
+    :return: path to the .gitignore file.
+    """
+    gitignore = join(repo_dir, ".gitignore")
+    entries = []
+    if exists(gitignore):
+        with open(gitignore) as f:
+            entries = f.read().splitlines()
+
+    missing = [a for a in artefacts + [ARTEFACT_STAT_CACHE] if a not in entries]
+    if len(missing) > 0:
+        with open(gitignore, "a") as f:
+            for a in missing:
+                f.write(a + "\n")
+
+    return gitignore
+
+
+def file_hash(path: str, block_size: int = 2**20) -> str:
+    """
+    Compute the sha256 hash of a file.
+
+    :param path: to the file.
+    :param block_size: number of bytes read at once.
+    :return: hex digest
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def update_artefact_manifest(
+    repo_dir: str,
+    section_dirs: List[str],
+    artefacts: List[str] = DEFAULT_ARTEFACTS,
+) -> str:
+    """
+    Record the hashes of the artefacts found in `section_dirs`.
+
+    Only the given section directories are inspected, entries of other
+    sections are kept as they are. Artefacts with the same size and mtime
+    as when they were last hashed are not read again.
+
+    :param repo_dir: root of the git repository.
+    :param section_dirs: section directories to hash the artefacts of.
+    :param artefacts: artefact file names.
+    :return: path to the manifest.
+    """
+    manifest_path = join(repo_dir, ARTEFACT_MANIFEST)
+    manifest = load_artefact_manifest(repo_dir)
+    stats_path = join(repo_dir, ARTEFACT_STAT_CACHE)
+    stats = _load_json(stats_path)
+
+    for sec_dir in section_dirs:
+        for a in artefacts:
+            path = join(sec_dir, a)
+            key = relpath(path, repo_dir)
+            if exists(path):
+                st = os.stat(path)
+                stamp = [st.st_size, st.st_mtime_ns]
+                if key not in stats.keys() or stats[key][:2] != stamp:
+                    stats[key] = stamp + [file_hash(path)]
+                manifest[key] = stats[key][2]
+            else:
+                manifest.pop(key, None)
+                stats.pop(key, None)
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    with open(stats_path, "w") as f:
+        json.dump(stats, f)
+
+    return manifest_path
+
+
+def load_artefact_manifest(repo_dir: str) -> Dict[str, str]:
+    return _load_json(join(repo_dir, ARTEFACT_MANIFEST))
+
+
+def _load_json(path: str) -> Dict:
+    if exists(path):
+        with open(path) as f:
+            return json.load(f)
+    else:
+        return {}
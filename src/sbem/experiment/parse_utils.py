@@ -1,7 +1,7 @@
 import json
 import os
 from glob import glob
-from os.path import exists, join
+from os.path import exists, join, relpath
 from typing import List
 
 from tqdm import tqdm
@@ -130,6 +130,8 @@ def parse_and_add_sections(
     """
     A helper function to parse the SBEM directory structure of an acquisition.
 
+    Tile paths are stored relative to `sbem_root_dir`, which is registered
+    as data root of the acquisition in the sample.
 
     :param tile_grid: identifier e.g. 'g0001'
     """
@@ -137,6 +139,7 @@ def parse_and_add_sections(
         sample.get_experiment() is not None
     ), "Sample does not belong to any experiment."
     tile_grid_num = int(tile_grid[1:])
+    sample.set_data_root(acquisition, sbem_root_dir)
 
     metadata_files = sorted(glob(join(sbem_root_dir, "meta", "logs", "metadata_*")))
 
@@ -172,7 +175,7 @@ def parse_and_add_sections(
             Tile(
                 section,
                 tile_id=tile_spec["tile_id"],
-                path=tile_spec["tile_file"],
+                path=relpath(tile_spec["tile_file"], sbem_root_dir),
                 stage_x=tile_spec["x"],
                 stage_y=tile_spec["y"],
                 resolution_xy=resolution_xy,
@@ -184,13 +187,13 @@ def parse_and_add_sections(
     )
     sample.save(path=sample_path, overwrite=overwrite, section_to_subdir=True)
 
-    for section in tqdm(sample.sections.values(), desc="Build tile_id_maps"):
-        tile_id_map_path = join(
+    for section in tqdm(sample.sections.values(), desc="Build tile grids"):
+        tile_coords_path = join(
             sample.get_experiment().get_root_dir(),
             sample.get_experiment().get_name(),
             sample.get_name(),
             section.get_name(),
-            "tile_id_map.json",
+            "tile_coords.npz",
         )
-        if not exists(tile_id_map_path):
-            section.get_tile_id_map(path=tile_id_map_path)
+        if not exists(tile_coords_path):
+            section.get_tile_coords(path=tile_coords_path)
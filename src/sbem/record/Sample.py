@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import threading
 from os.path import exists, join
 from typing import TYPE_CHECKING
 
@@ -10,7 +11,7 @@ from sbem.record.Info import Info
 from sbem.record.Section import Section
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import Dict
+    from typing import Dict, List
 
     from sbem.experiment.Experiment import Experiment
 
@@ -24,8 +25,10 @@ class Sample(Info):
         documentation: str,
         aligned_data: str,
         license: str = "Creative Commons Attribution licence (CC BY)",
+        data_roots: Dict[str, str] = None,
     ):
         super().__init__(name=name, license=license)
+        self._lock = threading.RLock()
         self._experiment = experiment
         self._description = description
         self._documentation = documentation
@@ -33,31 +36,47 @@ class Sample(Info):
         self.sections: Dict[str, Section] = {}
         self._min_section_num = {}
         self._max_section_num = {}
+        self._data_roots: Dict[str, str] = {}
+        if data_roots is not None:
+            self._data_roots.update(data_roots)
 
         if self._experiment is not None:
             self._experiment.add_sample(self)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_lock")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
     def add_section(self, section: Section):
-        if section.get_sample() is None:
-            section.set_sample(self)
-        else:
-            assert section.get_sample() == self, "Section belongs to another " "sample."
-        self.sections[section.get_name()] = section
-        grid_num = section.get_tile_grid_num()
-        if grid_num not in self._min_section_num.keys():
-            self._min_section_num[grid_num] = section.get_section_num()
-            self._max_section_num[grid_num] = section.get_section_num()
-        else:
-            if self._min_section_num[grid_num] > section.get_section_num():
+        with self._lock:
+            if section.get_sample() is None:
+                section.set_sample(self)
+            else:
+                assert section.get_sample() == self, (
+                    "Section belongs to another " "sample."
+                )
+            self.sections[section.get_name()] = section
+            grid_num = section.get_tile_grid_num()
+            if grid_num not in self._min_section_num.keys():
                 self._min_section_num[grid_num] = section.get_section_num()
-            elif self._max_section_num[grid_num] < section.get_section_num():
                 self._max_section_num[grid_num] = section.get_section_num()
+            else:
+                if self._min_section_num[grid_num] > section.get_section_num():
+                    self._min_section_num[grid_num] = section.get_section_num()
+                elif self._max_section_num[grid_num] < section.get_section_num():
+                    self._max_section_num[grid_num] = section.get_section_num()
 
     def get_section(self, section_name: str) -> Section:
-        if section_name in self.sections.keys():
-            return self.sections[section_name]
-        else:
-            return None
+        return self.sections.get(section_name, None)
+
+    def _get_sections(self) -> List[Section]:
+        with self._lock:
+            return list(self.sections.values())
 
     def get_min_section_num(self, tile_grid_num: int):
         return self._min_section_num[tile_grid_num]
@@ -80,6 +99,30 @@ class Sample(Info):
     def get_aligned_data(self):
         return self._aligned_data
 
+    def set_data_root(self, acquisition: str, path: str):
+        """
+        Set the root directory of the raw data of an acquisition.
+
+        Relative tile paths of sections from this acquisition are resolved
+        against it. Changing it relocates the raw data without rewriting
+        any section files.
+
+        :param acquisition: name of the acquisition.
+        :param path: root directory of the SBEM acquisition.
+        """
+        with self._lock:
+            self._data_roots[acquisition] = path
+
+    def get_data_root(self, acquisition: str) -> str:
+        if acquisition in self._data_roots.keys():
+            return self._data_roots[acquisition]
+        else:
+            return None
+
+    def get_data_roots(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._data_roots)
+
     def get_section_range(
         self,
         start_section_num: int,
@@ -88,7 +131,7 @@ class Sample(Info):
         include_skipped: bool = False,
     ):
         sections = []
-        for sec in self.sections.values():
+        for sec in self._get_sections():
             above_start = sec.get_section_num() >= start_section_num
             below_end = sec.get_section_num() <= end_section_num
             match_tile_grid = sec.get_tile_grid_num() == tile_grid_num
@@ -103,7 +146,7 @@ class Sample(Info):
         self, acquisition: str, tile_grid_num: int, include_skipped: bool = False
     ):
         sections = []
-        for sec in self.sections.values():
+        for sec in self._get_sections():
             match = sec.get_acquisition() == acquisition
             match_tile_grid = sec.get_tile_grid_num() == tile_grid_num
             skip = sec.skip() if not include_skipped else False
@@ -115,7 +158,7 @@ class Sample(Info):
 
     def to_dict(self, section_to_subdir: bool = True) -> Dict:
         sections = []
-        for s in sorted(self.sections.values(), key=lambda s: s.get_section_num()):
+        for s in sorted(self._get_sections(), key=lambda s: s.get_section_num()):
             sec_dict = {
                 "name": s.get_name(),
                 "section_num": s.get_section_num(),
@@ -138,6 +181,7 @@ class Sample(Info):
             "description": self._description,
             "documentation": self._documentation,
             "aligned_data": self._aligned_data,
+            "data_roots": self.get_data_roots(),
             "sections": sections,
         }
 
@@ -152,16 +196,23 @@ class Sample(Info):
         )
 
         section_names = []
-        for section in sections:
-            section_names.append(section.get_name())
-            del self.sections[section.get_name()]
+        with self._lock:
+            for section in sections:
+                section_names.append(section.get_name())
+                del self.sections[section.get_name()]
 
         return section_names
 
-    def _save_sections(self, root: str, sec_dicts: Dict, overwrite: bool = False):
+    def _save_sections(
+        self, root: str, sec_dicts: Dict, overwrite: bool = False
+    ) -> List[str]:
+        written = []
         for sec_dict in sec_dicts:
             s = self.sections.get(sec_dict["name"])
-            s.save(root, overwrite=overwrite)
+            out_file = s.save(root, overwrite=overwrite)
+            if out_file is not None:
+                written.append(out_file)
+        return written
 
     def _dump(
         self,
@@ -171,15 +222,21 @@ class Sample(Info):
         sample_yaml_only: bool = False,
     ):
         yaml = YAML(typ="rt")
-        data = self.to_dict(section_to_subdir=section_to_subdir)
-        with open(join(path, "sample.yaml"), "w") as f:
-            yaml.dump(data, f)
+        with self._lock:
+            data = self.to_dict(section_to_subdir=section_to_subdir)
+            with open(join(path, "sample.yaml"), "w") as f:
+                yaml.dump(data, f)
 
+        written = [join(path, "sample.yaml")]
         if not sample_yaml_only:
             if len(data["sections"]) > 0 and isinstance(
                 data["sections"][0]["details"], str
             ):
-                self._save_sections(path, data["sections"], overwrite=overwrite)
+                written += self._save_sections(
+                    path, data["sections"], overwrite=overwrite
+                )
+
+        return written
 
     def save(
         self,
@@ -187,11 +244,16 @@ class Sample(Info):
         overwrite: bool = False,
         section_to_subdir: bool = True,
         sample_yaml_only: bool = False,
-    ):
+    ) -> List[str]:
+        """
+        Save the sample to `path/<sample-name>`.
+
+        :return: list of the written files.
+        """
         out_path = join(path, self.get_name())
         if not exists(out_path):
             os.makedirs(out_path, exist_ok=True)
-            self._dump(
+            return self._dump(
                 path=out_path,
                 overwrite=overwrite,
                 section_to_subdir=section_to_subdir,
@@ -199,13 +261,15 @@ class Sample(Info):
             )
         else:
             if overwrite:
-                self._dump(
+                return self._dump(
                     path=out_path,
                     overwrite=overwrite,
                     section_to_subdir=section_to_subdir,
                     sample_yaml_only=sample_yaml_only,
                 )
 
+        return []
+
     @staticmethod
     def load(path: str) -> Sample:
         yaml = YAML(typ="rt")
@@ -219,6 +283,7 @@ class Sample(Info):
             documentation=data["documentation"],
             aligned_data=data["aligned_data"],
             license=data["license"],
+            data_roots=data.get("data_roots", None),
         )
 
         for sec_dict in data["sections"]:
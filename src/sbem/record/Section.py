@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import json
 import os
-from os.path import exists, join
-from typing import TYPE_CHECKING, Union
+import threading
+from os.path import exists, join, splitext
+from typing import TYPE_CHECKING, Tuple, Union
 
 import numpy as np
 from numpy.typing import ArrayLike
@@ -36,6 +37,7 @@ class Section(Info):
         license: str = "Creative Commons Attribution licence (CC " "BY)",
     ):
         super().__init__(name=name, license=license)
+        self._lock = threading.RLock()
         self.set_sample(sample)
         self._section_num = section_num
         self._tile_grid_num = tile_grid_num
@@ -48,6 +50,10 @@ class Section(Info):
         self._skip = skip
         self._alignment_mesh = alignment_mesh
         self.tiles: Dict[int, Tile] = {}
+        self._tile_id_map = None
+        self._tile_id_map_file = None
+        self._tile_coords = None
+        self._tile_coords_file = None
         self._fully_initialized = True
 
         if self._sample is not None:
@@ -66,6 +72,23 @@ class Section(Info):
 
             return wrapper
 
+        def synchronized(func):
+            def wrapper(self, *args, **kwargs):
+                with self._lock:
+                    return func(self, *args, **kwargs)
+
+            return wrapper
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_lock")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @_Decorator.synchronized
     @_Decorator.is_initialized
     def add_tile(self, tile: Tile):
         if tile.get_section() is None:
@@ -73,6 +96,7 @@ class Section(Info):
         else:
             assert tile.get_section() == self, "Tile belongs to another section."
         self.tiles[tile.get_tile_id()] = tile
+        self._invalidate_tile_id_map()
 
     @_Decorator.is_initialized
     def get_tile(self, tile_id: int):
@@ -119,60 +143,200 @@ class Section(Info):
         return self._sample
 
     @_Decorator.is_initialized
-    def _compute_tile_id_map(self) -> ArrayLike:
+    def _compute_tile_coords(self):
+        """
+        Compute the sparse tile grid from the tile stage coordinates.
+
+        Only tiles which lie on the grid spanned by tile size and overlap
+        are placed. If several tiles share a grid position the last added
+        tile is kept.
+
+        :return: (row, col, tile_id) array sorted by row and column, and
+        the (rows, cols) shape of the grid.
+        """
         if len(self.tiles) == 0:
-            return None
+            return None, None
+
+        tiles = list(self.tiles.values())
+        xy = np.array([[int(t.x), int(t.y)] for t in tiles], dtype=int)
+        tile_ids = np.array([t.get_tile_id() for t in tiles], dtype=int)
+        step = np.array(
+            [
+                self._tile_width - self._tile_overlap,
+                self._tile_height - self._tile_overlap,
+            ],
+            dtype=int,
+        )
 
-        xx, yy = set(), set()
-        coords_to_tile = {}
-        for t in self.tiles.values():
-            x, y = int(t.x), int(t.y)
-            if x in coords_to_tile.keys():
-                coords_to_tile[x][y] = t.get_tile_id()
-            else:
-                coords_to_tile[x] = {y: t.get_tile_id()}
-            xx.add(x)
-            yy.add(y)
+        rel = xy - xy.min(axis=0)
+        shape = tuple(int(s) for s in (rel.max(axis=0) // step + 1)[::-1])
+        on_grid = np.all(rel % step == 0, axis=1)
+        col, row = (rel[on_grid] // step).T
+        coords = np.stack([row, col, tile_ids[on_grid]], axis=1)
 
-        xx = list(sorted(xx))
-        yy = list(sorted(yy))
+        # Keep the last tile per grid position.
+        flat = coords[::-1, 0] * shape[1] + coords[::-1, 1]
+        _, first = np.unique(flat, return_index=True)
+        coords = coords[::-1][first]
 
-        tile_id_map = [[]]
-        for j_map, j in enumerate(
-            range(yy[0], yy[-1] + 1, self._tile_height - self._tile_overlap)
-        ):
-            for i in range(xx[0], xx[-1] + 1, self._tile_width - self._tile_overlap):
+        return coords, shape
 
-                tile_id = -1
-                if i in coords_to_tile.keys():
-                    if j in coords_to_tile[i].keys():
-                        tile_id = coords_to_tile[i][j]
+    @_Decorator.is_initialized
+    def _compute_tile_id_map(self) -> ArrayLike:
+        coords, shape = self._compute_tile_coords()
+        if coords is None:
+            return None
 
-                if len(tile_id_map) <= j_map:
-                    tile_id_map.append([tile_id])
-                else:
-                    tile_id_map[j_map].append(tile_id)
+        tile_id_map = np.full(shape, -1, dtype=int)
+        tile_id_map[coords[:, 0], coords[:, 1]] = coords[:, 2]
+        return tile_id_map
 
-        return np.array(tile_id_map)
+    def _invalidate_tile_id_map(self):
+        self._tile_id_map = None
+        self._tile_id_map_file = None
+        self._tile_coords = None
+        self._tile_coords_file = None
 
-    @_Decorator.is_initialized
-    def get_tile_id_map(self, path: str = None) -> ArrayLike:
-        if path is not None and exists(path):
-            # Load from disk
+    @staticmethod
+    def _read_tile_id_map(path: str) -> ArrayLike:
+        if path.endswith(".npy"):
+            return np.load(path)
+        else:
             with open(path) as f:
-                data = json.load(f)
+                return np.array(json.load(f))
 
-            return np.array(data)
-        elif path is not None and not exists(path):
-            # Compute and save to disk
-            tile_id_map = self._compute_tile_id_map()
+    @staticmethod
+    def _write_tile_id_map(path: str, tile_id_map: ArrayLike):
+        if path.endswith(".npy"):
+            np.save(path, tile_id_map)
+        else:
             with open(path, "w") as f:
                 json.dump(tile_id_map.tolist(), f)
 
-            return tile_id_map
+    @_Decorator.synchronized
+    @_Decorator.is_initialized
+    def get_tile_id_map(self, path: str = None) -> ArrayLike:
+        """
+        Get the tile-id-map of this section.
+
+        The map is memoised on the section and recomputed after `add_tile`.
+        If `path` is given the map is loaded from or saved to disk. Files
+        ending with `.npy` are stored as binary array, all other files as
+        JSON. A `.npy` path which does not exist yet is created from a
+        `tile_id_map.json` next to it, if present.
+
+        :param path: to the tile-id-map file.
+        :return: tile-id-map
+        """
+        if path is not None:
+            if not exists(path) and path.endswith(".npy"):
+                json_path = splitext(path)[0] + ".json"
+                if exists(json_path):
+                    self._write_tile_id_map(path, self._read_tile_id_map(json_path))
+
+            if exists(path):
+                # Load from disk, unless the file is unchanged since last read
+                mtime = os.stat(path).st_mtime_ns
+                cached = self._tile_id_map_file
+                if cached is not None and cached[0] == path and cached[1] == mtime:
+                    return cached[2].copy()
+
+                tile_id_map = self._read_tile_id_map(path)
+            else:
+                # Compute and save to disk
+                tile_id_map = self._compute_tile_id_map()
+                self._write_tile_id_map(path, tile_id_map)
+                mtime = os.stat(path).st_mtime_ns
+
+            self._tile_id_map_file = (path, mtime, tile_id_map)
+            return tile_id_map.copy()
         else:
             # Just compute
-            return self._compute_tile_id_map()
+            if self._tile_id_map is None:
+                self._tile_id_map = self._compute_tile_id_map()
+
+            if self._tile_id_map is None:
+                return None
+            return self._tile_id_map.copy()
+
+    def _load_tile_coords(self, path: str):
+        """
+        Load the sparse tile grid from `path` or create it.
+
+        A missing file is converted from a tile-id-map (.npy or .json) next
+        to it, if present, otherwise it is computed from the tiles.
+
+        :param path: to the tile-coords .npz file.
+        :return: (row, col, tile_id) array and (rows, cols) shape. Both are
+            None for a section without tiles, nothing is written then.
+        """
+        if not exists(path):
+            coords, shape = None, None
+            for ext in [".npy", ".json"]:
+                tile_id_map_path = join(os.path.dirname(path), "tile_id_map" + ext)
+                if exists(tile_id_map_path):
+                    tile_id_map = self._read_tile_id_map(tile_id_map_path)
+                    rows, cols = np.nonzero(tile_id_map != -1)
+                    coords = np.stack([rows, cols, tile_id_map[rows, cols]], axis=1)
+                    shape = tile_id_map.shape
+                    break
+            if coords is None:
+                coords, shape = self._compute_tile_coords()
+            if coords is None:
+                return None, None
+            np.savez(path, coords=coords, shape=np.array(shape))
+
+        # Load from disk, unless the file is unchanged since last read
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._tile_coords_file
+        if cached is None or cached[0] != path or cached[1] != mtime:
+            with np.load(path) as data:
+                coords = data["coords"]
+                shape = tuple(int(s) for s in data["shape"])
+            self._tile_coords_file = (path, mtime, (coords, shape))
+        return self._tile_coords_file[2]
+
+    @_Decorator.synchronized
+    @_Decorator.is_initialized
+    def get_tile_coords(self, path: str = None) -> ArrayLike:
+        """
+        Get the sparse tile grid of this section.
+
+        Each row of the returned array holds (row, col, tile_id) of one
+        placed tile. Empty grid positions are not stored. If `path` is
+        given the grid is loaded from or saved to this .npz file, the dense
+        tile-id-map is never built.
+
+        :param path: to the tile-coords file, e.g. tile_coords.npz.
+        :return: (n_tiles, 3) array sorted by row and column.
+        """
+        if path is not None:
+            coords = self._load_tile_coords(path)[0]
+        else:
+            if self._tile_coords is None:
+                self._tile_coords = self._compute_tile_coords()
+            coords = self._tile_coords[0]
+
+        if coords is None:
+            return None
+        return coords.copy()
+
+    @_Decorator.synchronized
+    @_Decorator.is_initialized
+    def get_tile_grid_shape(self, path: str = None) -> Tuple[int, int]:
+        """
+        Get the (rows, cols) shape of the tile grid.
+
+        :param path: to the tile-coords file, see `get_tile_coords`.
+        :return: shape of the dense tile-id-map.
+        """
+        if path is not None:
+            return self._load_tile_coords(path)[1]
+
+        if self._tile_coords is None:
+            self._tile_coords = self._compute_tile_coords()
+
+        return self._tile_coords[1]
 
     @_Decorator.is_initialized
     def get_tile_data_map(self, path: str = None, indexing="yx"):
@@ -183,18 +347,16 @@ class Section(Info):
         :return: tile-data-map
         """
         assert indexing == "xy" or indexing == "yx"
-        tile_id_map = self.get_tile_id_map(path=path)
         tile_data_map = {}
-        for y in range(tile_id_map.shape[0]):
-            for x in range(tile_id_map.shape[1]):
-                if tile_id_map[y, x] != -1:
-                    data = self.tiles[tile_id_map[y, x]].get_tile_data()
-                    if indexing == "xy":
-                        tile_data_map[(x, y)] = data
-                    else:
-                        tile_data_map[(y, x)] = data
+        for y, x, tile_id in self.get_tile_coords(path=path):
+            data = self.tiles[int(tile_id)].get_tile_data()
+            if indexing == "xy":
+                tile_data_map[(int(x), int(y))] = data
+            else:
+                tile_data_map[(int(y), int(x))] = data
         return tile_data_map
 
+    @_Decorator.synchronized
     def to_dict(self) -> Dict:
         if self._fully_initialized:
             tiles = []
@@ -223,23 +385,33 @@ class Section(Info):
                 "tiles": [],
             }
 
-    def _dump(self, path: str):
+    def _dump(self, path: str) -> str:
         yaml = YAML(typ="rt")
-        with open(join(path, "section.yaml"), "w") as f:
+        out_file = join(path, "section.yaml")
+        with open(out_file, "w") as f:
             yaml.dump(self.to_dict(), f)
+        return out_file
 
-    def save(self, path: str, overwrite: bool = False):
+    @_Decorator.synchronized
+    def save(self, path: str, overwrite: bool = False) -> str:
+        """
+        Save the section details to `path/<section-name>/section.yaml`.
+
+        :return: path of the written file or None if nothing was written.
+        """
         out_path = join(path, self.get_name())
         if not exists(out_path):
             os.makedirs(out_path, exist_ok=True)
-            self._dump(path=out_path)
+            return self._dump(path=out_path)
         else:
             if overwrite:
                 if self._fully_initialized:
-                    self._dump(path=out_path)
+                    return self._dump(path=out_path)
             else:
                 raise FileExistsError()
 
+        return None
+
     def get_section_dir(self):
         sample_exists = self.get_sample() is not None
         exp_exists = self.get_sample().get_experiment() is not None
@@ -253,6 +425,7 @@ class Section(Info):
         else:
             return None
 
+    @_Decorator.synchronized
     def load_from_yaml(self, path: str = None):
         if path is None:
             sample_exists = self.get_sample() is not None
@@ -273,6 +446,7 @@ class Section(Info):
 
             self._load_details(dict)
 
+    @_Decorator.synchronized
     def _load_details(self, dict: Dict):
         assert self.get_format_version() == dict["format_version"]
 
@@ -333,6 +507,7 @@ class Section(Info):
     def get_alignment_mesh(self) -> str:
         return self._alignment_mesh
 
+    @_Decorator.synchronized
     @_Decorator.is_initialized
     def set_alignment_mesh(self, path: str):
         self._alignment_mesh = path
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from os.path import isabs, join
 from typing import TYPE_CHECKING
 
 from tifffile import imread
@@ -38,10 +39,27 @@ class Tile:
         return self._tile_id
 
     def get_tile_data(self) -> ArrayLike:
-        return imread(self._path)
+        return imread(self.get_tile_path())
 
     def get_tile_path(self) -> str:
-        return self._path
+        """
+        Get the path to the tile image.
+
+        Relative paths are resolved against the data root of the
+        acquisition of this tile, see `Sample.set_data_root`.
+        """
+        if isabs(self._path) or self._section is None:
+            return self._path
+
+        sample = self._section.get_sample()
+        if sample is None:
+            return self._path
+
+        data_root = sample.get_data_root(self._section.get_acquisition())
+        if data_root is None:
+            return self._path
+
+        return join(data_root, self._path)
 
     def get_resolution(self) -> float:
         return self._resolution_xy
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+import numpy as np
+
+
+class ChunkCache:
+    """
+    Least-recently-used cache of decompressed chunks with a byte budget.
+    """
+
+    def __init__(self, max_bytes: int = 2**28):
+        """
+        :param max_bytes: upper bound of the cached bytes. 0 disables the
+            cache.
+        """
+        self._max_bytes = max_bytes
+        self._n_bytes = 0
+        self._chunks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        """
+        :return: cached chunk or None.
+        """
+        with self._lock:
+            chunk = self._chunks.get(key, None)
+            if chunk is not None:
+                self._chunks.move_to_end(key)
+            return chunk
+
+    def put(self, key: Hashable, chunk: np.ndarray):
+        if chunk.nbytes > self._max_bytes:
+            return
+
+        with self._lock:
+            if key in self._chunks:
+                self._n_bytes -= self._chunks.pop(key).nbytes
+            self._chunks[key] = chunk
+            self._n_bytes += chunk.nbytes
+            while self._n_bytes > self._max_bytes:
+                _, evicted = self._chunks.popitem(last=False)
+                self._n_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._chunks.clear()
+            self._n_bytes = 0
+
+    def get_n_bytes(self) -> int:
+        return self._n_bytes
+
+    def __len__(self) -> int:
+        return len(self._chunks)
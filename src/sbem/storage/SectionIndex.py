@@ -0,0 +1,234 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Marks an empty z-position or an unset physical slot.
+_EMPTY = -1
+
+# States of a section bounding box.
+_BBOX_UNKNOWN = 0
+_BBOX_SET = 1
+_BBOX_EMPTY = 2
+
+
+class SectionIndex:
+    """
+    Dense index of the sections of a volume.
+
+    Section records (offsets, shape, bounding box) are stored in contiguous
+    arrays indexed by a record slot. A dict maps section numbers to their
+    slot and a z-array maps every logical z-position to the slot of its
+    section. Inserting or removing a section shifts the z-offsets of all
+    sections above with a single vectorized operation.
+    """
+
+    def __init__(self, capacity: int = 64):
+        """
+        :param capacity: initial number of record slots.
+        """
+        self._nums = np.full(capacity, _EMPTY, dtype=np.int64)
+        self._offsets = np.zeros((capacity, 3), dtype=np.int64)
+        self._shapes = np.zeros((capacity, 3), dtype=np.int64)
+        self._bboxes = np.zeros((capacity, 4), dtype=np.int64)
+        self._bbox_state = np.zeros(capacity, dtype=np.uint8)
+        self._slot_of: Dict[int, int] = {}
+        self._free_records: List[int] = []
+        self._n_records = 0
+
+        # logical z -> record slot
+        self._z_to_slot = np.zeros(0, dtype=np.int64)
+        # logical z -> physical z-slot in the storage
+        self._physical = np.zeros(0, dtype=np.int64)
+
+    def _grow(self):
+        capacity = 2 * len(self._nums)
+        self._nums = np.resize(self._nums, capacity)
+        self._nums[self._n_records :] = _EMPTY
+        self._offsets = np.resize(self._offsets, (capacity, 3))
+        self._shapes = np.resize(self._shapes, (capacity, 3))
+        self._bboxes = np.resize(self._bboxes, (capacity, 4))
+        self._bbox_state = np.resize(self._bbox_state, capacity)
+
+    def _new_record(self) -> int:
+        if len(self._free_records) > 0:
+            return self._free_records.pop()
+        if self._n_records == len(self._nums):
+            self._grow()
+        self._n_records += 1
+        return self._n_records - 1
+
+    def __len__(self) -> int:
+        """
+        :return: number of z-positions including empty ones.
+        """
+        return len(self._z_to_slot)
+
+    def __contains__(self, section_num) -> bool:
+        return section_num in self._slot_of
+
+    def get_n_sections(self) -> int:
+        return len(self._slot_of)
+
+    def section_nums(self) -> List[int]:
+        return list(self._slot_of.keys())
+
+    def is_empty(self, z: int) -> bool:
+        return z < len(self._z_to_slot) and self._z_to_slot[z] == _EMPTY
+
+    def section_at(self, z: int) -> Optional[int]:
+        slot = self._z_to_slot[z]
+        return None if slot == _EMPTY else int(self._nums[slot])
+
+    def z_of(self, section_num: int) -> int:
+        return int(self._offsets[self._slot_of[section_num], 0])
+
+    def last_section(self) -> Optional[int]:
+        used = np.flatnonzero(self._z_to_slot != _EMPTY)
+        if len(used) == 0:
+            return None
+        return int(self._nums[self._z_to_slot[used[-1]]])
+
+    def get_offsets(self, section_num: int) -> np.ndarray:
+        return self._offsets[self._slot_of[section_num]].copy()
+
+    def get_shape(self, section_num: int) -> Tuple[int, int, int]:
+        return tuple(int(s) for s in self._shapes[self._slot_of[section_num]])
+
+    def has_bbox(self, section_num: int) -> bool:
+        return self._bbox_state[self._slot_of[section_num]] != _BBOX_UNKNOWN
+
+    def get_bbox(self, section_num: int) -> Optional[List[int]]:
+        slot = self._slot_of[section_num]
+        if self._bbox_state[slot] == _BBOX_SET:
+            return [int(b) for b in self._bboxes[slot]]
+        return None
+
+    def get_physical(self, z: int) -> Optional[int]:
+        if z >= len(self._physical) or self._physical[z] == _EMPTY:
+            return None
+        return int(self._physical[z])
+
+    def set_physical(self, z: int, physical: int):
+        self._physical[z] = physical
+
+    def get_used_physical(self) -> set:
+        return set(int(p) for p in self._physical[self._physical != _EMPTY])
+
+    def resize(self, n_slices: int):
+        """
+        Reset the index to `n_slices` empty z-positions.
+        """
+        assert len(self._slot_of) == 0, "Index contains sections."
+        self._z_to_slot = np.full(n_slices, _EMPTY, dtype=np.int64)
+        self._physical = np.full(n_slices, _EMPTY, dtype=np.int64)
+
+    def add(
+        self,
+        section_num: int,
+        offsets,
+        shape,
+        bbox: Optional[List[int]],
+        physical: int = None,
+        bbox_known: bool = True,
+        fill: bool = True,
+    ):
+        """
+        Register a section at the z-position `offsets[0]`. If `fill` is set
+        an empty z-position is filled, otherwise the section is inserted and
+        the sections above are shifted by one.
+        """
+        z = int(offsets[0])
+        if not (fill and self.is_empty(z)):
+            slots_above = self._z_to_slot[z:]
+            self._offsets[slots_above[slots_above != _EMPTY], 0] += 1
+            if z > len(self._z_to_slot):
+                n_gap = z - len(self._z_to_slot)
+                self._z_to_slot = np.append(
+                    self._z_to_slot, np.full(n_gap, _EMPTY, dtype=np.int64)
+                )
+                self._physical = np.append(
+                    self._physical, np.full(n_gap, _EMPTY, dtype=np.int64)
+                )
+            self._z_to_slot = np.insert(self._z_to_slot, z, _EMPTY)
+            self._physical = np.insert(self._physical, z, _EMPTY)
+
+        slot = self._new_record()
+        self._slot_of[section_num] = slot
+        self._nums[slot] = section_num
+        self._offsets[slot] = offsets
+        self._shapes[slot] = shape
+        if bbox is not None:
+            self._bboxes[slot] = bbox
+            self._bbox_state[slot] = _BBOX_SET
+        else:
+            self._bbox_state[slot] = _BBOX_EMPTY if bbox_known else _BBOX_UNKNOWN
+        self._z_to_slot[z] = slot
+        self._physical[z] = _EMPTY if physical is None else physical
+
+    def remove(self, section_num: int) -> Optional[int]:
+        """
+        Unregister a section and shift the sections above down by one.
+
+        :return: physical z-slot of the section.
+        """
+        slot = self._slot_of.pop(section_num)
+        z = int(self._offsets[slot, 0])
+        physical = self.get_physical(z)
+
+        slots_above = self._z_to_slot[z + 1 :]
+        self._offsets[slots_above[slots_above != _EMPTY], 0] -= 1
+        self._z_to_slot = np.delete(self._z_to_slot, z)
+        self._physical = np.delete(self._physical, z)
+
+        self._nums[slot] = _EMPTY
+        self._free_records.append(slot)
+        return physical
+
+    def section_list(self) -> List[Optional[int]]:
+        """
+        :return: section number per z-position, None for empty positions.
+        """
+        nums = self._nums[self._z_to_slot]
+        return [None if s == _EMPTY else int(n) for s, n in zip(self._z_to_slot, nums)]
+
+    def z_map(self) -> List[Optional[int]]:
+        return [None if p == _EMPTY else int(p) for p in self._physical]
+
+    def to_dict(self, z_indirection: bool) -> Dict:
+        nums = list(self._slot_of.keys())
+        slots = np.array([self._slot_of[n] for n in nums], dtype=np.int64)
+        offsets = self._offsets[slots].tolist()
+        shapes = self._shapes[slots].tolist()
+        bboxes = self._bboxes[slots].tolist()
+        return {
+            "sections": self.section_list(),
+            "offsets": {n: o for n, o in zip(nums, offsets)},
+            "shapes": {n: s for n, s in zip(nums, shapes)},
+            "bboxes": {
+                n: b if self._bbox_state[s] == _BBOX_SET else None
+                for n, s, b in zip(nums, slots, bboxes)
+                if self._bbox_state[s] != _BBOX_UNKNOWN
+            },
+            "z_map": self.z_map() if z_indirection else None,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict) -> "SectionIndex":
+        index = SectionIndex(capacity=max(64, len(data["offsets"])))
+        index.resize(len(data["sections"]))
+        z_map = data.get("z_map", None)
+        bboxes = data.get("bboxes", {})
+        for z, section_num in enumerate(data["sections"]):
+            if section_num is None:
+                if z_map is not None and z_map[z] is not None:
+                    index._physical[z] = z_map[z]
+                continue
+            index.add(
+                section_num,
+                data["offsets"][section_num],
+                data["shapes"][section_num],
+                bboxes.get(section_num, None),
+                physical=None if z_map is None else z_map[z],
+                bbox_known=section_num in bboxes,
+            )
+        return index
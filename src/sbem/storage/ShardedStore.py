@@ -0,0 +1,277 @@
+import json
+import os
+import threading
+from collections import defaultdict
+from os.path import exists, isdir, join
+from shutil import rmtree
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from zarr.storage import Store
+
+SHARD_META = ".zshards"
+
+# Marks a chunk which is not stored in a shard.
+_MISSING = np.iinfo(np.uint64).max
+
+
+class ShardedStore(Store):
+    """
+    Directory store which packs the chunks of 3D arrays into shard files.
+
+    A chunk with key "<array>/z/y/x" is stored in the shard file
+    "<array>/Z/Y/X" with Z, Y, X = z // shards[0], y // shards[1],
+    x // shards[2]. A shard file contains the compressed chunks followed by
+    an index of (offset, nbytes) uint64 pairs in C-order of the chunks in the
+    shard, missing chunks have offset and nbytes 2**64 - 1. This is the
+    layout of the zarr v3 sharding codec without checksum. Metadata keys are
+    stored as plain files.
+
+    Shard files are replaced atomically and updates of the same shard are
+    serialized by a per-shard lock. Writers in different threads are safe,
+    writers in different processes must not write to the same shard.
+    """
+
+    def __init__(self, path: str, shards: Tuple[int, int, int] = None):
+        """
+        :param path: root directory of the store.
+        :param shards: number of chunks per shard along (z, y, x). Read from
+            the store if it exists already.
+        """
+        self.path = os.path.abspath(path)
+        os.makedirs(self.path, exist_ok=True)
+        meta_file = join(self.path, SHARD_META)
+        if exists(meta_file):
+            with open(meta_file) as f:
+                stored = tuple(json.load(f)["shards"])
+            assert (
+                shards is None or tuple(shards) == stored
+            ), f"Store is sharded with {stored}."
+            shards = stored
+        else:
+            assert shards is not None, "Shards are required for a new store."
+            with open(meta_file, "w") as f:
+                json.dump({"shards": list(shards)}, f)
+        self.shards = tuple(int(s) for s in shards)
+        # Nested chunk keys are required to map chunks to shards.
+        self._dimension_separator = "/"
+
+        self._locks_lock = threading.Lock()
+        self._locks = {}
+
+    def dir_path(self, path: str = None) -> str:
+        if path is None:
+            return self.path
+        return join(self.path, path)
+
+    def _shard_lock(self, shard_path: str) -> threading.Lock:
+        with self._locks_lock:
+            if shard_path not in self._locks:
+                self._locks[shard_path] = threading.Lock()
+            return self._locks[shard_path]
+
+    def _parse_chunk_key(self, key: str):
+        """
+        Split a chunk key into the shard file path and the index of the
+        chunk inside of the shard. Returns None for metadata keys.
+        """
+        parts = key.split("/")
+        if len(parts) < 4 or not all(p.isdigit() for p in parts[-3:]):
+            return None
+        coords = [int(p) for p in parts[-3:]]
+        shard = [str(c // s) for c, s in zip(coords, self.shards)]
+        inner = [c % s for c, s in zip(coords, self.shards)]
+        index = int(np.ravel_multi_index(inner, self.shards))
+        return join(self.path, *parts[:-3], *shard), index
+
+    def _read_shard(self, shard_path: str) -> Dict[int, bytes]:
+        if not exists(shard_path):
+            return {}
+        with open(shard_path, "rb") as f:
+            data = f.read()
+        n = int(np.prod(self.shards))
+        index = np.frombuffer(data[-16 * n :], dtype="<u8").reshape(n, 2)
+        return {
+            i: data[int(o) : int(o) + int(nb)]
+            for i, (o, nb) in enumerate(index)
+            if o != _MISSING
+        }
+
+    def _read_chunk(self, shard_path: str, index: int) -> bytes:
+        n = int(np.prod(self.shards))
+        with open(shard_path, "rb") as f:
+            f.seek(-16 * n, os.SEEK_END)
+            offset, nbytes = np.frombuffer(f.read(16 * n), dtype="<u8")[
+                2 * index : 2 * index + 2
+            ]
+            if offset == _MISSING:
+                raise KeyError(index)
+            f.seek(int(offset))
+            return f.read(int(nbytes))
+
+    def _write_shard(self, shard_path: str, chunks: Dict[int, bytes]):
+        if len(chunks) == 0:
+            if exists(shard_path):
+                os.remove(shard_path)
+            return
+
+        n = int(np.prod(self.shards))
+        index = np.full((n, 2), _MISSING, dtype="<u8")
+        offset = 0
+        for i in sorted(chunks.keys()):
+            index[i] = offset, len(chunks[i])
+            offset += len(chunks[i])
+
+        os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+        tmp_path = f"{shard_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for i in sorted(chunks.keys()):
+                f.write(chunks[i])
+            f.write(index.tobytes())
+        os.replace(tmp_path, shard_path)
+
+    def _group_by_shard(self, keys) -> Dict[str, List]:
+        groups = defaultdict(list)
+        for key in keys:
+            groups[self._parse_chunk_key(key)[0]].append(key)
+        return groups
+
+    def _update_shard(self, shard_path: str, values: Dict[str, bytes]):
+        """
+        Set (bytes) or delete (None) chunks of a single shard.
+        """
+        with self._shard_lock(shard_path):
+            chunks = self._read_shard(shard_path)
+            for key, value in values.items():
+                index = self._parse_chunk_key(key)[1]
+                if value is None:
+                    chunks.pop(index, None)
+                else:
+                    chunks[index] = bytes(value)
+            self._write_shard(shard_path, chunks)
+
+    def __getitem__(self, key: str) -> bytes:
+        parsed = self._parse_chunk_key(key)
+        if parsed is None:
+            path = join(self.path, key)
+            if not os.path.isfile(path):
+                raise KeyError(key)
+            with open(path, "rb") as f:
+                return f.read()
+
+        shard_path, index = parsed
+        if not exists(shard_path):
+            raise KeyError(key)
+        with self._shard_lock(shard_path):
+            try:
+                return self._read_chunk(shard_path, index)
+            except KeyError:
+                raise KeyError(key)
+
+    def getitems(self, keys, *, contexts=None) -> Dict[str, bytes]:
+        result = {}
+        meta_keys = [k for k in keys if self._parse_chunk_key(k) is None]
+        for key in meta_keys:
+            if key in self:
+                result[key] = self[key]
+
+        chunk_keys = [k for k in keys if k not in meta_keys]
+        for shard_path, shard_keys in self._group_by_shard(chunk_keys).items():
+            with self._shard_lock(shard_path):
+                chunks = self._read_shard(shard_path)
+            for key in shard_keys:
+                index = self._parse_chunk_key(key)[1]
+                if index in chunks:
+                    result[key] = chunks[index]
+        return result
+
+    def __setitem__(self, key: str, value):
+        if self._parse_chunk_key(key) is None:
+            path = join(self.path, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(bytes(value))
+        else:
+            self.setitems({key: value})
+
+    def setitems(self, values: Dict[str, bytes]):
+        meta = {k: v for k, v in values.items() if self._parse_chunk_key(k) is None}
+        for key, value in meta.items():
+            self[key] = value
+
+        chunk_keys = [k for k in values.keys() if k not in meta]
+        for shard_path, shard_keys in self._group_by_shard(chunk_keys).items():
+            self._update_shard(shard_path, {k: values[k] for k in shard_keys})
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        if self._parse_chunk_key(key) is None:
+            os.remove(join(self.path, key))
+        else:
+            self.delitems([key])
+
+    def delitems(self, keys):
+        chunk_keys = []
+        for key in keys:
+            if self._parse_chunk_key(key) is None:
+                if os.path.isfile(join(self.path, key)):
+                    os.remove(join(self.path, key))
+            else:
+                chunk_keys.append(key)
+
+        for shard_path, shard_keys in self._group_by_shard(chunk_keys).items():
+            if exists(shard_path):
+                self._update_shard(shard_path, {k: None for k in shard_keys})
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def _shard_keys(self, prefix: str, shard_path: str, shard: List[int]):
+        for index in self._read_shard(shard_path).keys():
+            inner = np.unravel_index(index, self.shards)
+            coords = [s * n + i for s, n, i in zip(shard, self.shards, inner)]
+            yield "/".join([prefix] + [str(c) for c in coords]).lstrip("/")
+
+    def __iter__(self) -> Iterator[str]:
+        for dir_path, dir_names, file_names in os.walk(self.path):
+            rel_dir = os.path.relpath(dir_path, self.path)
+            rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+            for name in file_names:
+                if name.endswith(".tmp") or name == SHARD_META:
+                    continue
+                key = f"{rel_dir}/{name}".lstrip("/")
+                parts = key.split("/")
+                if len(parts) >= 4 and all(p.isdigit() for p in parts[-3:]):
+                    yield from self._shard_keys(
+                        "/".join(parts[:-3]),
+                        join(dir_path, name),
+                        [int(p) for p in parts[-3:]],
+                    )
+                else:
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def listdir(self, path: str = None) -> List[str]:
+        dir_path = self.dir_path(path)
+        if not isdir(dir_path):
+            return []
+        return sorted(n for n in os.listdir(dir_path) if n != SHARD_META)
+
+    def rmdir(self, path: str = None):
+        dir_path = self.dir_path(path)
+        if path in (None, ""):
+            for name in self.listdir():
+                child = join(self.path, name)
+                if isdir(child):
+                    rmtree(child)
+                else:
+                    os.remove(child)
+        elif isdir(dir_path):
+            rmtree(dir_path)
@@ -3,29 +3,52 @@ from __future__ import annotations
 import json
 import logging
 import os
+import socket
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
+from itertools import product
 from math import ceil
 from os.path import exists, join, split
 from shutil import move, rmtree
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple, Union
 
+import dask.array as da
+import numcodecs
 import numpy as np
 import zarr
 from numcodecs import Blosc
+from numcodecs.abc import Codec
 from numpy.typing import ArrayLike
+from ome_zarr.format import CurrentFormat
 from ome_zarr.io import parse_url
 from ome_zarr.scale import Scaler
-from ome_zarr.writer import write_image
+from ome_zarr.writer import write_image, write_multiscales_metadata
 from ruyaml import YAML
 
 from sbem.record.Author import Author
 from sbem.record.Citation import Citation
 from sbem.record.Info import Info
 from sbem.record.ReferenceMixin import ReferenceMixin
+from sbem.storage.ChunkCache import ChunkCache
+from sbem.storage.SectionIndex import SectionIndex
+from sbem.storage.ShardedStore import ShardedStore
+from sbem.storage.volume_utils import (
+    append_journal,
+    chunk_statistics,
+    file_lock,
+    prefetch,
+    read_journal,
+    rechunk_array,
+    suggest_chunks,
+    write_chunks,
+)
 
 if TYPE_CHECKING:  # pragma: no cover
     from typing import List
 
+VOLUME_FORMAT_VERSION = "0.2.0"
+
 
 class Volume(ReferenceMixin, Info):
     def __init__(
@@ -40,47 +63,452 @@ class Volume(ReferenceMixin, Info):
         cite: List[Citation] = [],
         logger=logging,
         save=True,
+        z_indirection: bool = False,
+        origin_margin_chunks: int = 0,
+        n_workers: int = 1,
+        chunks: Union[Tuple[int, int, int], str] = tuple([1, 2744, 2744]),
+        shards: Tuple[int, int, int] = None,
+        cache_bytes: int = 2**28,
+        n_levels: int = 1,
+        journal: bool = False,
+        compact_every: int = 1000,
+        read_only: bool = False,
+        chunk_stats: bool = False,
+        compressor: Union[Codec, List[Codec]] = None,
     ):
+        """
+        :param z_indirection: if True sections are stored in physical z-slots
+            which are decoupled from their logical z-position. Inserting or
+            removing a section then only updates the slot table instead of
+            moving all chunk directories above it.
+        :param origin_margin_chunks: number of empty chunks reserved in -y
+            and -x in front of the first section. Sections at negative
+            offsets within the margin are written without moving existing
+            chunks. The origin is stored as NGFF translation. In contrast to
+            `plan_volume_extent` the margin is given in chunks, not in
+            pixels. A section exceeding the margin still moves all chunks,
+            but the volume then grows by at least max(margin, 1) chunks,
+            doubled on every further overflow of the same axis. Growing in
+            -y/-x therefore moves the chunks only O(log(extent)) times.
+        :param n_workers: number of threads used to compress and write the
+            chunks of a section and to fetch the chunks of a region.
+        :param chunks: (z, y, x) chunk shape of the volume or "auto" to
+            derive a single z-slice chunk shape from the first written
+            section. Inserting and removing sections in the middle of the
+            stack requires chunks with a z-size of 1. Use `rechunk` to
+            convert a finished volume into a layout for orthogonal reads.
+        :param shards: number of chunks per shard file along (z, y, x).
+            If set, chunks are packed into shard files by a `ShardedStore`
+            which reduces the number of files. The z-size has to be 1.
+        :param cache_bytes: byte budget of the LRU cache of decompressed
+            chunks used by `read_region`.
+        :param n_levels: number of multiscale levels. Level l is
+            downsampled by 2**l in y and x and has the chunk shape of level
+            0 divided by 2**l, such that every chunk of level 0 corresponds
+            to exactly one chunk of each lower level. Writing, inserting or
+            removing a section only updates the corresponding chunks.
+        :param journal: if True `save` appends the section operations since
+            the last save to volume.journal.jsonl instead of rewriting
+            volume.yaml. `load` replays the journal on top of volume.yaml.
+        :param compact_every: number of journal entries after which `save`
+            compacts the journal into volume.yaml.
+        :param read_only: open an existing volume without writing anything.
+            The zarr hierarchy is opened from the consolidated metadata
+            written by `save`, such that many readers can open the volume
+            concurrently with a single metadata read. See `Volume.load`.
+        :param chunk_stats: if True summary statistics of every (y, x) chunk
+            of a section are computed from the written data and stored in
+            chunk_stats/<section_num>.npz. See `get_chunk_stats`.
+        :param compressor: numcodecs codec of all levels or a list with one
+            codec per level. Defaults to Blosc zstd with clevel 3 and byte
+            shuffle. See `sbem.storage.benchmark` to compare codecs.
+        """
         super().__init__(name=name, license=license, authors=authors, cite=cite)
+        # Section offsets are stored relative to the origin since 0.2.0.
+        self._format_version = VOLUME_FORMAT_VERSION
         self._description = description
         self._documentation = documentation
         self._root_dir = root_dir
         self.logger = logger
 
-        self._section_list = []
-        self._section_offset_map = {}
-        self._section_shape_map = {}
+        # Offsets, shapes and bounding boxes of the sections and, with
+        # z-indirection, the physical z-slot of every logical z-position.
+        self._index = SectionIndex()
+        self._z_indirection = z_indirection
         self._origin = np.array([0, 0, 0], dtype=int)
+        self._free_slots = []
+        self._origin_margin_chunks = origin_margin_chunks
+        # Minimal number of chunks prepended in z, y and x if a section
+        # exceeds the margin.
+        self._prepend_chunks = [1] + [max(origin_margin_chunks, 1)] * 2
+        self._preallocated = False
+        self._n_workers = n_workers
+        self._n_levels = n_levels
+        self._chunk_cache = ChunkCache(max_bytes=cache_bytes)
+        self._chunks = chunks if chunks == "auto" else tuple(chunks)
+        if compressor is None:
+            compressor = Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE)
+        if isinstance(compressor, Codec):
+            compressor = [compressor] * n_levels
+        assert len(compressor) == n_levels, "One compressor per level required."
+        self._compressors = list(compressor)
+        self._journal = journal
+        self._compact_every = compact_every
+        # Sequence number of the last journal entry and unsaved entries.
+        self._journal_seq = 0
+        self._journal_pending = []
+        self._n_journal_entries = 0
 
         self._data_path = join(self._root_dir, self.get_name(), "ngff_volume.zarr")
+        self._read_only = read_only
+        self._chunk_stats = chunk_stats
 
-        if self._root_dir is not None:
-            os.makedirs(self._data_path, exist_ok=exist_ok)
+        self._shards = None if shards is None else tuple(shards)
+        if read_only:
+            assert not save, "A read-only volume cannot be saved."
+            self.zarr_root = self._open_read_only()
+        else:
+            if self._root_dir is not None:
+                os.makedirs(self._data_path, exist_ok=exist_ok)
 
-        store = parse_url(self._data_path, mode="w").store
-        self.zarr_root = zarr.group(store=store)
+            if self._shards is None:
+                store = parse_url(self._data_path, mode="w").store
+            else:
+                assert self._shards[0] == 1, "Shards must have a z-size of 1."
+                store = ShardedStore(self._data_path, shards=self._shards)
+            self._recover_rechunk()
+            self.zarr_root = zarr.group(store=store)
         self.scaler = Scaler(max_layer=0)
 
         if save:
             self.save()
 
+    def _open_read_only(self) -> zarr.Group:
+        assert exists(self._data_path), f"{self._data_path} does not exist."
+        if self._shards is None:
+            store = CurrentFormat().init_store(self._data_path, mode="r")
+        else:
+            store = ShardedStore(self._data_path, shards=self._shards)
+        if ".zmetadata" in store:
+            return zarr.open_consolidated(store, mode="r")
+        # Volumes saved before metadata was consolidated.
+        return zarr.open_group(store, mode="r")
+
+    def _assert_writable(self):
+        assert not self._read_only, "Volume is opened read-only."
+
+    def _consolidate_metadata(self):
+        """
+        Collect the metadata of the root group and its arrays in
+        .zmetadata. Only the known metadata keys are read, the chunk keys
+        are never listed.
+        """
+        store = self.zarr_root.store
+        keys = [".zgroup", ".zattrs"]
+        for name in self.zarr_root.array_keys():
+            keys.extend([f"{name}/.zarray", f"{name}/.zattrs"])
+        metadata = {k: json.loads(store[k]) for k in keys if k in store}
+        store[".zmetadata"] = json.dumps(
+            {"zarr_consolidated_format": 1, "metadata": metadata}, indent=4
+        ).encode()
+
     def remove_section(self, section_num: int):
-        index = self._section_list.index(section_num)
-        dir_name = join(self.zarr_root.chunk_store.dir_path(), "0")
-        rmtree(join(dir_name, str(index)))
-        shape = self.zarr_root["0"].shape
-        for z in range(index + 1, shape[0]):
-            src = join(dir_name, str(z))
-            dst = join(dir_name, str(z - 1))
+        self._assert_writable()
+        self._chunk_cache.clear()
+        if self._z_indirection:
+            self._remove_slot(section_num)
+            return
+
+        self.remove_sections([section_num])
+
+    def remove_sections(self, section_nums: Iterable[int], n_workers: int = None):
+        """
+        Remove many sections in one pass.
+
+        The final layout is computed once, such that every remaining z-slab
+        is moved at most once and the storage shrinks to the remaining
+        z-slices. The chunks of the removed sections are deleted in
+        parallel.
+
+        With z-indirection the slots of the removed sections are released
+        and the sections in the slots above the remaining number of sections
+        are moved down into the released slots.
+
+        :param section_nums: sections to remove.
+        :param n_workers: number of threads, defaults to the write workers
+            of the volume.
+        """
+        self._assert_writable()
+        self._chunk_cache.clear()
+        section_nums = set(section_nums)
+        for section_num in section_nums:
+            assert section_num in self._index, f"Section {section_num} does not exist."
+        if len(section_nums) == 0:
+            return
+
+        self._assert_single_slice_chunks()
+        n_workers = max(self._n_workers if n_workers is None else n_workers, 1)
+        root = self.zarr_root.chunk_store.dir_path()
+        levels = self._get_levels()
+        if self._z_indirection:
+            removed = [
+                self._index.get_physical(self._index.z_of(s)) for s in section_nums
+            ]
+        else:
+            removed = [self._index.z_of(s) for s in section_nums]
+
+        def remove_slab(path):
+            if exists(path):
+                rmtree(path)
+
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            slabs = [join(root, lv.basename, str(z)) for lv in levels for z in removed]
+            for _ in pool.map(remove_slab, slabs):
+                pass
+
+            # Remove from the top to shift as few offsets as possible.
+            for section_num in sorted(section_nums, key=self._index.z_of)[::-1]:
+                self._remove_from_index(section_num)
+            self._remove_chunk_stats(section_nums)
+
+            if self._z_indirection:
+                n_slices = self._compact_slots(pool)
+            else:
+                n_slices = self._compact_slabs(pool, removed)
+
+        for level in levels:
+            if level.shape[0] != n_slices:
+                self._reshape_multiscale_level(
+                    [n_slices, level.shape[1], level.shape[2]], level
+                )
+        self._free_slots = self._compute_free_slots()
+
+    def _compact_slabs(self, pool: ThreadPoolExecutor, removed: List[int]) -> int:
+        """
+        Close the gaps of the removed z-slabs.
+
+        Slabs are moved in ascending order, such that the target of every
+        move is free. The levels are compacted in parallel.
+
+        :return: new number of z-slices.
+        """
+        removed = set(removed)
+        n_slices = self.zarr_root["0"].shape[0]
+        root = self.zarr_root.chunk_store.dir_path()
+
+        def compact(level):
+            shift = 0
+            for z in range(min(removed), n_slices):
+                if z in removed:
+                    shift += 1
+                elif exists(join(root, level.basename, str(z))):
+                    move(
+                        join(root, level.basename, str(z)),
+                        join(root, level.basename, str(z - shift)),
+                    )
+
+        for _ in pool.map(compact, self._get_levels()):
+            pass
+
+        return n_slices - len(removed)
+
+    def _compact_slots(self, pool: ThreadPoolExecutor) -> int:
+        """
+        Move the sections in the slots above the number of sections into
+        the free slots below.
+
+        :return: new number of z-slots.
+        """
+        z_map = self._index.z_map()
+        n_used = len(self._index.get_used_physical())
+        high = sorted(p for p in z_map if p is not None and p >= n_used)
+        low = sorted(set(range(n_used)) - self._index.get_used_physical())
+        root = self.zarr_root.chunk_store.dir_path()
+
+        def move_slab(path):
+            src, dst = path
             if exists(src):
                 move(src, dst)
-                self._section_offset_map[self._section_list[z]][0] -= 1
 
-        new_shape = [shape[0] - 1, shape[1], shape[2]]
-        self._reshape_multiscale_level(new_shape, self.zarr_root["0"])
-        self._section_list.remove(section_num)
-        self._section_offset_map.pop(section_num)
-        self._section_shape_map.pop(section_num)
+        # Sources and targets are distinct, all moves run in parallel.
+        moves = [
+            (join(root, lv.basename, str(src)), join(root, lv.basename, str(dst)))
+            for lv in self._get_levels()
+            for src, dst in zip(high, low)
+        ]
+        for _ in pool.map(move_slab, moves):
+            pass
+
+        z_of_slot = {p: z for z, p in enumerate(z_map) if p is not None}
+        for src, dst in zip(high, low):
+            z = z_of_slot[src]
+            self._index.set_physical(z, dst)
+            self._log({"op": "slot", "z": z, "slot": dst})
+
+        return n_used
+
+    def check(self, repair: bool = False, n_workers: int = None) -> Dict:
+        """
+        Cross-check the chunk files on disk with the section offsets, shapes
+        and bounding boxes, e.g. after an interrupted write or removal.
+
+        Only directory listings and array metadata are read, no pixel data.
+        The z-directories of all levels are listed in parallel.
+
+        Chunks which are not written because they only contain zeros cannot
+        be told apart from lost chunks. Therefore a section is only reported
+        as missing if it is not empty but has no chunk at all.
+
+        :param repair: delete orphaned slabs and chunks and fix the z-shape
+            of the levels. Missing sections cannot be recovered and have to
+            be written again.
+        :param n_workers: number of threads, defaults to the write workers
+            of the volume.
+        :return: dict with
+            "orphaned_slabs": [(level, z)] z-directories without a section,
+            "orphaned_chunks": [(level, z, y, x)] chunk files outside of the
+            bounding box of their section,
+            "missing_sections": [section_num] non-empty sections without any
+            chunk,
+            "shape_mismatch": [level] levels with a wrong z-shape.
+        """
+        report = {
+            "orphaned_slabs": [],
+            "orphaned_chunks": [],
+            "missing_sections": [],
+            "shape_mismatch": [],
+        }
+        if "0" not in self.zarr_root:
+            return report
+
+        n_workers = max(self._n_workers if n_workers is None else n_workers, 1)
+        expected = self._expected_chunk_boxes()
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            listings = list(pool.map(self._list_slab, self._list_slabs()))
+        self._classify_listings(listings, expected, report)
+
+        if self._z_indirection:
+            n_slices = max(expected.keys(), default=-1) + 1
+        else:
+            n_slices = len(self._index)
+        report["shape_mismatch"] = self._shape_mismatches(n_slices)
+
+        report["orphaned_slabs"].sort()
+        report["orphaned_chunks"].sort()
+        if repair:
+            self._repair(report, n_slices)
+        return report
+
+    def _expected_chunk_boxes(self) -> Dict:
+        """
+        :return: physical z -> (section_num, [y_min, x_min, y_max, x_max])
+            of the chunk files covering the section bounding box, None for
+            empty sections. Files are named by chunk or, if sharded, by
+            shard index.
+        """
+        unit = np.array(self.zarr_root["0"].chunks[1:])
+        if self._shards is not None:
+            unit = unit * np.array(self._shards[1:])
+
+        expected = {}
+        for section_num in self._index.section_nums():
+            z = self.get_physical_z(section_num)
+            expected[z] = (section_num, self._section_chunk_box(section_num, unit))
+        return expected
+
+    def _section_chunk_box(self, section_num: int, unit) -> List[int]:
+        """
+        :param unit: (y, x) size of a chunk or shard of level 0.
+        :return: [y_min, x_min, y_max, x_max] index range of the chunks or
+            shards of level 0 covering the bounding box of the section, None
+            for empty sections. Level l has the same chunk indices.
+        """
+        bbox = self.get_section_bbox(section_num)
+        if bbox is None:
+            return None
+        pos = np.array(self._storage_offsets(self._index.get_offsets(section_num)))
+        start = (pos[1:] + bbox[:2]) // unit
+        stop = -(-(pos[1:] + bbox[2:]) // unit)
+        return [int(i) for i in start] + [int(i) for i in stop]
+
+    def _list_slabs(self) -> List[Tuple[int, int]]:
+        """
+        :return: (level, z) of all z-directories on disk.
+        """
+        root = self.zarr_root.chunk_store.dir_path()
+        return [
+            (level, int(name))
+            for level, lv in enumerate(self._get_levels())
+            if exists(join(root, lv.basename))
+            for name in os.listdir(join(root, lv.basename))
+            if name.isdigit()
+        ]
+
+    def _list_slab(self, slab: Tuple[int, int]):
+        """
+        :return: level, z and the (y, x) names of the chunk files of a
+            z-directory.
+        """
+        level, z = slab
+        root = self.zarr_root.chunk_store.dir_path()
+        slab_dir = join(root, self._get_levels()[level].basename, str(z))
+        files = []
+        for dir_path, _, file_names in os.walk(slab_dir):
+            for name in file_names:
+                rel = os.path.relpath(join(dir_path, name), slab_dir)
+                parts = rel.split(os.sep)
+                if len(parts) == 2 and all(p.isdigit() for p in parts):
+                    files.append(tuple(int(p) for p in parts))
+        return level, z, files
+
+    @staticmethod
+    def _classify_listings(listings, expected: Dict, report: Dict):
+        """
+        Add the orphaned slabs and chunks and the missing sections to
+        `report`.
+        """
+        has_chunks = set()
+        for level, z, files in listings:
+            if z not in expected:
+                report["orphaned_slabs"].append((level, z))
+                continue
+            section_num, box = expected[z]
+            for y, x in files:
+                if box is None or not (box[0] <= y < box[2] and box[1] <= x < box[3]):
+                    report["orphaned_chunks"].append((level, z, y, x))
+                elif level == 0:
+                    has_chunks.add(section_num)
+
+        report["missing_sections"] = sorted(
+            s for s, box in expected.values() if box is not None and s not in has_chunks
+        )
+
+    def _shape_mismatches(self, n_slices: int) -> List[int]:
+        """
+        :return: levels with a z-shape which does not match `n_slices`.
+            With z-indirection the levels may contain unused slots.
+        """
+        mismatches = []
+        for level, lv in enumerate(self._get_levels()):
+            too_small = lv.shape[0] < n_slices
+            if too_small or (not self._z_indirection and lv.shape[0] != n_slices):
+                mismatches.append(level)
+        return mismatches
+
+    def _repair(self, report: Dict, n_slices: int):
+        self._assert_writable()
+        self._chunk_cache.clear()
+        root = self.zarr_root.chunk_store.dir_path()
+        levels = self._get_levels()
+        for level, z in report["orphaned_slabs"]:
+            rmtree(join(root, levels[level].basename, str(z)))
+        for level, z, y, x in report["orphaned_chunks"]:
+            os.remove(join(root, levels[level].basename, str(z), str(y), str(x)))
+        for level in report["shape_mismatch"]:
+            lv = levels[level]
+            self._reshape_multiscale_level([n_slices, lv.shape[1], lv.shape[2]], lv)
+        if len(report["shape_mismatch"]) > 0:
+            self._free_slots = self._compute_free_slots()
 
     def append_section(
         self,
@@ -88,15 +516,11 @@ class Volume(ReferenceMixin, Info):
         data: ArrayLike,
         relative_offsets: Tuple[int, int, int] = tuple([1, 0, 0]),
     ):
-        if len(self._section_list) == 0:
+        previous_section_num = self._index.last_section()
+        if previous_section_num is None:
             self.write_section(section_num=section_num, data=data)
         else:
-            previous_section_num = None
-            i = -1
-            while previous_section_num is None:
-                previous_section_num = self._section_list[i]
-                i -= 1
-            previous_offsets = self._section_offset_map[previous_section_num]
+            previous_offsets = self._index.get_offsets(previous_section_num)
             total_offsets = tuple(
                 [
                     int(previous_offsets[0] + relative_offsets[0]),
@@ -108,6 +532,33 @@ class Volume(ReferenceMixin, Info):
                 section_num=section_num, data=data, offsets=total_offsets
             )
 
+    def append_sections(
+        self,
+        sections: Iterable[Tuple[int, ArrayLike, Tuple[int, int, int]]],
+        queue_size: int = 2,
+    ):
+        """
+        Append a stream of sections.
+
+        The iterable is advanced on a background thread, such that rendering
+        section N+1 overlaps with compressing and writing section N. At most
+        `queue_size` rendered sections are buffered.
+
+        :param sections: iterable of (section_num, data, relative_offsets).
+        :param queue_size: maximum number of sections waiting to be written.
+        :return: list of the appended section numbers.
+        """
+        appended = []
+        for section_num, data, relative_offsets in prefetch(sections, queue_size):
+            self.append_section(
+                section_num=section_num,
+                data=data,
+                relative_offsets=relative_offsets,
+            )
+            appended.append(section_num)
+
+        return appended
+
     def write_section(
         self,
         section_num: int,
@@ -115,65 +566,597 @@ class Volume(ReferenceMixin, Info):
         offsets: Tuple[int, int, int] = tuple([0, 0, 0]),
     ):
         """
+        Write a section at `offsets`. An existing section at the z-position
+        and the sections above are shifted by one. Empty z-positions of a
+        preallocated volume are filled in place.
 
         :param section_num:
         :param data:
         :param offsets: to volume origin
         :return:
         """
-        assert section_num not in self._section_list, (
+        assert section_num not in self._index, (
             f"Section " f"{section_num} exists already."
         )
         assert offsets[0] >= 0, "Z offset has to be >= 0."
-        self._section_offset_map[section_num] = np.array(offsets)
-        self._section_shape_map[section_num] = data.shape
+        self._assert_writable()
+        self._chunk_cache.clear()
+        if self._z_indirection:
+            self._write_to_slot(section_num, data, offsets)
+            self._write_chunk_stats(section_num, data, offsets)
+            return
+
+        # Only preallocated volumes fill empty z-positions in place.
+        fill = self._preallocated and self._is_empty_slot(offsets[0])
         # insert should be possible with moving dirs on filesystem
-        if len(self._section_list) == 0:
-            assert len(data.shape) == 3
-            write_image(
-                image=data,
-                group=self.zarr_root,
-                scaler=self.scaler,
-                axes="zyx",
-                storage_options=dict(
-                    chunks=(1, 2744, 2744),
-                    compressor=Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE),
-                    overwrite=True,
-                ),
-            )
+        if len(self._index) == 0:
+            self._write_first_section(data, offsets)
         else:
-            if offsets[0] >= len(self._section_list):
-                # append in Z
-                self._reshape_storage(offsets, data.shape)
+            pos = self._storage_offsets(offsets)
+            if offsets[0] >= len(self._index) or fill:
+                # append in Z or fill an empty z-slice
+                self._reshape_storage(pos, data.shape)
 
-                data = self._pad_data(offsets, data)
+                # The origin may have moved to fit negative offsets.
+                pos = self._storage_offsets(offsets)
+                slices = self._compute_slices(pos, data.shape)
 
-                slices = self._compute_slices(offsets, data.shape)
-
-                self.zarr_root["0"][tuple(slices)] = data
+                self._write_data(tuple(slices), data)
             else:
                 # insert into stack
+                self._assert_single_slice_chunks()
                 self._reshape_storage(
-                    offsets=tuple([len(self._section_list), offsets[1], offsets[2]]),
+                    offsets=tuple([len(self._index), pos[1], pos[2]]),
                     shape=data.shape,
                 )
 
-                data = self._pad_data(offsets, data)
-
-                slices = self._compute_slices(offsets, data.shape)
+                pos = self._storage_offsets(offsets)
+                slices = self._compute_slices(pos, data.shape)
 
                 # move slices above
-                for z in range(len(self._section_list), offsets[0], -1):
-                    src = join(self.zarr_root.chunk_store.dir_path(), "0", str(z - 1))
-                    dst = join(self.zarr_root.chunk_store.dir_path(), "0", str(z))
-                    move(src, dst)
-                    self._section_offset_map[self._section_list[z - 1]][0] += 1
+                for z in range(len(self._index), offsets[0], -1):
+                    for level in self._get_levels():
+                        dir_name = join(
+                            self.zarr_root.chunk_store.dir_path(), level.basename
+                        )
+                        if exists(join(dir_name, str(z - 1))):
+                            move(join(dir_name, str(z - 1)), join(dir_name, str(z)))
+
+                self._write_data(tuple(slices), data)
+
+        self._add_to_index(section_num, offsets, data.shape, self._compute_bbox(data))
+        self._write_chunk_stats(section_num, data, offsets)
+
+    def _add_to_index(self, section_num, offsets, shape, bbox, slot=None, log=True):
+        """
+        Register a section at the z-position `offsets[0]`. In a
+        preallocated volume an empty z-position is filled, otherwise the
+        section is inserted and the sections above are shifted by one.
+        """
+        self._index.add(
+            section_num, offsets, shape, bbox, physical=slot, fill=self._preallocated
+        )
 
-                self.zarr_root["0"][tuple(slices)] = data
+        if log:
+            self._log(
+                {
+                    "op": "add",
+                    "section_num": section_num,
+                    "offsets": [int(o) for o in offsets],
+                    "shape": [int(s) for s in shape],
+                    "bbox": bbox,
+                    "slot": slot,
+                }
+            )
+
+    def _remove_from_index(self, section_num, log=True):
+        """
+        Unregister a section and shift the sections above down by one.
+        """
+        self._index.remove(section_num)
+
+        if log:
+            self._log({"op": "remove", "section_num": section_num})
+
+    def _log(self, entry):
+        if self._journal:
+            self._journal_seq += 1
+            entry["seq"] = self._journal_seq
+            self._journal_pending.append(entry)
 
-        for i in range(len(self._section_list), offsets[0]):
-            self._section_list.insert(i, None)
-        self._section_list.insert(offsets[0], section_num)
+    def _apply_journal_entry(self, entry):
+        if entry["op"] == "add":
+            self._add_to_index(
+                entry["section_num"],
+                entry["offsets"],
+                entry["shape"],
+                entry["bbox"],
+                slot=entry["slot"],
+                log=False,
+            )
+        elif entry["op"] == "remove":
+            self._remove_from_index(entry["section_num"], log=False)
+        elif entry["op"] == "origin":
+            self._origin = np.array(entry["origin"])
+            self._prepend_chunks = list(
+                entry.get("prepend_chunks", self._prepend_chunks)
+            )
+        elif entry["op"] == "preallocate":
+            self._index = SectionIndex()
+            self._index.resize(entry["n_slices"])
+            self._preallocated = True
+        elif entry["op"] == "chunks":
+            self._chunks = tuple(entry["chunks"])
+        elif entry["op"] == "slot":
+            self._index.set_physical(entry["z"], entry["slot"])
+        else:
+            raise RuntimeError(f"Unknown journal operation {entry['op']}.")
+
+    def _assert_single_slice_chunks(self):
+        assert self.zarr_root["0"].chunks[0] == 1, (
+            "Moving sections requires chunks with a z-size of 1. "
+            "Rechunk the volume to (1, y, x) chunks first."
+        )
+
+    def _resolve_chunks(self, section_shape, dtype):
+        if self._chunks == "auto":
+            self._chunks = suggest_chunks(section_shape, dtype=dtype)
+        return self._chunks
+
+    def get_compressor(self, level: int = 0) -> Codec:
+        return self._compressors[level]
+
+    def get_chunks(self) -> Tuple[int, int, int]:
+        if "0" in self.zarr_root:
+            return self.zarr_root["0"].chunks
+        return self._chunks
+
+    def rechunk(
+        self,
+        chunks: Tuple[int, int, int],
+        max_memory: int = 2**30,
+        n_workers: int = None,
+    ):
+        """
+        Convert the stored volume to a new chunk shape.
+
+        The data is copied out-of-core into a new array which replaces the
+        existing one. At most `max_memory` bytes of uncompressed data are
+        held in memory.
+
+        :param chunks: new (z, y, x) chunk shape of level 0.
+        :param max_memory: upper bound of bytes held in memory.
+        :param n_workers: number of threads, defaults to the write workers
+            of the volume.
+        """
+        self._assert_writable()
+        root = self.zarr_root.chunk_store.dir_path()
+        yx_chunks = self.zarr_root["0"].chunks[1:]
+        for level, src in enumerate(self._get_levels()):
+            factor = 2**level
+            dst = self.zarr_root.create_dataset(
+                f"{level}_rechunked",
+                shape=src.shape,
+                chunks=tuple([chunks[0], chunks[1] // factor, chunks[2] // factor]),
+                dtype=src.dtype,
+                compressor=src.compressor,
+                fill_value=src.fill_value,
+                dimension_separator="/",
+                overwrite=True,
+                write_empty_chunks=False,
+            )
+            rechunk_array(
+                src,
+                dst,
+                max_memory=max_memory,
+                n_workers=self._n_workers if n_workers is None else n_workers,
+            )
+
+            # The old array is only deleted once the new one is in place, see
+            # `_recover_rechunk`.
+            os.replace(join(root, str(level)), join(root, f"{level}_old"))
+            os.replace(join(root, f"{level}_rechunked"), join(root, str(level)))
+            rmtree(join(root, f"{level}_old"))
+        self._chunks = tuple(chunks)
+        self._log({"op": "chunks", "chunks": list(self._chunks)})
+        self._chunk_cache.clear()
+        if self._chunk_stats and tuple(chunks[1:]) != yx_chunks:
+            # Statistics are computed per (y, x) chunk.
+            self.update_chunk_stats()
+
+    def _recover_rechunk(self):
+        """
+        Clean up the arrays left by a `rechunk` which was interrupted.
+
+        If a level was moved to `<level>_old` but its rechunked array was
+        not moved into place yet, the old level is restored. Otherwise the
+        leftover `<level>_old` or incomplete `<level>_rechunked` array is
+        deleted.
+        """
+        if not exists(self._data_path):
+            return
+        for name in sorted(os.listdir(self._data_path)):
+            level, _, suffix = name.rpartition("_")
+            if suffix not in ("old", "rechunked"):
+                continue
+            path = join(self._data_path, name)
+            if suffix == "old" and not exists(join(self._data_path, level)):
+                self.logger.warning(f"Restore level {level} of interrupted rechunk.")
+                os.replace(path, join(self._data_path, level))
+            elif exists(path):
+                rmtree(path)
+
+    def set_n_workers(self, n_workers: int):
+        self._n_workers = n_workers
+
+    @staticmethod
+    def _compute_bbox(data: ArrayLike):
+        mask = np.any(data != 0, axis=0)
+        rows = np.flatnonzero(mask.any(axis=1))
+        if len(rows) == 0:
+            return None
+        cols = np.flatnonzero(mask.any(axis=0))
+        return [int(rows[0]), int(cols[0]), int(rows[-1]) + 1, int(cols[-1]) + 1]
+
+    def get_section_bbox(self, section_num: int):
+        """
+        Get the bounding box of the non-zero pixels of a section.
+
+        :param section_num:
+        :return: [y_min, x_min, y_max, x_max] relative to the first pixel of
+            the section or None if the section is empty.
+        """
+        if self._index.has_bbox(section_num):
+            return self._index.get_bbox(section_num)
+        # Volumes written before bounding boxes were tracked.
+        _, ys, xs = self._index.get_shape(section_num)
+        return [0, 0, ys, xs]
+
+    def _chunk_stats_path(self, section_num: int) -> str:
+        return join(self.get_dir(), "chunk_stats", f"{section_num}.npz")
+
+    def _write_chunk_stats(self, section_num: int, data: ArrayLike, offsets):
+        if not self._chunk_stats:
+            return
+        chunks = np.array(self.zarr_root["0"].chunks[1:])
+        pos = self._storage_offsets(offsets)
+        stats = chunk_statistics(data, pos[1:], chunks, n_workers=self._n_workers)
+        # Chunk indices relative to the origin are not changed by chunks
+        # prepended in front of the origin.
+        stats["chunk_start"] -= self._origin[1:] // chunks
+
+        path = self._chunk_stats_path(section_num)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **stats)
+        os.replace(tmp_path, path)
+
+    def _remove_chunk_stats(self, section_nums: Iterable[int]):
+        for section_num in section_nums:
+            if exists(self._chunk_stats_path(section_num)):
+                os.remove(self._chunk_stats_path(section_num))
+
+    def update_chunk_stats(self):
+        """
+        Recompute the chunk statistics of all sections from the stored data,
+        e.g. for volumes written without statistics.
+        """
+        self._assert_writable()
+        self._chunk_stats = True
+        for section_num in self._index.section_nums():
+            self._write_chunk_stats(
+                section_num,
+                self.get_section_data(section_num),
+                self._index.get_offsets(section_num),
+            )
+
+    def get_chunk_stats(self, section_num: int) -> Dict[str, np.ndarray]:
+        """
+        Get the summary statistics of the (y, x) chunks of level 0 covered by
+        a section without reading pixel data.
+
+        :return: dict with "chunk_start", the zarr (y, x) chunk index of the
+            first chunk, "value_range" of the histogram and per chunk
+            "min", "max", "mean", "nonzero" (fraction of non-zero pixels)
+            and "histogram" (counts of the non-zero pixels).
+        """
+        path = self._chunk_stats_path(section_num)
+        assert exists(path), (
+            f"Section {section_num} has no chunk statistics, compute them "
+            f"with `update_chunk_stats`."
+        )
+        with np.load(path) as f:
+            stats = dict(f)
+        chunks = np.array(self.zarr_root["0"].chunks[1:])
+        stats["chunk_start"] = stats["chunk_start"] + self._origin[1:] // chunks
+        return stats
+
+    def get_contrast_range(
+        self, section_nums: Iterable[int] = None, saturation: float = 0.005
+    ) -> Tuple[float, float]:
+        """
+        Estimate a display range from the chunk histograms.
+
+        :param section_nums: sections to include, defaults to all sections.
+        :param saturation: fraction of non-zero pixels below and above the
+            range.
+        :return: (min, max) bin edges.
+        """
+        if section_nums is None:
+            section_nums = self._index.section_nums()
+        section_nums = list(section_nums)
+        assert len(section_nums) > 0, "No sections to compute the range from."
+        histogram = None
+        for section_num in section_nums:
+            stats = self.get_chunk_stats(section_num)
+            counts = stats["histogram"].reshape(-1, stats["histogram"].shape[-1])
+            if histogram is None:
+                histogram = counts.sum(axis=0)
+                value_range = stats["value_range"]
+            else:
+                histogram += counts.sum(axis=0)
+
+        edges = np.linspace(value_range[0], value_range[1], len(histogram) + 1)
+        cumulative = np.cumsum(histogram)
+        total = cumulative[-1]
+        lo = np.searchsorted(cumulative, saturation * total, side="right")
+        hi = np.searchsorted(cumulative, (1 - saturation) * total)
+        return float(edges[lo]), float(edges[min(hi + 1, len(histogram))])
+
+    def _write_data(self, slices, data: ArrayLike):
+        # Chunks which only contain the fill value are not stored.
+        storage = zarr.Array(self.zarr_root.store, path="0", write_empty_chunks=False)
+        block_shape = None
+        if self._shards is not None:
+            block_shape = tuple(c * s for c, s in zip(storage.chunks, self._shards))
+        write_chunks(
+            storage,
+            slices,
+            data,
+            n_workers=self._n_workers,
+            block_shape=block_shape,
+        )
+        self._update_pyramid(slices)
+
+    def _get_levels(self) -> List[zarr.Array]:
+        return [self.zarr_root[str(level)] for level in range(self._n_levels)]
+
+    @staticmethod
+    def _level_shape(shape, level: int):
+        factor = 2**level
+        return [shape[0], ceil(shape[1] / factor), ceil(shape[2] / factor)]
+
+    def _create_lower_levels(self):
+        """
+        Create the downsampled levels for level 0 and write the multiscales
+        metadata of all levels.
+        """
+        storage = self.zarr_root["0"]
+        for level in range(1, self._n_levels):
+            factor = 2**level
+            assert (
+                storage.chunks[1] % factor == 0 and storage.chunks[2] % factor == 0
+            ), f"Chunk shape {storage.chunks} is not divisible by {factor}."
+            self.zarr_root.create_dataset(
+                str(level),
+                shape=self._level_shape(storage.shape, level),
+                chunks=tuple(
+                    [
+                        storage.chunks[0],
+                        storage.chunks[1] // factor,
+                        storage.chunks[2] // factor,
+                    ]
+                ),
+                dtype=storage.dtype,
+                compressor=self._compressors[level],
+                dimension_separator="/",
+                overwrite=True,
+            )
+
+        write_multiscales_metadata(
+            self.zarr_root,
+            datasets=[
+                {
+                    "path": str(level),
+                    "coordinateTransformations": [
+                        {
+                            "type": "scale",
+                            "scale": [1.0, float(2**level), float(2**level)],
+                        }
+                    ],
+                }
+                for level in range(self._n_levels)
+            ],
+            axes="zyx",
+        )
+
+    def _update_pyramid(self, slices):
+        """
+        Recompute the chunks of the lower levels which correspond to the
+        chunks of level 0 touched by `slices`.
+        """
+        if self._n_levels == 1:
+            return
+
+        chunks = self.zarr_root["0"].chunks
+        keys = list(
+            product(
+                *[
+                    range(s.start // c, (s.stop - 1) // c + 1)
+                    for s, c in zip(slices, chunks)
+                ]
+            )
+        )
+        for level in range(1, self._n_levels):
+            src = self.zarr_root[str(level - 1)]
+            dst = zarr.Array(
+                self.zarr_root.store, path=str(level), write_empty_chunks=False
+            )
+
+            def downsample(key):
+                dst.set_block_selection(key, src.get_block_selection(key)[:, ::2, ::2])
+
+            with ThreadPoolExecutor(max_workers=max(self._n_workers, 1)) as pool:
+                for _ in pool.map(downsample, keys):
+                    pass
+
+    def _is_empty_slot(self, z: int) -> bool:
+        return self._index.is_empty(z)
+
+    def preallocate(
+        self,
+        shape: Tuple[int, int, int],
+        origin: Tuple[int, int, int] = tuple([0, 0, 0]),
+        dtype=np.uint8,
+    ):
+        """
+        Create the storage with its final shape before any section is
+        written.
+
+        All z-positions are empty and are filled in place by
+        `write_section`. Only preallocated volumes fill empty z-positions,
+        in all other volumes `write_section` inserts the section and shifts
+        the sections above. Sections which fit into the preallocated extent are
+        written without reshaping the storage or moving chunks. Chunks are
+        only created when data is written to them.
+
+        :param shape: (z, y, x) shape of the volume.
+        :param origin: zarr index of the volume origin. The z-origin has to
+            be 0. See `sbem.storage.volume_utils.plan_volume_extent` to
+            compute shape and origin from the tiles of a sample.
+        :param dtype: of the volume.
+        """
+        assert len(self._index) == 0, "Volume contains sections."
+        self._assert_writable()
+        self._chunk_cache.clear()
+        assert origin[0] == 0, "Z origin has to be 0."
+        self.zarr_root.create_dataset(
+            "0",
+            shape=tuple(shape),
+            chunks=self._resolve_chunks(shape[1:], dtype),
+            dtype=dtype,
+            compressor=self._compressors[0],
+            dimension_separator="/",
+            overwrite=True,
+        )
+        self._create_lower_levels()
+        self._set_origin(origin)
+        self._index.resize(shape[0])
+        self._preallocated = True
+        if self._z_indirection:
+            self._free_slots = list(range(shape[0]))
+        self._log({"op": "preallocate", "n_slices": int(shape[0])})
+
+    def _write_first_section(self, data: ArrayLike, offsets):
+        assert len(data.shape) == 3
+        write_image(
+            image=data,
+            group=self.zarr_root,
+            scaler=self.scaler,
+            axes="zyx",
+            storage_options=dict(
+                chunks=self._resolve_chunks(data.shape[1:], data.dtype),
+                write_empty_chunks=False,
+                compressor=self._compressors[0],
+                overwrite=True,
+            ),
+        )
+        if self._n_levels > 1:
+            self._create_lower_levels()
+            self._update_pyramid(tuple(slice(0, s) for s in data.shape))
+        # The first section defines the storage position of the origin.
+        self._set_origin([0, -offsets[1], -offsets[2]])
+        if self._origin_margin_chunks > 0:
+            storage = self.zarr_root["0"]
+            self._reshape_storage(
+                offsets=tuple(
+                    [0] + [-self._origin_margin_chunks * c for c in storage.chunks[1:]]
+                ),
+                shape=storage.shape,
+                amortise=False,
+            )
+
+    def _storage_offsets(self, offsets) -> Tuple[int, int, int]:
+        """
+        Convert offsets relative to the volume origin into zarr indices.
+        """
+        return tuple(
+            [
+                int(offsets[0]),
+                int(self._origin[1] + offsets[1]),
+                int(self._origin[2] + offsets[2]),
+            ]
+        )
+
+    def _allocate_slot(self, z: int = None) -> int:
+        if z in self._free_slots:
+            # Keep logical and physical z aligned where possible.
+            self._free_slots.remove(z)
+            return z
+        elif len(self._free_slots) > 0:
+            return self._free_slots.pop(0)
+        elif "0" in self.zarr_root:
+            return self.zarr_root["0"].shape[0]
+        else:
+            return 0
+
+    def _write_to_slot(self, section_num: int, data: ArrayLike, offsets):
+        """
+        Write a section into a free physical z-slot and register it at the
+        logical z-position `offsets[0]`. Sections above are only shifted in
+        the slot table.
+        """
+        slot = self._allocate_slot(offsets[0])
+        self._add_to_index(
+            section_num, offsets, data.shape, self._compute_bbox(data), slot=slot
+        )
+
+        if "0" not in self.zarr_root or self.zarr_root["0"].shape[0] == 0:
+            self._write_first_section(data, offsets)
+        else:
+            pos = self._storage_offsets(offsets)
+            self._reshape_storage(tuple([slot, pos[1], pos[2]]), data.shape)
+            pos = self._storage_offsets(offsets)
+            slices = self._compute_slices(tuple([slot, pos[1], pos[2]]), data.shape)
+            self._write_data(tuple(slices), data)
+
+    def _remove_slot(self, section_num: int):
+        self._assert_single_slice_chunks()
+        slot = self._index.get_physical(self._index.z_of(section_num))
+        for level in self._get_levels():
+            slot_dir = join(
+                self.zarr_root.chunk_store.dir_path(), level.basename, str(slot)
+            )
+            if exists(slot_dir):
+                rmtree(slot_dir)
+
+        self._remove_from_index(section_num)
+        self._remove_chunk_stats([section_num])
+
+        # Release the slot and shrink the storage if the top slots are free.
+        self._free_slots.append(slot)
+        storage = self.zarr_root["0"]
+        n_slots = storage.shape[0]
+        while n_slots - 1 in self._free_slots:
+            self._free_slots.remove(n_slots - 1)
+            n_slots -= 1
+        self._free_slots.sort()
+        if n_slots != storage.shape[0]:
+            for level in self._get_levels():
+                self._reshape_multiscale_level(
+                    [n_slots, level.shape[1], level.shape[2]], level
+                )
+
+    def get_physical_z(self, section_num: int) -> int:
+        """
+        Get the z-index of a section in the zarr array.
+        """
+        z = self._index.z_of(section_num)
+        if not self._z_indirection:
+            return z
+        else:
+            return self._index.get_physical(z)
 
     def _extend(self, n_chunks, axis, z_level):
         if n_chunks < 0:
@@ -206,7 +1189,11 @@ class Volume(ReferenceMixin, Info):
             chunks.sort(reverse=True)
             for c in chunks:
                 dir_name, chunk = split(c)
-                move(c, join(dir_name, str(int(chunk) + abs(n_chunks))))
+                shift = abs(n_chunks)
+                if self._shards is not None:
+                    # Shard files are named by shard index.
+                    shift = shift // self._shards[axis]
+                move(c, join(dir_name, str(int(chunk) + shift)))
 
     def _reshape_multiscale_level(self, new_shape, level):
         with open(
@@ -223,6 +1210,7 @@ class Volume(ReferenceMixin, Info):
             json.dump(array_dict, f, indent=4)
 
     def to_dict(self):
+        index = self._index.to_dict(z_indirection=self._z_indirection)
         return {
             "name": self.get_name(),
             "root_dir": self._root_dir,
@@ -233,24 +1221,71 @@ class Volume(ReferenceMixin, Info):
             "authors": [a.to_dict() for a in self._authors],
             "cite": [c.to_dict() for c in self._cite],
             "data": self._data_path,
-            "sections": self._section_list,
-            "offsets": {k: v.tolist() for k, v in self._section_offset_map.items()},
-            "shapes": self._section_shape_map,
+            "sections": index["sections"],
+            "offsets": index["offsets"],
+            "shapes": index["shapes"],
+            "bboxes": index["bboxes"],
             "origin": [int(o) for o in self._origin],
+            "z_map": index["z_map"],
+            "origin_margin_chunks": self._origin_margin_chunks,
+            "prepend_chunks": list(self._prepend_chunks),
+            "preallocated": self._preallocated,
+            "chunks": self._chunks if self._chunks == "auto" else list(self._chunks),
+            "shards": None if self._shards is None else list(self._shards),
+            "n_levels": self._n_levels,
+            "journal": self._journal,
+            "journal_seq": self._journal_seq,
+            "chunk_stats": self._chunk_stats,
+            "compressors": [c.get_config() for c in self._compressors],
         }
 
     def _dump(self, out_path: str):
         yaml = YAML(typ="rt")
-        with open(join(out_path, "volume.yaml"), "w") as f:
+        tmp_path = join(out_path, "volume.yaml.tmp")
+        with open(tmp_path, "w") as f:
             yaml.dump(self.to_dict(), f)
+        # A crash while dumping must not destroy the snapshot of the journal.
+        os.replace(tmp_path, join(out_path, "volume.yaml"))
 
     def save(self):
+        self._assert_writable()
         out_path = join(self._root_dir, self.get_name())
         os.makedirs(out_path, exist_ok=True)
+        snapshot = join(out_path, "volume.yaml")
+        if not self._journal or not exists(snapshot):
+            self.compact()
+            return
+
+        journal = join(out_path, "volume.journal.jsonl")
+        append_journal(journal, self._journal_pending)
+        self._consolidate_metadata()
+        self._n_journal_entries += len(self._journal_pending)
+        self._journal_pending = []
+        if self._n_journal_entries >= self._compact_every:
+            self.compact()
+
+    def compact(self):
+        """
+        Write the full metadata to volume.yaml and drop the journal.
+        """
+        self._assert_writable()
+        out_path = join(self._root_dir, self.get_name())
+        os.makedirs(out_path, exist_ok=True)
+        self._consolidate_metadata()
         self._dump(out_path=out_path)
+        journal = join(out_path, "volume.journal.jsonl")
+        if exists(journal):
+            os.remove(journal)
+        self._journal_pending = []
+        self._n_journal_entries = 0
 
     @staticmethod
-    def load(path: str) -> Volume:
+    def load(path: str, read_only: bool = False) -> Volume:
+        """
+        :param path: to volume.yaml.
+        :param read_only: open the volume without any writes, e.g. from many
+            concurrent analysis workers.
+        """
         yaml = YAML(typ="rt")
         with open(path) as f:
             data = yaml.load(f)
@@ -271,14 +1306,292 @@ class Volume(ReferenceMixin, Info):
                 for d in data["cite"]
             ],
             save=False,
+            z_indirection=data.get("z_map", None) is not None,
+            origin_margin_chunks=data.get(
+                "origin_margin_chunks", data.get("origin_margin", 0)
+            ),
+            chunks=data.get("chunks", tuple([1, 2744, 2744])),
+            shards=data.get("shards", None),
+            n_levels=data.get("n_levels", 1),
+            journal=data.get("journal", False),
+            read_only=read_only,
+            chunk_stats=data.get("chunk_stats", False),
+            compressor=(
+                [numcodecs.get_codec(dict(c)) for c in data["compressors"]]
+                if "compressors" in data
+                else None
+            ),
         )
-        vol._section_list = data["sections"]
-        vol._section_offset_map = {k: np.array(v) for k, v in data["offsets"].items()}
-        vol._section_shape_map = {k: tuple(v) for k, v in data["shapes"].items()}
-        vol._origin = np.array(data["origin"])
+        vol._set_sections(data)
+        vol._replay_journal()
         return vol
 
-    def _reshape_storage(self, offsets, shape):
+    def _replay_journal(self):
+        """
+        Apply the journal entries which are newer than volume.yaml.
+        """
+        journal = join(self.get_dir(), "volume.journal.jsonl")
+        entries = read_journal(journal) if exists(journal) else []
+        for entry in entries:
+            if entry["seq"] > self._journal_seq:
+                self._apply_journal_entry(entry)
+                self._journal_seq = entry["seq"]
+        self._n_journal_entries = len(entries)
+        self._journal_pending = []
+        self._free_slots = self._compute_free_slots()
+
+    def _set_sections(self, data):
+        """
+        Restore the section bookkeeping from a `to_dict` representation.
+        """
+        if data.get("format_version", "0.1.0") == "0.1.0":
+            # Offsets were stored as zarr indices.
+            origin = data["origin"]
+            data["offsets"] = {
+                k: [o[0], o[1] - origin[1], o[2] - origin[2]]
+                for k, o in data["offsets"].items()
+            }
+        self._index = SectionIndex.from_dict(data)
+        self._origin = np.array(data["origin"])
+        self._prepend_chunks = list(
+            data.get("prepend_chunks", [1] + [max(self._origin_margin_chunks, 1)] * 2)
+        )
+        self._preallocated = data.get("preallocated", False)
+        self._journal_seq = data.get("journal_seq", 0)
+        self._free_slots = self._compute_free_slots()
+
+    def _compute_free_slots(self) -> List[int]:
+        if not self._z_indirection:
+            return []
+        used = self._index.get_used_physical()
+        n_slots = self.zarr_root["0"].shape[0] if "0" in self.zarr_root else 0
+        return [i for i in range(n_slots) if i not in used]
+
+    def lock(self):
+        """
+        Exclusive lock of the volume metadata across processes.
+
+        Usage:
+            with vol.lock():
+                vol.reload()
+                ...
+                vol.save()
+        """
+        os.makedirs(self.get_dir(), exist_ok=True)
+        return file_lock(join(self.get_dir(), "volume.lock"))
+
+    def reload(self):
+        """
+        Re-read the section bookkeeping from volume.yaml, e.g. after another
+        process updated it.
+        """
+        yaml = YAML(typ="rt")
+        with open(join(self.get_dir(), "volume.yaml")) as f:
+            self._set_sections(yaml.load(f))
+        self._replay_journal()
+        self._chunk_cache.clear()
+
+    def write_section_concurrent(
+        self,
+        section_num: int,
+        data: ArrayLike,
+        offsets: Tuple[int, int, int],
+        writer_id: str = None,
+    ):
+        """
+        Write a section from one of many processes writing into this volume
+        at the same time.
+
+        The volume has to be preallocated (see `preallocate`) and the section
+        has to fit into it, such that no chunks are moved. Every writer has
+        to write distinct z-positions, which keeps the written chunks
+        disjoint. Before any pixel is written the z-position is checked
+        against the saved and the journaled sections and reserved in the
+        journal of the writer. Instead of volume.yaml the written section is
+        recorded in this journal, which is merged by `merge_journals`.
+
+        :param section_num:
+        :param data:
+        :param offsets: to volume origin
+        :param writer_id: name of the journal, defaults to host and pid.
+        """
+        self._assert_writable()
+        assert "0" in self.zarr_root, "Volume is not preallocated."
+        storage = self.zarr_root["0"]
+        assert storage.chunks[0] == 1, "Concurrent writes require z-chunks of 1."
+        pos = self._storage_offsets(offsets)
+        assert all(p >= 0 for p in pos) and all(
+            p + s <= ss for p, s, ss in zip(pos, data.shape, storage.shape)
+        ), f"Section {section_num} does not fit into the preallocated volume."
+
+        if writer_id is None:
+            writer_id = f"{socket.gethostname()}-{os.getpid()}"
+        journal_dir = join(self.get_dir(), "journals")
+        journal = join(journal_dir, f"{writer_id}.jsonl")
+        os.makedirs(journal_dir, exist_ok=True)
+        entry = {"section_num": section_num, "offsets": [int(o) for o in offsets]}
+        # The z-position is reserved before any pixel is written, such that
+        # concurrent writers of the same z-position fail instead of
+        # overwriting each other.
+        with self.lock():
+            self.reload()
+            self._check_free_z(section_num, offsets[0], journal_dir)
+            append_journal(journal, dict(entry, op="reserve"))
+
+        self._write_data(tuple(self._compute_slices(pos, data.shape)), data)
+        self._write_chunk_stats(section_num, data, offsets)
+
+        # Appending under the lock keeps `merge_journals` from moving the
+        # journal away during the write.
+        with self.lock():
+            append_journal(
+                journal,
+                dict(
+                    entry,
+                    op="write",
+                    shape=[int(s) for s in data.shape],
+                    bbox=self._compute_bbox(data),
+                ),
+            )
+
+    def _check_free_z(self, section_num: int, z: int, journal_dir: str):
+        """
+        Assert that `z` is preallocated and neither used by another section
+        nor reserved or written by another section in an unmerged journal.
+        """
+        assert z < len(self._index), f"Z {z} is not preallocated."
+        previous = self._index.section_at(z)
+        assert previous in (None, section_num), (
+            f"Z {z} is used by section {previous}, cannot write section "
+            f"{section_num}."
+        )
+        if self._z_indirection:
+            assert (
+                z in self._free_slots or self._index.get_physical(z) == z
+            ), f"Physical slot {z} is used by another section."
+        for journal in glob(join(journal_dir, "*.jsonl")) + glob(
+            join(journal_dir, "*.merging")
+        ):
+            for entry in read_journal(journal):
+                assert (
+                    entry["offsets"][0] != z or entry["section_num"] == section_num
+                ), (
+                    f"Z {z} is taken by section {entry['section_num']} in "
+                    f"{journal}, cannot write section {section_num}."
+                )
+
+    def merge_journals(self, drop_reservations: bool = False) -> List[int]:
+        """
+        Merge the journals of concurrent writers into volume.yaml.
+
+        The metadata is reloaded, updated and saved while holding the
+        volume lock. Every journal is renamed to `*.merging` before it is
+        read, such that entries appended afterwards go to a new journal.
+        Merged journals are removed. Journals left by an interrupted merge
+        are merged again.
+
+        Reservations of sections which are still being written are kept in
+        the journal of their writer. If two sections were written to the
+        same z-position the journals are restored and a RuntimeError is
+        raised. The conflicting journal entries have to be removed by hand.
+
+        :param drop_reservations: drop the reservations of sections which
+            were never written, e.g. after a writer crashed. Only use it if
+            no writer is running.
+        :return: merged section numbers.
+        """
+        journal_dir = join(self.get_dir(), "journals")
+        merged = []
+        with self.lock():
+            self.reload()
+            for journal in glob(join(journal_dir, "*.jsonl")):
+                os.replace(journal, journal[: -len(".jsonl")] + ".merging")
+            journals = sorted(glob(join(journal_dir, "*.merging")))
+            pending = {}
+            try:
+                for journal in journals:
+                    pending[journal] = self._merge_journal(journal, merged)
+            except AssertionError as e:
+                self._restore_journals(journals)
+                self.reload()
+                raise RuntimeError(
+                    f"Journals in {journal_dir} could not be merged: {e}"
+                ) from e
+            self.save()
+            for journal in journals:
+                os.remove(journal)
+                if len(pending[journal]) > 0 and not drop_reservations:
+                    append_journal(
+                        journal[: -len(".merging")] + ".jsonl", pending[journal]
+                    )
+
+        return merged
+
+    def _merge_journal(self, journal: str, merged: List[int]) -> List[Dict]:
+        """
+        Register the written sections of a journal.
+
+        :return: reservations of sections which are not written yet.
+        """
+        reserved = {}
+        for entry in read_journal(journal):
+            key = (entry["section_num"], entry["offsets"][0])
+            if entry.get("op", "write") == "reserve":
+                reserved[key] = entry
+            else:
+                reserved.pop(key, None)
+                self._register_section(entry)
+                merged.append(entry["section_num"])
+        return list(reserved.values())
+
+    @staticmethod
+    def _restore_journals(journals: List[str]):
+        """
+        Rename `*.merging` journals back, entries appended to a new journal
+        of the same writer are kept after the restored ones.
+        """
+        for journal in journals:
+            target = journal[: -len(".merging")] + ".jsonl"
+            if exists(target):
+                append_journal(journal, read_journal(target))
+            os.replace(journal, target)
+
+    def _register_section(self, entry):
+        section_num = entry["section_num"]
+        z = entry["offsets"][0]
+        assert z < len(self._index), f"Z {z} is not preallocated."
+        previous = self._index.section_at(z)
+        assert previous in (None, section_num), (
+            f"Sections {previous} and {section_num} were both " f"written to z={z}."
+        )
+        if self._z_indirection:
+            # Concurrent writes go to the physical slot of the logical z.
+            assert (
+                z in self._free_slots or self._index.get_physical(z) == z
+            ), f"Physical slot {z} is used by another section."
+            if z in self._free_slots:
+                self._free_slots.remove(z)
+
+        if previous == section_num:
+            # The section was rewritten, replace its entry.
+            self._remove_from_index(section_num)
+        self._add_to_index(
+            section_num,
+            entry["offsets"],
+            entry["shape"],
+            entry["bbox"],
+            slot=z if self._z_indirection else None,
+        )
+
+    def _reshape_storage(self, offsets, shape, amortise: bool = True):
+        """
+        Grow the storage to fit `shape` at the zarr index `offsets`.
+
+        Growing in -y/-x moves all chunks. With `amortise` at least
+        `_prepend_chunks` chunks are prepended along an axis, which is
+        doubled afterwards, such that repeated negative offsets rarely move
+        chunks.
+        """
         storage = self.zarr_root["0"]
         new_shape = []
         for i, (offset, chunk_size, storage_size, data_size) in enumerate(
@@ -288,7 +1601,15 @@ class Volume(ReferenceMixin, Info):
             # extend before
             if offset < 0:
                 n_chunks = offset // chunk_size
-                self._extend(n_chunks=n_chunks, axis=i, z_level=storage)
+                if amortise and i > 0:
+                    n_chunks = min(n_chunks, -self._prepend_chunks[i])
+                    self._prepend_chunks[i] *= 2
+                if self._shards is not None:
+                    # Prepend whole shards to keep the chunks within them.
+                    n_chunks = (n_chunks // self._shards[i]) * self._shards[i]
+                for level in self._get_levels():
+                    # Levels have the same number of chunks as level 0.
+                    self._extend(n_chunks=n_chunks, axis=i, z_level=level)
                 new_size += abs(n_chunks) * chunk_size
                 self._update_origin(axis=i, shift=abs(n_chunks) * chunk_size)
 
@@ -309,44 +1630,254 @@ class Volume(ReferenceMixin, Info):
             new_shape.append(new_size)
 
         if tuple(new_shape) != storage.shape:
-            self._reshape_multiscale_level(new_shape, storage)
+            for i, level in enumerate(self._get_levels()):
+                self._reshape_multiscale_level(self._level_shape(new_shape, i), level)
 
-    def _pad_data(self, offsets, data):
-        storage = self.zarr_root["0"]
+    def _compute_slices(self, offsets, shape):
+        assert all(o >= 0 for o in offsets), "Storage is not reshaped."
+        return [slice(offset, offset + size) for offset, size in zip(offsets, shape)]
 
-        padding = []
-        for i, (offset, chunk_size, storage_size, data_size) in enumerate(
-            zip(offsets, storage.chunks, storage.shape, data.shape)
-        ):
-            if offset < 0:
-                pad_before = chunk_size - (abs(offset) % chunk_size)
-                padding.append([pad_before, 0])
-            else:
-                padding.append([0, 0])
+    def _update_origin(self, axis, shift):
+        # Section offsets are relative to the origin and stay unchanged.
+        origin = self._origin.copy()
+        origin[axis] += shift
+        self._set_origin(origin)
 
-        return np.pad(data, padding)
+    def _set_origin(self, origin):
+        self._origin = np.array(origin, dtype=int)
+        self._write_ngff_translation()
+        self._log(
+            {
+                "op": "origin",
+                "origin": [int(o) for o in self._origin],
+                "prepend_chunks": list(self._prepend_chunks),
+            }
+        )
 
-    def _compute_slices(self, offsets, shape):
-        slices = []
-        for offset, size in zip(offsets, shape):
-            if offset < 0:
-                slices.append(slice(0, size))
-            else:
-                slices.append(slice(offset, offset + size))
-        return slices
+    def _write_ngff_translation(self):
+        """
+        Store the origin as NGFF translation of all multiscale levels, so
+        that viewers place the volume at its physical position.
+        """
+        if "multiscales" not in self.zarr_root.attrs:
+            return
 
-    def _update_origin(self, axis, shift):
-        self._origin[axis] += shift
-        for offsets in self._section_offset_map.values():
-            offsets[axis] += shift
+        multiscales = self.zarr_root.attrs["multiscales"]
+        translation = [-float(o) for o in self._origin]
+        for dataset in multiscales[0]["datasets"]:
+            transforms = [
+                t
+                for t in dataset["coordinateTransformations"]
+                if t["type"] != "translation"
+            ]
+            transforms.append({"type": "translation", "translation": translation})
+            dataset["coordinateTransformations"] = transforms
+        self.zarr_root.attrs["multiscales"] = multiscales
 
     def get_section_origin(self, section_num: int):
-        return self._origin + self._section_offset_map[section_num]
+        """
+        Get the zarr index of the first voxel of a section.
+        """
+        return self._origin + self._index.get_offsets(section_num)
 
     def get_section_data(self, section_num: int):
-        z, y, x = self._section_offset_map[section_num]
-        zs, ys, xs = self._section_shape_map[section_num]
-        return self.get_zarr_volume()["0"][z : z + zs, y : y + ys, x : x + xs]
+        _, y, x = self._storage_offsets(self._index.get_offsets(section_num))
+        z = self.get_physical_z(section_num)
+        shape = self._index.get_shape(section_num)
+        storage = self.get_zarr_volume()["0"]
+        bbox = self.get_section_bbox(section_num)
+        if bbox == [0, 0, shape[1], shape[2]]:
+            return storage[z : z + shape[0], y : y + shape[1], x : x + shape[2]]
+
+        # Only read the non-empty part of the section.
+        data = np.zeros(shape, dtype=storage.dtype)
+        if bbox is not None:
+            y0, x0, y1, x1 = bbox
+            data[:, y0:y1, x0:x1] = storage[
+                z : z + shape[0], y + y0 : y + y1, x + x0 : x + x1
+            ]
+        return data
+
+    def read_region(self, bbox, level: int = 0) -> np.ndarray:
+        """
+        Read a box of the volume.
+
+        The chunks covering the box are fetched in parallel and kept in an
+        LRU cache, such that repeated reads of nearby regions do not
+        decompress the same chunks again. Parts of the box outside of the
+        volume and empty z-positions are returned as zeros. Chunks outside of
+        the bounding boxes of the sections are not looked up in the store.
+
+        :param bbox: [z_min, y_min, x_min, z_max, y_max, x_max] in pixels of
+            `level`, relative to the volume origin. z is the logical
+            z-position.
+        :param level: multiscale level.
+        :return: array of shape (z_max - z_min, y_max - y_min, x_max - x_min)
+        """
+        storage = self.zarr_root[str(level)]
+        start = np.array(bbox[:3], dtype=int)
+        stop = np.array(bbox[3:], dtype=int)
+        out = np.zeros(tuple(stop - start), dtype=storage.dtype)
+
+        # Storage positions of the box, logical z is mapped per slice.
+        scale = 2**level
+        origin = np.array([0, self._origin[1] // scale, self._origin[2] // scale])
+        yx_start = np.maximum(start[1:] + origin[1:], 0)
+        yx_stop = np.minimum(stop[1:] + origin[1:], storage.shape[1:])
+        if np.any(yx_stop <= yx_start):
+            return out
+
+        # Only chunks within the bounding box of a section can be stored, all
+        # other chunks are zero and are not looked up.
+        chunks = storage.chunks
+        region = [
+            yx_start[0] // chunks[1],
+            yx_start[1] // chunks[2],
+            (yx_stop[0] - 1) // chunks[1] + 1,
+            (yx_stop[1] - 1) // chunks[2] + 1,
+        ]
+        unit = np.array(self.zarr_root["0"].chunks[1:])
+        slices = {}
+        keys = set()
+        for z in range(max(start[0], 0), min(stop[0], len(self._index))):
+            section_num = self._index.section_at(z)
+            pz = z if not self._z_indirection else self._index.get_physical(z)
+            if section_num is None or pz is None or pz >= storage.shape[0]:
+                continue
+            box = self._section_chunk_box(section_num, unit)
+            if box is None:
+                continue
+            slices[z] = pz
+            keys.update(
+                (pz // chunks[0], cy, cx)
+                for cy in range(max(box[0], region[0]), min(box[2], region[2]))
+                for cx in range(max(box[1], region[1]), min(box[3], region[3]))
+            )
+        blocks = self._fetch_chunks(storage, level, keys)
+        blocks_of_cz = defaultdict(list)
+        for (cz, cy, cx), block in blocks.items():
+            blocks_of_cz[cz].append((cy, cx, block))
+
+        for z, pz in slices.items():
+            cz = pz // chunks[0]
+            for cy, cx, block in blocks_of_cz[cz]:
+                block_start = np.array([cy * chunks[1], cx * chunks[2]])
+                lo = np.maximum(block_start, yx_start)
+                hi = np.minimum(block_start + block.shape[1:], yx_stop)
+                if np.any(hi <= lo):
+                    continue
+                dst = lo - origin[1:] - start[1:]
+                src = lo - block_start
+                size = hi - lo
+                out[
+                    z - start[0],
+                    dst[0] : dst[0] + size[0],
+                    dst[1] : dst[1] + size[1],
+                ] = block[
+                    pz - cz * chunks[0],
+                    src[0] : src[0] + size[0],
+                    src[1] : src[1] + size[1],
+                ]
+
+        return out
+
+    def _fetch_chunks(self, storage, level: int, keys):
+        blocks = {}
+        missing = []
+        for key in keys:
+            block = self._chunk_cache.get((level,) + key)
+            if block is None:
+                missing.append(key)
+            else:
+                blocks[key] = block
+        if len(missing) == 0:
+            return blocks
+
+        def fetch(key):
+            return key, storage.get_block_selection(key)
+
+        with ThreadPoolExecutor(max_workers=max(self._n_workers, 1)) as pool:
+            for key, block in pool.map(fetch, missing):
+                self._chunk_cache.put((level,) + key, block)
+                blocks[key] = block
+
+        return blocks
+
+    def read_slab(self, plane: str, position: int, level: int = 0) -> np.ndarray:
+        """
+        Read an orthogonal plane through the whole volume.
+
+        :param plane: "xz" or "yz".
+        :param position: y (for "xz") or x (for "yz") in pixels of `level`,
+            relative to the volume origin.
+        :param level: multiscale level.
+        :return: (z, x) or (z, y) array.
+        """
+        shape = self.zarr_root[str(level)].shape
+        scale = 2**level
+        start = [0, -(self._origin[1] // scale), -(self._origin[2] // scale)]
+        stop = [len(self._index), start[1] + shape[1], start[2] + shape[2]]
+        if plane == "xz":
+            start[1], stop[1] = position, position + 1
+            return self.read_region(start + stop, level=level)[:, 0]
+        elif plane == "yz":
+            start[2], stop[2] = position, position + 1
+            return self.read_region(start + stop, level=level)[:, :, 0]
+        else:
+            raise ValueError(f"Unknown plane {plane}.")
+
+    def to_dask(self, level: int = 0) -> da.Array:
+        """
+        Lazy view of the volume in logical z-order.
+
+        The dask array has the chunks of the zarr array of `level`, chunks
+        are only read when they are computed. Empty z-positions are zeros.
+        The voxel [z, y, x] has the offsets (z, y - oy, x - ox) relative to
+        the volume origin with (oy, ox) = `get_origin()[1:] // 2**level`.
+
+        :param level: multiscale level.
+        :return: (z, y, x) dask array
+        """
+        storage = self.zarr_root[str(level)]
+        volume = da.from_zarr(storage)
+        if not self._z_indirection:
+            return volume[: len(self._index)]
+
+        # Empty z-positions index a slab of zeros appended to the storage.
+        empty = da.zeros(
+            (1,) + storage.shape[1:],
+            chunks=(1,) + storage.chunks[1:],
+            dtype=storage.dtype,
+        )
+        volume = da.concatenate([volume, empty])
+        physical = [storage.shape[0] if z is None else z for z in self._index.z_map()]
+        return volume[np.array(physical, dtype=int)]
+
+    def get_section_list(self) -> List[int]:
+        """
+        :return: section number per logical z-position, None for empty
+            positions.
+        """
+        return self._index.section_list()
+
+    def get_section_nums(self) -> List[int]:
+        return self._index.section_nums()
+
+    def get_section_offsets(self, section_num: int) -> np.ndarray:
+        """
+        :return: (z, y, x) offsets of a section relative to the volume origin.
+        """
+        return self._index.get_offsets(section_num)
+
+    def get_section_shape(self, section_num: int) -> Tuple[int, int, int]:
+        return self._index.get_shape(section_num)
+
+    def get_z_map(self) -> List[int]:
+        """
+        :return: physical z-slot per logical z-position or None if
+            z-indirection is disabled.
+        """
+        return self._index.z_map() if self._z_indirection else None
 
     def get_description(self):
         return self._description
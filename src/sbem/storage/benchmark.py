@@ -0,0 +1,223 @@
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numcodecs
+import numpy as np
+from numcodecs import Blosc, Zlib, Zstd
+from numcodecs.abc import Codec
+
+from sbem.storage.Volume import Volume
+
+
+def _create_volume(root_dir: str, n_workers: int) -> Volume:
+    return Volume(
+        name="benchmark",
+        description="Write benchmark.",
+        documentation="",
+        authors=[],
+        root_dir=root_dir,
+        exist_ok=True,
+        license=None,
+        cite=[],
+        n_workers=n_workers,
+        save=False,
+    )
+
+
+def _smooth_data(shape: Tuple[int, ...]) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    # Smooth data compresses similar to EM sections, random noise does not.
+    return (rng.integers(0, 32, size=shape).cumsum(axis=-1) % 256).astype(np.uint8)
+
+
+def benchmark_write(
+    shape: Tuple[int, int] = (8192, 8192),
+    n_sections: int = 4,
+    workers: List[int] = (1, 2, 4, 8),
+    tmp_dir: str = None,
+) -> Dict[int, float]:
+    """
+    Measure the write throughput of `Volume.write_section` for different
+    numbers of worker threads.
+
+    The first section initializes the volume and is not timed.
+
+    :param shape: (y, x) shape of the written sections.
+    :param n_sections: number of timed section writes per worker count.
+    :param workers: worker counts to benchmark.
+    :param tmp_dir: directory in which the volumes are created.
+    :return: MB/s per worker count.
+    """
+    data = _smooth_data((1,) + tuple(shape))
+
+    results = {}
+    for n_workers in workers:
+        root_dir = tempfile.mkdtemp(dir=tmp_dir)
+        try:
+            vol = _create_volume(root_dir, n_workers)
+            vol.write_section(section_num=0, data=data, offsets=(0, 0, 0))
+            start = time.perf_counter()
+            for i in range(1, n_sections + 1):
+                vol.write_section(section_num=i, data=data, offsets=(i, 0, 0))
+            duration = time.perf_counter() - start
+        finally:
+            shutil.rmtree(root_dir)
+
+        results[n_workers] = n_sections * data.nbytes / 2**20 / duration
+        logging.info(f"{n_workers} workers: {results[n_workers]:.1f} MB/s")
+
+    return results
+
+
+def default_codecs() -> Dict[str, Codec]:
+    """
+    Lossless candidate codecs for EM data.
+    """
+    codecs = {}
+    for cname in ["zstd", "lz4", "lz4hc"]:
+        for clevel in [1, 3, 5, 9]:
+            for shuffle, name in [
+                (Blosc.NOSHUFFLE, "noshuffle"),
+                (Blosc.SHUFFLE, "shuffle"),
+                (Blosc.BITSHUFFLE, "bitshuffle"),
+            ]:
+                codecs[f"blosc-{cname}-{clevel}-{name}"] = Blosc(
+                    cname=cname, clevel=clevel, shuffle=shuffle
+                )
+    codecs["zstd-3"] = Zstd(level=3)
+    codecs["zlib-6"] = Zlib(level=6)
+    return codecs
+
+
+def sample_chunks(
+    volume_path: str, n_chunks: int = 16, level: int = 0, seed: int = 0
+) -> List[np.ndarray]:
+    """
+    Read random non-empty chunks of a volume.
+
+    :param volume_path: to volume.yaml.
+    :param n_chunks: number of chunks.
+    :param level: multiscale level.
+    :param seed: of the random chunk selection.
+    :return: list of chunks.
+    """
+    storage = Volume.load(volume_path, read_only=True).get_zarr_volume()[str(level)]
+    grid = [int(np.ceil(s / c)) for s, c in zip(storage.shape, storage.chunks)]
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for _ in range(100 * n_chunks):
+        if len(chunks) == n_chunks:
+            break
+        chunk = storage.get_block_selection(tuple(rng.integers(0, grid)))
+        if np.any(chunk):
+            chunks.append(chunk)
+    return chunks
+
+
+def benchmark_codecs(
+    chunks: List[np.ndarray],
+    codecs: Dict[str, Codec] = None,
+    n_repeats: int = 3,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Measure compression ratio and encode/decode throughput of codecs.
+
+    Any numcodecs codec can be benchmarked, e.g. lossy image codecs
+    registered by imagecodecs.
+
+    :param chunks: sample chunks, see `sample_chunks`.
+    :param codecs: name -> codec, defaults to `default_codecs`.
+    :param n_repeats: the fastest of `n_repeats` runs is reported.
+    :return: name -> {"ratio", "encode MB/s", "decode MB/s"}
+    """
+    if codecs is None:
+        codecs = default_codecs()
+    n_bytes = sum(c.nbytes for c in chunks)
+
+    results = {}
+    for name, codec in codecs.items():
+        encode, decode = np.inf, np.inf
+        for _ in range(n_repeats):
+            start = time.perf_counter()
+            encoded = [codec.encode(c) for c in chunks]
+            encode = min(encode, time.perf_counter() - start)
+            start = time.perf_counter()
+            for e in encoded:
+                codec.decode(e)
+            decode = min(decode, time.perf_counter() - start)
+
+        results[name] = {
+            "ratio": n_bytes / sum(len(e) for e in encoded),
+            "encode MB/s": n_bytes / 2**20 / encode,
+            "decode MB/s": n_bytes / 2**20 / decode,
+        }
+        logging.info(f"{name}: {results[name]}")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Volume write benchmark.")
+    parser.add_argument("--shape", type=int, nargs=2, default=[8192, 8192])
+    parser.add_argument("--n-sections", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--tmp-dir", type=str, default=None)
+    subparsers = parser.add_subparsers(dest="command")
+    codecs_parser = subparsers.add_parser(
+        "codecs", description="Compression benchmark of codecs."
+    )
+    codecs_parser.add_argument(
+        "--volume", type=str, default=None, help="volume.yaml to sample chunks from"
+    )
+    codecs_parser.add_argument("--n-chunks", type=int, default=16)
+    codecs_parser.add_argument("--level", type=int, default=0)
+    codecs_parser.add_argument(
+        "--chunk-shape", type=int, nargs=3, default=[1, 2744, 2744]
+    )
+    codecs_parser.add_argument(
+        "--codec",
+        type=str,
+        action="append",
+        default=None,
+        help="numcodecs config as JSON, defaults to lossless candidates",
+    )
+    codecs_parser.add_argument("--n-repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "codecs":
+        if args.volume is None:
+            chunks = [_smooth_data(tuple(args.chunk_shape))] * args.n_chunks
+        else:
+            chunks = sample_chunks(
+                args.volume, n_chunks=args.n_chunks, level=args.level
+            )
+        codecs = None
+        if args.codec is not None:
+            codecs = {c: numcodecs.get_codec(json.loads(c)) for c in args.codec}
+        results = benchmark_codecs(chunks, codecs=codecs, n_repeats=args.n_repeats)
+        print("codec\tratio\tencode MB/s\tdecode MB/s")
+        for name, r in results.items():
+            print(
+                f"{name}\t{r['ratio']:.2f}\t{r['encode MB/s']:.1f}\t"
+                f"{r['decode MB/s']:.1f}"
+            )
+        return
+
+    results = benchmark_write(
+        shape=args.shape,
+        n_sections=args.n_sections,
+        workers=args.workers,
+        tmp_dir=args.tmp_dir,
+    )
+    print("workers\tMB/s")
+    for n_workers, mbs in results.items():
+        print(f"{n_workers}\t{mbs:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+import fcntl
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import product
+from math import ceil
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+import zarr
+from numpy.typing import ArrayLike
+
+from sbem.record.Section import Section
+
+
+def plan_volume_extent(
+    sections: List[Section],
+    margin_px: Tuple[int, int] = tuple([0, 0]),
+) -> Dict:
+    """
+    Compute the extent of a volume from the tile stage coordinates of its
+    sections.
+
+    Sections are placed at consecutive z-positions in the given order. The
+    yx-offset of a section is the stage position of its top-left tile
+    relative to the top-left tile position over all sections.
+
+    plan = {
+        "shape": (z, y, x),
+        "origin": (0, margin_px_y, margin_px_x),
+        "offsets": {section_num: (z, y, x)},
+    }
+
+    :param sections: fully initialized sections of the volume.
+    :param margin_px: (y, x) number of pixels added on each side.
+    :return: plan which can be passed to `Volume.preallocate`.
+    """
+    bounds = {}
+    for section in sections:
+        ys = [int(t.y) for t in section.tiles.values()]
+        xs = [int(t.x) for t in section.tiles.values()]
+        if len(ys) == 0:
+            continue
+        bounds[section.get_section_num()] = (
+            min(ys),
+            min(xs),
+            max(ys) + section.get_tile_height(),
+            max(xs) + section.get_tile_width(),
+        )
+
+    assert len(bounds) > 0, "Sections do not contain any tiles."
+    min_y = min(b[0] for b in bounds.values())
+    min_x = min(b[1] for b in bounds.values())
+    max_y = max(b[2] for b in bounds.values())
+    max_x = max(b[3] for b in bounds.values())
+
+    offsets = {}
+    for z, section in enumerate(sections):
+        if section.get_section_num() in bounds.keys():
+            y, x = bounds[section.get_section_num()][:2]
+            offsets[section.get_section_num()] = (z, y - min_y, x - min_x)
+
+    return {
+        "shape": (
+            len(sections),
+            max_y - min_y + 2 * margin_px[0],
+            max_x - min_x + 2 * margin_px[1],
+        ),
+        "origin": (0, margin_px[0], margin_px[1]),
+        "offsets": offsets,
+    }
+
+
+def chunk_blocks(slices: Tuple[slice, ...], chunks: Tuple[int, ...]) -> Iterator:
+    """
+    Split a region into blocks which do not cross chunk boundaries.
+
+    :param slices: region with explicit start and stop.
+    :param chunks: chunk shape of the array.
+    :return: iterator over the blocks as tuple of slices.
+    """
+    ranges = []
+    for sl, chunk_size in zip(slices, chunks):
+        bounds = []
+        start = sl.start
+        while start < sl.stop:
+            stop = min((start // chunk_size + 1) * chunk_size, sl.stop)
+            bounds.append(slice(start, stop))
+            start = stop
+        ranges.append(bounds)
+
+    return product(*ranges)
+
+
+def write_chunks(
+    array: zarr.Array,
+    slices: Tuple[slice, ...],
+    data: ArrayLike,
+    n_workers: int = 1,
+    block_shape: Tuple[int, ...] = None,
+):
+    """
+    Write `data` into the region `slices` of `array`.
+
+    With `n_workers > 1` the region is split into chunk-aligned blocks
+    which are compressed and stored on a thread pool. Every chunk (or shard)
+    is written by exactly one thread.
+
+    :param array: zarr array to write to.
+    :param slices: region with explicit start and stop.
+    :param data: with the shape of the region.
+    :param n_workers: number of threads.
+    :param block_shape: shape of the aligned blocks, defaults to the chunk
+        shape. Use the shard shape for sharded stores.
+    """
+    if n_workers <= 1:
+        array[slices] = data
+        return
+
+    def write(block):
+        src = tuple(
+            slice(b.start - s.start, b.stop - s.start) for b, s in zip(block, slices)
+        )
+        array[block] = data[src]
+
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        for _ in pool.map(write, chunk_blocks(slices, block_shape or array.chunks)):
+            pass
+
+
+def suggest_chunks(
+    section_shape: Tuple[int, int],
+    dtype=np.uint8,
+    layout: str = "section",
+    target_bytes: int = 2**23,
+) -> Tuple[int, int, int]:
+    """
+    Suggest a chunk shape of roughly `target_bytes` uncompressed bytes.
+
+    The "section" layout uses chunks of a single z-slice which are fastest
+    to write section by section. The "isotropic" layout uses cubes with a
+    power of two edge length which are better suited for orthogonal reads
+    and 3D viewers.
+
+    :param section_shape: (y, x) shape of a section.
+    :param dtype: of the volume.
+    :param layout: "section" or "isotropic".
+    :param target_bytes: uncompressed size of a chunk.
+    :return: (z, y, x) chunk shape.
+    """
+    n_voxels = target_bytes // np.dtype(dtype).itemsize
+    if layout == "section":
+        edge = max(64, int(np.sqrt(n_voxels)) // 64 * 64)
+        return tuple([1] + [min(edge, int(s)) for s in section_shape])
+    elif layout == "isotropic":
+        edge = 2 ** int(np.log2(np.cbrt(n_voxels)))
+        return tuple([edge] + [min(edge, int(s)) for s in section_shape])
+    else:
+        raise ValueError(f"Unknown chunk layout {layout}.")
+
+
+def _rechunk_block_shape(
+    src_chunks: Tuple[int, ...],
+    dst_chunks: Tuple[int, ...],
+    itemsize: int,
+    max_bytes: int,
+) -> Tuple[int, ...]:
+    """
+    Grow a block of destination chunks along each axis until it covers a
+    full source chunk, as long as the block fits into `max_bytes`.
+    Blocks which cover full source chunks avoid decompressing the same
+    source chunk for many destination chunks.
+    """
+    block = list(dst_chunks)
+    for axis in reversed(range(len(block))):
+        size = ceil(src_chunks[axis] / dst_chunks[axis]) * dst_chunks[axis]
+        candidate = block.copy()
+        candidate[axis] = size
+        if int(np.prod(candidate)) * itemsize <= max_bytes:
+            block = candidate
+    return tuple(block)
+
+
+def rechunk_array(
+    src: zarr.Array,
+    dst: zarr.Array,
+    max_memory: int = 2**30,
+    n_workers: int = 1,
+):
+    """
+    Copy `src` into `dst` which has the same shape but different chunks.
+
+    The copy is done in blocks which are aligned to the chunks of `dst`,
+    hence every destination chunk is written exactly once and by a single
+    worker. At most `n_workers` blocks are held in memory and the block
+    size is chosen such that they fit into `max_memory` bytes.
+
+    :param src: source array.
+    :param dst: destination array.
+    :param max_memory: upper bound of bytes held by all workers.
+    :param n_workers: number of threads.
+    """
+    assert src.shape == dst.shape, "Source and destination shape differ."
+    block = _rechunk_block_shape(
+        src.chunks,
+        dst.chunks,
+        src.dtype.itemsize,
+        max(max_memory // max(n_workers, 1), 1),
+    )
+
+    def copy(block_slices):
+        dst[block_slices] = src[block_slices]
+
+    region = tuple(slice(0, s) for s in src.shape)
+    blocks = chunk_blocks(region, block)
+    if n_workers <= 1:
+        for b in blocks:
+            copy(b)
+    else:
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            for _ in pool.map(copy, blocks):
+                pass
+
+
+def chunk_statistics(
+    data: ArrayLike,
+    position: Tuple[int, int],
+    chunks: Tuple[int, int],
+    n_bins: int = 16,
+    n_workers: int = 1,
+) -> Dict[str, np.ndarray]:
+    """
+    Summary statistics of the (y, x) chunks covered by a section.
+
+    Pixels of a chunk outside of the section are zeros, as in the storage.
+    Means and fractions are computed over the full chunk shape.
+
+    :param data: (z, y, x) section.
+    :param position: (y, x) storage index of the first pixel of the section.
+    :param chunks: (y, x) chunk shape.
+    :param n_bins: number of histogram bins over the value range of the
+        dtype, [0, 1] for floating point data.
+    :param n_workers: number of threads.
+    :return: dict with "chunk_start", the (y, x) index of the first chunk,
+        "value_range" of the histogram and per chunk "min", "max", "mean", "nonzero" (fraction of non-zero
+        pixels) and "histogram" (counts of the non-zero pixels).
+    """
+    if np.issubdtype(data.dtype, np.integer):
+        info = np.iinfo(data.dtype)
+        value_range = (int(info.min), int(info.max) + 1)
+    else:
+        value_range = (0.0, 1.0)
+    zero_bin = min(
+        max(int((0 - value_range[0]) / (value_range[1] - value_range[0]) * n_bins), 0),
+        n_bins - 1,
+    )
+
+    start = [p // c for p, c in zip(position, chunks)]
+    stop = [(p + s - 1) // c + 1 for p, s, c in zip(position, data.shape[1:], chunks)]
+    grid = (stop[0] - start[0], stop[1] - start[1])
+    stats = {
+        "chunk_start": np.array(start),
+        "value_range": np.array(value_range),
+        "min": np.zeros(grid, dtype=data.dtype),
+        "max": np.zeros(grid, dtype=data.dtype),
+        "mean": np.zeros(grid, dtype=np.float64),
+        "nonzero": np.zeros(grid, dtype=np.float64),
+        "histogram": np.zeros(grid + (n_bins,), dtype=np.int64),
+    }
+    n_pixels = data.shape[0] * chunks[0] * chunks[1]
+
+    def compute(index):
+        lo = [
+            max((s + i) * c, p) - p
+            for s, i, c, p in zip(start, index, chunks, position)
+        ]
+        hi = [
+            min((s + i + 1) * c, p + size) - p
+            for s, i, c, p, size in zip(start, index, chunks, position, data.shape[1:])
+        ]
+        block = data[:, lo[0] : hi[0], lo[1] : hi[1]]
+        n_nonzero = np.count_nonzero(block)
+        hist = np.histogram(block, bins=n_bins, range=value_range)[0]
+        hist[zero_bin] -= block.size - n_nonzero
+        padded = block.size < n_pixels
+        stats["min"][index] = min(block.min(), 0) if padded else block.min()
+        stats["max"][index] = max(block.max(), 0) if padded else block.max()
+        stats["mean"][index] = block.sum(dtype=np.float64) / n_pixels
+        stats["nonzero"][index] = n_nonzero / n_pixels
+        stats["histogram"][index] = hist
+
+    with ThreadPoolExecutor(max_workers=max(n_workers, 1)) as pool:
+        for _ in pool.map(compute, product(range(grid[0]), range(grid[1]))):
+            pass
+
+    return stats
+
+
+_END = object()
+
+
+def _put(queue: Queue, stop: Event, item) -> bool:
+    """
+    Put an item into the queue unless the consumer stopped.
+
+    :return: False if the consumer stopped.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _produce(items: Iterable, queue: Queue, stop: Event):
+    """
+    Put (item, None) pairs into the queue followed by (_END, error), where
+    error is the exception raised by `items` or None.
+    """
+    try:
+        for item in items:
+            if not _put(queue, stop, (item, None)):
+                return
+    except BaseException as e:
+        _put(queue, stop, (_END, e))
+        return
+    _put(queue, stop, (_END, None))
+
+
+def _stop_producer(queue: Queue, stop: Event, producer: Thread):
+    stop.set()
+    # Unblock a producer waiting on a full queue.
+    try:
+        while True:
+            queue.get_nowait()
+    except Empty:
+        pass
+    producer.join()
+
+
+def prefetch(items: Iterable, queue_size: int = 2) -> Iterator:
+    """
+    Consume `items` on a background thread.
+
+    Produced items are passed through a bounded queue. The producer blocks
+    if `queue_size` items are waiting, which caps the memory held by
+    produced but not yet consumed items. Exceptions raised by the producer
+    are re-raised in the consumer.
+
+    :param items: iterable which is expensive to advance.
+    :param queue_size: maximum number of buffered items.
+    :return: iterator over the items in order.
+    """
+    queue = Queue(maxsize=queue_size)
+    stop = Event()
+    producer = Thread(target=_produce, args=(items, queue, stop), daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = queue.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        _stop_producer(queue, stop, producer)
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive advisory lock on `path` across processes.
+
+    The lock file is created if it does not exist.
+
+    :param path: to the lock file.
+    """
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def append_journal(path: str, entries: Union[Dict, List[Dict]]):
+    """
+    Append entries as JSON lines to a journal and sync it to disk.
+
+    :param path: to the journal file.
+    :param entries: JSON serializable dict or list of dicts.
+    """
+    if isinstance(entries, dict):
+        entries = [entries]
+    with open(path, "a") as f:
+        f.write("".join(json.dumps(e) + "\n" for e in entries))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_journal(path: str) -> List[Dict]:
+    """
+    Read the entries of a journal. An incomplete last line, left by a
+    writer which died while appending, is ignored.
+
+    :param path: to the journal file.
+    :return: list of entries.
+    """
+    entries = []
+    with open(path) as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            entries.append(json.loads(line))
+    return entries
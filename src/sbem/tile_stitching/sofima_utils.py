@@ -63,12 +63,12 @@ def register_tiles(
     integration_config: mesh.IntegrationConfig = default_mesh_integration_config(),
     logger=logging.getLogger("load_sections"),
 ):
-    tim_path = join(
+    coords_path = join(
         section_dir,
-        "tile_id_map.json",
+        "tile_coords.npz",
     )
-    tile_space = section.get_tile_id_map(path=tim_path).shape
-    tile_map = section.get_tile_data_map(path=tim_path, indexing="xy")
+    tile_space = section.get_tile_grid_shape(path=coords_path)
+    tile_map = section.get_tile_data_map(path=coords_path, indexing="xy")
     cx, cy = stitch_rigid.compute_coarse_offsets(
         tile_space,
         tile_map,
@@ -184,7 +184,7 @@ def render_tiles(
 ):
     path = join(
         section_dir,
-        "tile_id_map.json",
+        "tile_coords.npz",
     )
     tile_map = section.get_tile_data_map(path=path, indexing="xy")
     mesh_path = join(
@@ -1,14 +1,17 @@
 import json
+import os
 import shutil
 import tempfile
 from os.path import exists, join
-from unittest import TestCase
+from unittest import TestCase, mock
 
+import git
 import numpy as np
 from numpy.testing import assert_array_equal
 from ruyaml import YAML
 from tifffile import imwrite
 
+from sbem.experiment import git_utils
 from sbem.experiment.Experiment import Experiment
 from sbem.record.Author import Author
 from sbem.record.Citation import Citation
@@ -320,3 +323,72 @@ class ExperimentTest(TestCase):
             ),
         )
         assert section_loaded.get_tile_id_map()[0, 0] == 3
+
+    def test_scoped_git(self):
+        exp = Experiment(
+            name="exp",
+            description="description",
+            documentation="documentation",
+            authors=[Author("author 1", "aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=True,
+            git_mode="scoped",
+        )
+        sample = Sample(exp, "sample", "desc", "docu", "./data")
+        sec = Section(sample, "sec_0", False, False, "run_0", 1, 1, 11, 3072, 2304, 200)
+        Tile(sec, 3, "/not/important.tif", 0, 0, 1.2)
+
+        exp.save(overwrite=True)
+
+        repo_dir = join(self.tmp_dir, "exp")
+        with git.Repo(repo_dir) as r:
+            assert len(list(r.iter_commits())) == 1
+            tracked = r.git.ls_files().splitlines()
+        assert "experiment.yaml" in tracked
+        assert join("sample", "sample.yaml") in tracked
+        assert join("sample", "sec_0", "section.yaml") in tracked
+
+        # Artefacts are ignored, but their hashes are committed.
+        tim_path = join(sec.get_section_dir(), "tile_id_map.json")
+        sec.get_tile_id_map(path=tim_path)
+        exp.save(overwrite=True)
+        manifest = git_utils.load_artefact_manifest(repo_dir)
+        assert manifest[join("sample", "sec_0", "tile_id_map.json")] == (
+            git_utils.file_hash(tim_path)
+        )
+        with git.Repo(repo_dir) as r:
+            assert len(list(r.iter_commits())) == 2
+            tracked = r.git.ls_files().splitlines()
+        assert join("sample", "sec_0", "tile_id_map.json") not in tracked
+        assert git_utils.ARTEFACT_MANIFEST in tracked
+
+        # Saving without changes does not create a commit and does not hash
+        # unchanged artefacts again.
+        with mock.patch.object(git_utils, "file_hash") as file_hash:
+            exp.save(overwrite=True)
+        file_hash.assert_not_called()
+        with git.Repo(repo_dir) as r:
+            assert len(list(r.iter_commits())) == 2
+            assert git_utils.ARTEFACT_STAT_CACHE not in r.git.ls_files()
+
+        # Commits work without a .gitignore.
+        os.remove(join(repo_dir, ".gitignore"))
+        with open(tim_path, "a") as f:
+            f.write(" ")
+        assert exp.commit([join(sec.get_section_dir(), "section.yaml")]) is not None
+        manifest = git_utils.load_artefact_manifest(repo_dir)
+        assert manifest[join("sample", "sec_0", "tile_id_map.json")] == (
+            git_utils.file_hash(tim_path)
+        )
+
+        # Only experiment and sample files are checked on load.
+        with open(join(repo_dir, "sample", "sec_0", "section.yaml"), "a") as f:
+            f.write("# comment\n")
+        exp_load = Experiment.load(join(repo_dir, "experiment.yaml"))
+        assert exp_load.get_git_mode() == "scoped"
+
+        with open(join(repo_dir, "sample", "sample.yaml"), "a") as f:
+            f.write("# comment\n")
+        self.assertRaises(
+            AssertionError, Experiment.load, join(repo_dir, "experiment.yaml")
+        )
@@ -163,3 +163,18 @@ class ParseUtilsTest(TestCase):
         tile = sec.get_tile(431)
         assert tile.x == -450885 // 11.0
         assert tile.y == -744566 // 11.0
+        assert tile.to_dict()["path"] == (
+            "tiles/g0001/t0431/20210630_Dp_190326Bb_run04_g0001_t0431_s05283.tif"
+        )
+        assert sample.get_data_root("run_0") == self.tmp_dir
+        assert tile.get_tile_path() == join(
+            self.tmp_dir,
+            "tiles/g0001/t0431/20210630_Dp_190326Bb_run04_g0001_t0431_s05283.tif",
+        )
+
+        # Relocate the raw data
+        sample.set_data_root("run_0", "/scratch/run_0")
+        assert tile.get_tile_path() == join(
+            "/scratch/run_0",
+            "tiles/g0001/t0431/20210630_Dp_190326Bb_run04_g0001_t0431_s05283.tif",
+        )
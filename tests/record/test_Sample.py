@@ -1,5 +1,8 @@
+import pickle
 import shutil
+import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from os.path import exists, join
 from unittest import TestCase
 
@@ -9,6 +12,7 @@ from tifffile import imwrite
 
 from sbem.record.Sample import Sample
 from sbem.record.Section import Section
+from sbem.record.Tile import Tile
 
 
 class SectionTest(TestCase):
@@ -627,3 +631,60 @@ class SectionTest(TestCase):
             assert sec["name"] == name
 
         assert sample.get_section("1").get_section_dir() is None
+
+    def test_concurrent_updates(self):
+        sample = Sample(None, "sample", "desc", "docu", "")
+        n_sections, n_tiles = 200, 16
+
+        def process(section_num):
+            sec = Section(
+                sample,
+                str(section_num),
+                False,
+                False,
+                "run_0",
+                section_num,
+                1,
+                11,
+                10,
+                10,
+                0,
+            )
+            for t in range(n_tiles):
+                Tile(sec, t, "/fake.tif", 10 * (t % 4), 10 * (t // 4), 11.0)
+                sec.get_tile_id_map()
+            sec.set_alignment_mesh(f"/path/{section_num}/meshes.npz")
+            sample.get_section_range(0, n_sections, 1)
+            return section_num
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                saves = [
+                    pool.submit(sample.save, self.tmp_dir, overwrite=True)
+                    for _ in range(4)
+                ]
+                done = list(pool.map(process, range(n_sections)))
+                for s in saves:
+                    s.result()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        assert sorted(done) == list(range(n_sections))
+        assert len(sample.sections) == n_sections
+        assert sample.get_min_section_num(1) == 0
+        assert sample.get_max_section_num(1) == n_sections - 1
+        for i in range(n_sections):
+            sec = sample.get_section(str(i))
+            assert len(sec.tiles) == n_tiles
+            assert sec.get_tile_id_map().shape == (4, 4)
+            assert sec.get_alignment_mesh() == f"/path/{i}/meshes.npz"
+
+        sample.save(self.tmp_dir, overwrite=True)
+        sample_loaded = Sample.load(join(self.tmp_dir, "sample", "sample.yaml"))
+        assert len(sample_loaded.sections) == n_sections
+
+        # Records stay picklable for process based workers.
+        sec = pickle.loads(pickle.dumps(sample.get_section("0")))
+        assert len(sec.tiles) == n_tiles
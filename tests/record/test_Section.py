@@ -1,8 +1,9 @@
 import json
+import os
 import shutil
 import tempfile
 from os.path import exists, join
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import numpy as np
 from numpy.testing import assert_array_equal
@@ -416,3 +417,91 @@ class SectionTest(TestCase):
         assert_array_equal(tdm[(1, 0)], t4)
         assert_array_equal(tdm[(0, 1)], t5)
         assert_array_equal(tdm[(1, 1)], t6)
+
+    def test_tile_id_map_npy(self):
+        sec = Section(
+            None, "section_init", False, True, "run_0", 123, 1, 11.1, 3072, 2304, 200
+        )
+        Tile(sec, 3, "/not/important.tif", 0, 0, 1.2)
+        Tile(sec, 4, "/not/important.tif", 2104, 0, 1.2)
+
+        # Memoised until a tile is added
+        assert_array_equal(sec.get_tile_id_map(), np.array([[3, 4]]))
+        assert sec._tile_id_map is not None
+        Tile(sec, 5, "/not/important.tif", 0, 2872, 1.2)
+        assert sec._tile_id_map is None
+        assert_array_equal(sec.get_tile_id_map(), np.array([[3, 4], [5, -1]]))
+
+        tile_id_path = join(self.tmp_dir, "tile_id_map.npy")
+        tile_id_map = sec.get_tile_id_map(path=tile_id_path)
+        assert exists(tile_id_path)
+        assert_array_equal(np.load(tile_id_path), tile_id_map)
+
+        # Returned maps are copies of the memoised one
+        tile_id_map[0, 0] = -1
+        assert sec.get_tile_id_map(path=tile_id_path)[0, 0] == 3
+
+        # Changes on disk are picked up
+        np.save(tile_id_path, np.array([[7]]))
+        os.utime(tile_id_path, ns=(0, 0))
+        assert_array_equal(sec.get_tile_id_map(path=tile_id_path), np.array([[7]]))
+
+        # An existing json map is converted
+        json_dir = join(self.tmp_dir, "json")
+        os.makedirs(json_dir)
+        with open(join(json_dir, "tile_id_map.json"), "w") as f:
+            json.dump([[1, 2]], f)
+        tile_id_map = sec.get_tile_id_map(path=join(json_dir, "tile_id_map.npy"))
+        assert_array_equal(tile_id_map, np.array([[1, 2]]))
+        assert exists(join(json_dir, "tile_id_map.npy"))
+
+    def test_tile_coords(self):
+        sec = Section(
+            None, "section_init", False, True, "run_0", 123, 1, 11.1, 3072, 2304, 200
+        )
+        assert sec.get_tile_coords() is None
+        # Nothing is written for a section without tiles.
+        coords_path = join(self.tmp_dir, "tile_coords.npz")
+        assert sec.get_tile_coords(path=coords_path) is None
+        assert sec.get_tile_grid_shape(path=coords_path) is None
+        assert not exists(coords_path)
+
+        # Sparse grid with a hole and a large gap
+        Tile(sec, 3, "/not/important.tif", 0, 0, 1.2)
+        Tile(sec, 6, "/not/important.tif", 2104, 2872, 1.2)
+        Tile(sec, 7, "/not/important.tif", 10 * 2104, 5 * 2872, 1.2)
+        # Not on the grid
+        Tile(sec, 8, "/not/important.tif", 100, 0, 1.2)
+
+        coords = sec.get_tile_coords()
+        assert_array_equal(coords, np.array([[0, 0, 3], [1, 1, 6], [5, 10, 7]]))
+        assert sec.get_tile_grid_shape() == (6, 11)
+
+        tile_id_map = sec.get_tile_id_map()
+        assert tile_id_map.shape == (6, 11)
+        assert np.sum(tile_id_map != -1) == 3
+        assert tile_id_map[0, 0] == 3
+        assert tile_id_map[1, 1] == 6
+        assert tile_id_map[5, 10] == 7
+
+        # From disk, without building the dense tile-id-map
+        coords_path = join(self.tmp_dir, "tile_coords.npz")
+        with mock.patch.object(Section, "_compute_tile_id_map") as dense:
+            assert_array_equal(sec.get_tile_coords(path=coords_path), coords)
+            assert sec.get_tile_grid_shape(path=coords_path) == (6, 11)
+            dense.assert_not_called()
+        with np.load(coords_path) as data:
+            assert_array_equal(data["coords"], coords)
+
+        # Converted from an existing tile-id-map
+        tile_id_dir = join(self.tmp_dir, "converted")
+        os.makedirs(tile_id_dir)
+        tile_id_map[0, 0] = -1
+        np.save(join(tile_id_dir, "tile_id_map.npy"), tile_id_map)
+        coords_path = join(tile_id_dir, "tile_coords.npz")
+        assert_array_equal(sec.get_tile_coords(path=coords_path), coords[1:])
+        assert sec.get_tile_grid_shape(path=coords_path) == (6, 11)
+
+        # The last added tile wins
+        Tile(sec, 9, "/not/important.tif", 0, 0, 1.2)
+        assert_array_equal(sec.get_tile_coords()[0], np.array([0, 0, 9]))
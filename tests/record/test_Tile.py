@@ -7,6 +7,8 @@ import numpy as np
 from numpy.testing import assert_array_equal
 from tifffile import imwrite
 
+from sbem.record.Sample import Sample
+from sbem.record.Section import Section
 from sbem.record.Tile import Tile
 
 
@@ -59,3 +61,24 @@ class TileTest(TestCase):
         assert tile.get_section() == section
         assert tile.x == stage_x
         assert tile.y == stage_y
+
+    def test_relative_path(self):
+        sample = Sample(None, "sample", "desc", "docu", "")
+        section = Section(sample, "sec", False, False, "run_0", 1, 1, 11, 10, 10, 1)
+        tile = Tile(section, 1, "img.tif", 0, 0, 11.0)
+
+        # Unresolved without data root
+        assert tile.get_tile_path() == "img.tif"
+
+        sample.set_data_root("run_0", self.tmp_dir)
+        assert tile.get_tile_path() == join(self.tmp_dir, "img.tif")
+        assert_array_equal(tile.get_tile_data(), self.img)
+        assert tile.to_dict()["path"] == "img.tif"
+
+        # Absolute paths are not changed
+        tile_abs = Tile(section, 2, "/abs/img.tif", 0, 0, 11.0)
+        assert tile_abs.get_tile_path() == "/abs/img.tif"
+
+        sample.save(self.tmp_dir)
+        sample_loaded = Sample.load(join(self.tmp_dir, "sample", "sample.yaml"))
+        assert sample_loaded.get_data_roots() == {"run_0": self.tmp_dir}
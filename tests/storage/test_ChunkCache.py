@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+import numpy as np
+
+from sbem.storage.ChunkCache import ChunkCache
+
+
+class ChunkCacheTest(TestCase):
+    def test_lru(self):
+        cache = ChunkCache(max_bytes=300)
+        chunks = {i: np.full(100, i, dtype=np.uint8) for i in range(4)}
+        for i in range(3):
+            cache.put(i, chunks[i])
+        assert cache.get_n_bytes() == 300
+
+        # 0 becomes the most recently used chunk, 1 is evicted.
+        assert cache.get(0) is chunks[0]
+        cache.put(3, chunks[3])
+        assert cache.get(1) is None
+        assert cache.get(0) is chunks[0]
+        assert len(cache) == 3
+
+        # Chunks larger than the budget are not cached.
+        cache.put(4, np.zeros(400, dtype=np.uint8))
+        assert cache.get(4) is None
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.get_n_bytes() == 0
@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from numpy.testing import assert_array_equal
+
+from sbem.storage.SectionIndex import SectionIndex
+
+
+class SectionIndexTest(TestCase):
+    def test_insert_and_remove(self):
+        index = SectionIndex(capacity=2)
+        index.add(10, [0, 0, 0], (1, 5, 5), [0, 0, 5, 5])
+        index.add(11, [1, 2, 3], (1, 5, 5), None)
+        # Grows beyond the initial capacity.
+        index.add(12, [3, 0, 0], (1, 4, 4), [1, 1, 2, 2])
+        assert index.section_list() == [10, 11, None, 12]
+
+        # Insert shifts the sections above.
+        index.add(13, [1, 0, 0], (1, 6, 6), [0, 0, 6, 6])
+        assert index.section_list() == [10, 13, 11, None, 12]
+        assert_array_equal(index.get_offsets(11), [2, 2, 3])
+        assert_array_equal(index.get_offsets(12), [4, 0, 0])
+
+        # Empty z-positions are filled in place.
+        index.add(14, [3, 0, 0], (1, 6, 6), None)
+        assert index.section_list() == [10, 13, 11, 14, 12]
+
+        # Unless filling is disabled.
+        index.add(16, [5, 0, 0], (1, 6, 6), None)
+        index.add(17, [5, 0, 0], (1, 6, 6), None, fill=False)
+        assert index.section_list() == [10, 13, 11, 14, 12, 17, 16]
+        index.remove(17)
+        index.remove(16)
+
+        index.remove(13)
+        assert index.section_list() == [10, 11, 14, 12]
+        assert_array_equal(index.get_offsets(12), [3, 0, 0])
+        assert index.z_of(14) == 2
+        assert 13 not in index
+        assert index.last_section() == 12
+
+        # Records of removed sections are reused.
+        index.add(15, [4, 0, 0], (1, 2, 2), None)
+        assert index.get_shape(15) == (1, 2, 2)
+        assert index.get_bbox(15) is None
+        assert index.get_bbox(12) == [1, 1, 2, 2]
+
+    def test_dict_round_trip(self):
+        index = SectionIndex()
+        index.resize(3)
+        index.add(1, [2, 0, 0], (1, 5, 5), [0, 0, 1, 1], physical=0)
+        index.add(2, [0, 1, 1], (1, 5, 5), None, physical=1)
+        data = index.to_dict(z_indirection=True)
+        assert data["sections"] == [2, None, 1]
+        assert data["z_map"] == [1, None, 0]
+
+        # Volumes written before bounding boxes were tracked.
+        data["bboxes"].pop(1)
+        loaded = SectionIndex.from_dict(data)
+        assert loaded.section_list() == [2, None, 1]
+        assert loaded.z_map() == [1, None, 0]
+        assert loaded.get_used_physical() == {0, 1}
+        assert not loaded.has_bbox(1)
+        assert loaded.has_bbox(2)
+        assert_array_equal(loaded.get_offsets(2), [0, 1, 1])
@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from os.path import exists, join
+from unittest import TestCase
+
+import numpy as np
+import zarr
+from numpy.testing import assert_array_equal
+
+from sbem.storage.ShardedStore import ShardedStore
+
+
+class ShardedStoreTest(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sharded_store(self):
+        store = ShardedStore(join(self.tmp_dir, "store"), shards=(1, 2, 3))
+        root = zarr.group(store=store)
+        array = root.create_dataset(
+            "0",
+            shape=(2, 50, 70),
+            chunks=(1, 10, 10),
+            dtype=np.uint16,
+            dimension_separator="/",
+        )
+        data = np.random.randint(1, 255, size=array.shape, dtype=np.uint16)
+
+        def write(z_y):
+            z, y = z_y
+            array[z, y : y + 10] = data[z, y : y + 10]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(write, [(z, y) for z in range(2) for y in range(0, 50, 10)]))
+
+        assert exists(join(self.tmp_dir, "store", "0", "1", "2", "2"))
+        assert not exists(join(self.tmp_dir, "store", "0", "1", "5"))
+        assert len([k for k in store if not k.split("/")[-1].startswith(".")]) == 70
+
+        # Reopen with the stored shard shape
+        store = ShardedStore(join(self.tmp_dir, "store"))
+        assert store.shards == (1, 2, 3)
+        array = zarr.group(store=store)["0"]
+        assert_array_equal(array[:], data)
+
+        del store["0/1/4/6"]
+        assert "0/1/4/6" not in store
+        assert "0/1/4/5" in store
+        assert np.all(array[1, 40:, 60:] == 0)
@@ -1,17 +1,33 @@
+import json
 import logging
+import multiprocessing
+import os
 import shutil
 import tempfile
+import threading
+import time
+from glob import glob
 from os.path import exists, join
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import numpy as np
+import zarr
+from numcodecs import Blosc, Zstd
 from numpy.testing import assert_array_equal
+from ruyaml import YAML
 
 from sbem.record.Author import Author
 from sbem.record.Citation import Citation
 from sbem.storage.Volume import Volume
 
 
+def _concurrent_writer(args):
+    volume_path, sections = args
+    vol = Volume.load(volume_path)
+    for section_num, data, offsets in sections:
+        vol.write_section_concurrent(section_num, data, offsets)
+
+
 class VolumeTest(TestCase):
     def setUp(self) -> None:
         self.tmp_dir = tempfile.mkdtemp()
@@ -106,10 +122,10 @@ class VolumeTest(TestCase):
         assert vol.get_zarr_volume()["0"].shape == data.shape
         assert_array_equal(vol.get_zarr_volume()["0"][0:1, :123, :342], data)
         assert_array_equal(vol.get_section_data(123), data)
-        assert vol._section_list == [123]
-        assert 123 in vol._section_offset_map.keys()
-        assert len(vol._section_offset_map.keys()) == 1
-        assert_array_equal(vol._section_offset_map[123], np.array([0, 0, 0]))
+        assert vol.get_section_list() == [123]
+        assert 123 in vol.get_section_nums()
+        assert len(vol.get_section_nums()) == 1
+        assert_array_equal(vol.get_section_offsets(123), np.array([0, 0, 0]))
         assert_array_equal(vol.get_origin(), np.array([0, 0, 0]))
 
         # Prepend a section
@@ -127,11 +143,11 @@ class VolumeTest(TestCase):
         assert_array_equal(vol.get_section_data(124), data1)
         assert_array_equal(vol.get_zarr_volume()["0"][1:2, :123, :342], data)
         assert_array_equal(vol.get_section_data(123), data)
-        assert vol._section_list == [124, 123]
-        assert 124 in vol._section_offset_map.keys()
-        assert len(vol._section_offset_map.keys()) == 2
-        assert_array_equal(vol._section_offset_map[124], np.array([0, 0, 0]))
-        assert_array_equal(vol._section_offset_map[123], np.array([1, 0, 0]))
+        assert vol.get_section_list() == [124, 123]
+        assert 124 in vol.get_section_nums()
+        assert len(vol.get_section_nums()) == 2
+        assert_array_equal(vol.get_section_offsets(124), np.array([0, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(123), np.array([1, 0, 0]))
         assert_array_equal(vol.get_origin(), np.array([0, 0, 0]))
 
         # Append a section
@@ -147,12 +163,12 @@ class VolumeTest(TestCase):
         assert_array_equal(vol.get_section_data(123), data)
         assert_array_equal(vol.get_zarr_volume()["0"][2:3], data2)
         assert_array_equal(vol.get_section_data(125), data2)
-        assert vol._section_list == [124, 123, 125]
-        assert 125 in vol._section_offset_map.keys()
-        assert len(vol._section_offset_map.keys()) == 3
-        assert_array_equal(vol._section_offset_map[124], np.array([0, 0, 0]))
-        assert_array_equal(vol._section_offset_map[123], np.array([1, 0, 0]))
-        assert_array_equal(vol._section_offset_map[125], np.array([2, 0, 0]))
+        assert vol.get_section_list() == [124, 123, 125]
+        assert 125 in vol.get_section_nums()
+        assert len(vol.get_section_nums()) == 3
+        assert_array_equal(vol.get_section_offsets(124), np.array([0, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(123), np.array([1, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(125), np.array([2, 0, 0]))
         assert_array_equal(vol.get_origin(), np.array([0, 0, 0]))
 
         # Insert a section
@@ -176,15 +192,27 @@ class VolumeTest(TestCase):
         assert_array_equal(vol.get_section_data(123), data)
         assert_array_equal(vol.get_zarr_volume()["0"][3:4, :, :2744], data2)
         assert_array_equal(vol.get_section_data(125), data2)
-        assert vol._section_list == [124, 126, 123, 125]
-        assert 126 in vol._section_offset_map.keys()
-        assert len(vol._section_offset_map.keys()) == 4
-        assert_array_equal(vol._section_offset_map[124], np.array([0, 0, 0]))
-        assert_array_equal(vol._section_offset_map[126], np.array([1, 0, 0]))
-        assert_array_equal(vol._section_offset_map[123], np.array([2, 0, 0]))
-        assert_array_equal(vol._section_offset_map[125], np.array([3, 0, 0]))
+        assert vol.get_section_list() == [124, 126, 123, 125]
+        assert 126 in vol.get_section_nums()
+        assert len(vol.get_section_nums()) == 4
+        assert_array_equal(vol.get_section_offsets(124), np.array([0, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(126), np.array([1, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(123), np.array([2, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(125), np.array([3, 0, 0]))
         assert_array_equal(vol.get_origin(), np.array([0, 0, 0]))
 
+        # Empty z-positions are only filled in preallocated volumes, a
+        # section written into a gap is inserted.
+        data4 = np.random.randint(0, 255, size=(1, 100, 100))
+        vol.write_section(127, data4, (6, 0, 0))
+        assert vol.get_section_list() == [124, 126, 123, 125, None, None, 127]
+        data5 = np.random.randint(0, 255, size=(1, 100, 100))
+        vol.write_section(128, data5, (4, 0, 0))
+        assert vol.get_section_list() == [124, 126, 123, 125, 128, None, None, 127]
+        assert_array_equal(vol.get_section_offsets(127), np.array([7, 0, 0]))
+        assert_array_equal(vol.get_section_data(127), data4)
+        assert_array_equal(vol.get_section_data(128), data5)
+
     def test_write_with_offsets(self):
         vol = Volume(
             name="test-volume",
@@ -206,10 +234,10 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "0", "0", "0")
         )
         assert vol.get_zarr_volume()["0"].shape == data.shape
-        assert vol._section_list == [123]
-        assert 123 in vol._section_offset_map.keys()
-        assert len(vol._section_offset_map.keys()) == 1
-        assert_array_equal(vol._section_offset_map[123], np.array([0, 0, 0]))
+        assert vol.get_section_list() == [123]
+        assert 123 in vol.get_section_nums()
+        assert len(vol.get_section_nums()) == 1
+        assert_array_equal(vol.get_section_offsets(123), np.array([0, 0, 0]))
         assert_array_equal(vol.get_origin(), np.array([0, 0, 0]))
         assert_array_equal(vol.get_section_data(123), data)
 
@@ -220,10 +248,10 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "1", "0", "0")
         )
         assert vol.get_zarr_volume()["0"].shape == (2, 334, 523)
-        assert vol._section_list == [123, 124]
-        assert len(vol._section_offset_map.keys()) == 2
-        assert_array_equal(vol._section_offset_map[123], np.array([0, 0, 0]))
-        assert_array_equal(vol._section_offset_map[124], np.array([1, 100, 100]))
+        assert vol.get_section_list() == [123, 124]
+        assert len(vol.get_section_nums()) == 2
+        assert_array_equal(vol.get_section_offsets(123), np.array([0, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(124), np.array([1, 100, 100]))
         assert_array_equal(vol.get_origin(), np.array([0, 0, 0]))
         assert_array_equal(vol.get_zarr_volume()["0"][0, :123, :342], data[0])
         assert_array_equal(vol.get_section_data(123), data)
@@ -246,11 +274,11 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "2", "1", "0")
         )
         assert vol.get_zarr_volume()["0"].shape == (3, 3121, 632)
-        assert vol._section_list == [123, 124, 125]
-        assert len(vol._section_offset_map.keys()) == 3
-        assert_array_equal(vol._section_offset_map[123], np.array([0, 0, 0]))
-        assert_array_equal(vol._section_offset_map[124], np.array([1, 100, 100]))
-        assert_array_equal(vol._section_offset_map[125], np.array([2, 2700, 100]))
+        assert vol.get_section_list() == [123, 124, 125]
+        assert len(vol.get_section_nums()) == 3
+        assert_array_equal(vol.get_section_offsets(123), np.array([0, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(124), np.array([1, 100, 100]))
+        assert_array_equal(vol.get_section_offsets(125), np.array([2, 2700, 100]))
         assert_array_equal(vol.get_origin(), np.array([0, 0, 0]))
         assert_array_equal(vol.get_zarr_volume()["0"][0, :123, :342], data[0])
         assert_array_equal(vol.get_section_data(123), data)
@@ -285,15 +313,24 @@ class VolumeTest(TestCase):
         )
         print(vol.get_zarr_volume()["0"].shape)
         assert vol.get_zarr_volume()["0"].shape == (4, 5865, 6120)
-        assert vol._section_list == [123, 124, 125, 126]
-        assert len(vol._section_offset_map.keys()) == 4
-        assert_array_equal(vol._section_offset_map[123], np.array([0, 2744, 5488]))
-        assert_array_equal(vol._section_offset_map[124], np.array([1, 2844, 5588]))
-        assert_array_equal(vol._section_offset_map[125], np.array([2, 5444, 5588]))
+        assert vol.get_section_list() == [123, 124, 125, 126]
+        assert len(vol.get_section_nums()) == 4
+        # Offsets are relative to the origin and not changed by the shift.
+        assert_array_equal(vol.get_section_offsets(123), np.array([0, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(124), np.array([1, 100, 100]))
+        assert_array_equal(vol.get_section_offsets(125), np.array([2, 2700, 100]))
+        assert_array_equal(vol.get_section_offsets(126), np.array([3, -100, -2800]))
+        assert_array_equal(vol.get_origin(), np.array([0, 2744, 5488]))
         assert_array_equal(
-            vol._section_offset_map[126], np.array([3, 2744 - 100, 5488 - 2800])
+            vol.get_section_origin(126), np.array([3, 2744 - 100, 5488 - 2800])
         )
-        assert_array_equal(vol.get_origin(), np.array([0, 2744, 5488]))
+        translation = vol.get_zarr_volume().attrs["multiscales"][0]["datasets"][0][
+            "coordinateTransformations"
+        ][-1]
+        assert translation == {
+            "type": "translation",
+            "translation": [0.0, -2744.0, -5488.0],
+        }
         assert_array_equal(
             vol.get_zarr_volume()["0"][0, 2744 : 2744 + 123, 5488 : 5488 + 342], data[0]
         )
@@ -339,18 +376,19 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "0", "0", "0")
         )
         assert_array_equal(vol.get_section_data(123), data)
-        assert vol._section_list == [123]
-        assert 123 in vol._section_offset_map.keys()
-        assert 123 in vol._section_shape_map.keys()
+        assert vol.get_section_list() == [123]
+        assert 123 in vol.get_section_nums()
+        assert vol.get_section_shape(123) == data.shape
 
         # Remove first section
         vol.remove_section(123)
         assert not exists(
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "0")
         )
-        assert vol._section_list == []
-        assert 123 not in vol._section_offset_map.keys()
-        assert 123 not in vol._section_shape_map.keys()
+        assert vol.get_section_list() == []
+        assert 123 not in vol.get_section_nums()
+        with self.assertRaises(KeyError):
+            vol.get_section_shape(123)
 
         # Add section back
         vol.write_section(123, data, (0, 0, 0))
@@ -358,9 +396,9 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "0", "0", "0")
         )
         assert_array_equal(vol.get_section_data(123), data)
-        assert vol._section_list == [123]
-        assert 123 in vol._section_offset_map.keys()
-        assert 123 in vol._section_shape_map.keys()
+        assert vol.get_section_list() == [123]
+        assert 123 in vol.get_section_nums()
+        assert vol.get_section_shape(123) == data.shape
 
         # Add another two section
         data1 = np.random.randint(0, 255, size=(1, 123, 342))
@@ -373,9 +411,10 @@ class VolumeTest(TestCase):
         assert not exists(
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "3")
         )
-        assert vol._section_list == [123, None, 125]
-        assert 124 not in vol._section_offset_map.keys()
-        assert 124 not in vol._section_shape_map.keys()
+        assert vol.get_section_list() == [123, None, 125]
+        assert 124 not in vol.get_section_nums()
+        with self.assertRaises(KeyError):
+            vol.get_section_shape(124)
         assert_array_equal(vol.get_section_origin(123), np.array([0, 0, 0]))
         assert_array_equal(vol.get_section_origin(125), np.array([2, 0, 0]))
         assert vol.get_zarr_volume()["0"].shape == (3, 123, 342)
@@ -404,9 +443,9 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "0", "0", "0")
         )
         assert_array_equal(vol.get_section_data(123), data)
-        assert vol._section_list == [123]
-        assert 123 in vol._section_offset_map.keys()
-        assert 123 in vol._section_shape_map.keys()
+        assert vol.get_section_list() == [123]
+        assert 123 in vol.get_section_nums()
+        assert vol.get_section_shape(123) == data.shape
 
         # Add 2nd section with negative offset
         data1 = np.random.randint(0, 255, size=(1, 123, 342))
@@ -416,8 +455,8 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "0", "0", "1")
         )
         assert_array_equal(vol.get_section_data(123), data)
-        assert 123 in vol._section_offset_map.keys()
-        assert 123 in vol._section_shape_map.keys()
+        assert 123 in vol.get_section_nums()
+        assert vol.get_section_shape(123) == data.shape
 
         assert exists(
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "1", "0", "0")
@@ -426,9 +465,9 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "1", "0", "1")
         )
         assert_array_equal(vol.get_section_data(124), data1)
-        assert vol._section_list == [123, 124]
-        assert 124 in vol._section_offset_map.keys()
-        assert 124 in vol._section_shape_map.keys()
+        assert vol.get_section_list() == [123, 124]
+        assert 124 in vol.get_section_nums()
+        assert vol.get_section_shape(124) == data1.shape
         assert_array_equal(vol.get_origin(), np.array([0, 0, 2744]))
 
         # Add 3rd section with positive offset
@@ -440,8 +479,8 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "0", "0", "1")
         )
         assert_array_equal(vol.get_section_data(123), data)
-        assert 123 in vol._section_offset_map.keys()
-        assert 123 in vol._section_shape_map.keys()
+        assert 123 in vol.get_section_nums()
+        assert vol.get_section_shape(123) == data.shape
         assert exists(
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "1", "0", "0")
         )
@@ -449,8 +488,8 @@ class VolumeTest(TestCase):
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "1", "0", "1")
         )
         assert_array_equal(vol.get_section_data(124), data1)
-        assert 124 in vol._section_offset_map.keys()
-        assert 124 in vol._section_shape_map.keys()
+        assert 124 in vol.get_section_nums()
+        assert vol.get_section_shape(124) == data1.shape
 
         assert exists(
             join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "2", "0", "1")
@@ -459,9 +498,9 @@ class VolumeTest(TestCase):
         assert_array_equal(
             vol.get_zarr_volume()[0][2, :123, 2744 : 2744 + 342], data2[0]
         )
-        assert vol._section_list == [123, 124, 125]
-        assert 125 in vol._section_offset_map.keys()
-        assert 125 in vol._section_shape_map.keys()
+        assert vol.get_section_list() == [123, 124, 125]
+        assert 125 in vol.get_section_nums()
+        assert vol.get_section_shape(125) == data2.shape
 
     def test_save_and_load(self):
         vol = Volume(
@@ -493,15 +532,13 @@ class VolumeTest(TestCase):
         vol_store_path = vol.get_zarr_volume().chunk_store.dir_path()
         vol_load_store_path = vol_load.get_zarr_volume().chunk_store.dir_path()
         assert vol_store_path == vol_load_store_path
-        assert vol._section_list == vol_load._section_list
-        for k in vol._section_offset_map.keys():
-            assert_array_equal(
-                vol._section_offset_map[k], vol_load._section_offset_map[k]
-            )
-        for k in vol._section_shape_map.keys():
+        assert vol.get_section_list() == vol_load.get_section_list()
+        for k in vol.get_section_nums():
             assert_array_equal(
-                vol._section_shape_map[k], vol_load._section_shape_map[k]
+                vol.get_section_offsets(k), vol_load.get_section_offsets(k)
             )
+        for k in vol.get_section_nums():
+            assert_array_equal(vol.get_section_shape(k), vol_load.get_section_shape(k))
 
         # Add 2nd section with negative offset
         data1 = np.random.randint(0, 255, size=(1, 123, 342))
@@ -521,12 +558,992 @@ class VolumeTest(TestCase):
         vol_store_path = vol.get_zarr_volume().chunk_store.dir_path()
         vol_load_store_path = vol_load.get_zarr_volume().chunk_store.dir_path()
         assert vol_store_path == vol_load_store_path
-        assert vol._section_list == vol_load._section_list
-        for k in vol._section_offset_map.keys():
+        assert vol.get_section_list() == vol_load.get_section_list()
+        for k in vol.get_section_nums():
             assert_array_equal(
-                vol._section_offset_map[k], vol_load._section_offset_map[k]
+                vol.get_section_offsets(k), vol_load.get_section_offsets(k)
             )
-        for k in vol._section_shape_map.keys():
+        for k in vol.get_section_nums():
+            assert_array_equal(vol.get_section_shape(k), vol_load.get_section_shape(k))
+
+    def test_z_indirection(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            z_indirection=True,
+        )
+        zarr_dir = join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0")
+
+        data = np.random.randint(0, 255, size=(1, 123, 342))
+        vol.write_section(123, data, (0, 0, 0))
+        data1 = np.random.randint(0, 255, size=(1, 123, 342))
+        vol.write_section(124, data1, (1, 0, 0))
+
+        # Insert at the bottom of the stack
+        data2 = np.random.randint(0, 255, size=(1, 200, 100))
+        vol.write_section(125, data2, (0, 10, 0))
+
+        assert vol.get_section_list() == [125, 123, 124]
+        assert vol.get_z_map() == [2, 0, 1]
+        assert vol.get_zarr_volume()["0"].shape == (3, 210, 342)
+        assert_array_equal(vol.get_zarr_volume()["0"][0:1, :123, :342], data)
+        assert_array_equal(vol.get_zarr_volume()["0"][1:2, :123, :342], data1)
+        assert_array_equal(vol.get_section_offsets(125), np.array([0, 10, 0]))
+        assert_array_equal(vol.get_section_offsets(123), np.array([1, 0, 0]))
+        assert_array_equal(vol.get_section_offsets(124), np.array([2, 0, 0]))
+        assert vol.get_physical_z(125) == 2
+        assert_array_equal(vol.get_section_data(123), data)
+        assert_array_equal(vol.get_section_data(124), data1)
+        assert_array_equal(vol.get_section_data(125), data2)
+
+        # Remove from the middle, the freed slot is reused
+        vol.remove_section(123)
+        assert not exists(join(zarr_dir, "0"))
+        assert vol.get_section_list() == [125, 124]
+        assert vol.get_z_map() == [2, 1]
+        assert vol._free_slots == [0]
+        assert_array_equal(vol.get_section_offsets(124), np.array([1, 0, 0]))
+        assert_array_equal(vol.get_section_data(124), data1)
+
+        data3 = np.random.randint(0, 255, size=(1, 123, 342))
+        vol.write_section(126, data3, (1, 0, 0))
+        assert vol.get_section_list() == [125, 126, 124]
+        assert vol.get_z_map() == [2, 0, 1]
+        assert vol._free_slots == []
+        assert_array_equal(vol.get_section_data(126), data3)
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load.get_z_map() == [2, 0, 1]
+        assert vol_load._free_slots == []
+        for section_num, d in zip([125, 126, 124], [data2, data3, data1]):
+            assert_array_equal(vol_load.get_section_data(section_num), d)
+
+        # Removing the top slot shrinks the storage
+        vol_load.remove_section(125)
+        assert vol_load.get_zarr_volume()["0"].shape == (2, 210, 342)
+        assert vol_load.get_z_map() == [0, 1]
+        assert_array_equal(vol_load.get_section_data(126), data3)
+        assert_array_equal(vol_load.get_section_data(124), data1)
+
+    def test_origin_margin(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            origin_margin_chunks=2,
+        )
+        zarr_dir = join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0")
+
+        data = np.random.randint(0, 255, size=(1, 123, 342))
+        vol.write_section(123, data, (0, 0, 0))
+        assert_array_equal(vol.get_origin(), np.array([0, 5488, 5488]))
+        assert vol.get_zarr_volume()["0"].shape == (1, 5488 + 123, 5488 + 342)
+        assert exists(join(zarr_dir, "0", "2", "2"))
+        assert not exists(join(zarr_dir, "0", "0", "0"))
+        assert_array_equal(vol.get_section_data(123), data)
+        chunk_inode = os.stat(join(zarr_dir, "0", "2", "2")).st_ino
+
+        # Negative offsets within the margin do not move any chunk
+        data1 = np.random.randint(0, 255, size=(1, 121, 332))
+        vol.write_section(124, data1, (1, -100, -2800))
+        assert_array_equal(vol.get_origin(), np.array([0, 5488, 5488]))
+        assert os.stat(join(zarr_dir, "0", "2", "2")).st_ino == chunk_inode
+        assert_array_equal(vol.get_section_data(123), data)
+        assert_array_equal(vol.get_section_data(124), data1)
+
+        # Exceeding the margin grows the volume by at least another margin
+        data2 = np.random.randint(0, 255, size=(1, 100, 100))
+        vol.write_section(125, data2, (2, 0, -6000))
+        assert_array_equal(vol.get_origin(), np.array([0, 5488, 10976]))
+        assert_array_equal(vol.get_section_offsets(125), np.array([2, 0, -6000]))
+        assert_array_equal(vol.get_section_data(123), data)
+        assert_array_equal(vol.get_section_data(124), data1)
+        assert_array_equal(vol.get_section_data(125), data2)
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load._origin_margin_chunks == 2
+        assert_array_equal(vol_load.get_section_data(125), data2)
+
+    def test_prepend_is_amortised(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+        )
+        data = np.random.randint(1, 255, size=(20, 1, 16, 16), dtype=np.uint8)
+        vol.write_section(0, data[0], (0, 0, 0))
+        origins = set()
+        for z in range(1, 20):
+            vol.write_section(z, data[z], (z, 0, -12 * z))
+            origins.add(int(vol.get_origin()[2]))
+        # The prepended chunks double: 1, 2, 4 and 8 chunks.
+        assert sorted(origins) == [32, 96, 224, 480]
+        for z in range(20):
+            assert_array_equal(vol.get_section_data(z), data[z])
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load._prepend_chunks == [1, 1, 16]
+
+    def test_load_format_0_1_0(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+        )
+        data = np.random.randint(1, 255, size=(2, 1, 50, 60), dtype=np.uint8)
+        vol.write_section(0, data[0], (0, 0, 0))
+        vol.write_section(1, data[1], (1, -10, -10))
+        assert_array_equal(vol.get_origin(), [0, 2744, 2744])
+        vol.save()
+
+        # Before 0.2.0 the offsets were stored as zarr indices.
+        volume_path = join(self.tmp_dir, "test-volume", "volume.yaml")
+        yaml = YAML(typ="rt")
+        with open(volume_path) as f:
+            old = yaml.load(f)
+        keys = ["name", "root_dir", "license", "description", "documentation"]
+        keys += ["authors", "cite", "data", "sections", "shapes", "origin"]
+        old = {k: old[k] for k in keys}
+        old["format_version"] = "0.1.0"
+        old["offsets"] = {0: [0, 2744, 2744], 1: [1, 2734, 2734]}
+        with open(volume_path, "w") as f:
+            yaml.dump(old, f)
+
+        vol_load = Volume.load(volume_path)
+        assert_array_equal(vol_load.get_section_offsets(1), [1, -10, -10])
+        assert_array_equal(vol_load.get_section_data(0), data[0])
+        assert_array_equal(vol_load.get_section_data(1), data[1])
+        assert vol_load.to_dict()["format_version"] == "0.2.0"
+
+    def test_parallel_write(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            n_workers=4,
+        )
+
+        data = np.random.randint(0, 255, size=(1, 3000, 5600), dtype=np.uint8)
+        vol.write_section(1, data, (0, 0, 0))
+        data1 = np.random.randint(0, 255, size=(1, 2900, 5700), dtype=np.uint8)
+        vol.write_section(2, data1, (1, 100, -20))
+        data2 = np.random.randint(0, 255, size=(1, 2000, 3000), dtype=np.uint8)
+        vol.write_section(3, data2, (2, 10, 10))
+
+        assert_array_equal(vol.get_section_data(1), data)
+        assert_array_equal(vol.get_section_data(2), data1)
+        assert_array_equal(vol.get_section_data(3), data2)
+        assert np.all(vol.get_zarr_volume()["0"][2, 2030:] == 0)
+
+    def test_append_sections(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+        )
+
+        sections = {
+            i: np.random.randint(0, 255, size=(1, 100 + i, 120), dtype=np.uint8)
+            for i in range(5)
+        }
+
+        def render():
+            for i, data in sections.items():
+                yield i, data, (1, i, -i)
+
+        assert vol.append_sections(render(), queue_size=1) == list(range(5))
+        assert vol.get_section_list() == list(range(5))
+        for i, data in sections.items():
+            assert_array_equal(vol.get_section_data(i), data)
+        assert_array_equal(vol.get_section_offsets(4), np.array([4, 10, -10]))
+
+        def failing():
+            yield 5, sections[0], (1, 0, 0)
+            raise RuntimeError("render failed")
+
+        with self.assertRaises(RuntimeError):
+            vol.append_sections(failing())
+        assert vol.get_section_list() == list(range(6))
+
+    def test_chunks_and_rechunk(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks="auto",
+        )
+        data = np.random.randint(0, 255, size=(1, 300, 5000), dtype=np.uint8)
+        vol.write_section(0, data, (0, 0, 0))
+        assert vol.get_chunks() == (1, 300, 2880)
+        for i in range(1, 6):
+            vol.write_section(i, data[:, ::-1] // i, (i, 3, -5))
+
+        vol.rechunk((4, 64, 64), max_memory=2**20, n_workers=3)
+        assert vol.get_chunks() == (4, 64, 64)
+        assert vol.get_zarr_volume()["0"].compressor == vol.get_compressor()
+        assert_array_equal(vol.get_section_data(0), data)
+        for i in range(1, 6):
+            assert_array_equal(vol.get_section_data(i), data[:, ::-1] // i)
+
+        # Appending works with any chunk shape, moving sections does not.
+        vol.write_section(6, data, (6, 0, 0))
+        assert_array_equal(vol.get_section_data(6), data)
+        with self.assertRaises(AssertionError):
+            vol.remove_section(2)
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load.get_chunks() == (4, 64, 64)
+        assert_array_equal(vol_load.get_section_data(3), data[:, ::-1] // 3)
+
+        # Interrupted before the rechunked array was moved into place.
+        root = join(self.tmp_dir, "test-volume", "ngff_volume.zarr")
+        shutil.copytree(join(root, "0"), join(root, "0_rechunked"))
+        os.replace(join(root, "0"), join(root, "0_old"))
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert sorted(os.listdir(root)) == [".zattrs", ".zgroup", "0", "zmetadata"]
+        assert_array_equal(vol_load.get_section_data(3), data[:, ::-1] // 3)
+
+        # Interrupted before the old array was deleted.
+        shutil.copytree(join(root, "0"), join(root, "0_old"))
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert not exists(join(root, "0_old"))
+        assert_array_equal(vol_load.get_section_data(3), data[:, ::-1] // 3)
+
+    def test_sharded(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            n_workers=2,
+            chunks=(1, 32, 32),
+            shards=(1, 4, 4),
+        )
+        zarr_dir = join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0")
+
+        data = np.random.randint(1, 255, size=(1, 200, 300), dtype=np.uint8)
+        vol.write_section(0, data, (0, 0, 0))
+        # 7 x 10 chunks are stored in 2 x 3 shards
+        assert sorted(os.listdir(join(zarr_dir, "0"))) == ["0", "1"]
+        assert sorted(os.listdir(join(zarr_dir, "0", "1"))) == ["0", "1", "2"]
+
+        data1 = np.random.randint(1, 255, size=(1, 150, 100), dtype=np.uint8)
+        vol.write_section(1, data1, (1, -40, 10))
+        assert_array_equal(vol.get_origin(), np.array([0, 128, 0]))
+        data2 = np.random.randint(1, 255, size=(1, 150, 100), dtype=np.uint8)
+        vol.write_section(2, data2, (1, 5, 5))
+        vol.remove_section(1)
+
+        for sec, d in [(0, data), (2, data2)]:
+            assert_array_equal(vol.get_section_data(sec), d)
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load._shards == (1, 4, 4)
+        assert_array_equal(vol_load.get_section_data(0), data)
+        assert_array_equal(vol_load.get_section_data(2), data2)
+
+    def test_empty_chunks_and_bbox(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+        )
+        zarr_dir = join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0")
+
+        data = np.zeros((1, 100, 200), dtype=np.uint8)
+        data[0, 40:50, 70:75] = 3
+        vol.write_section(1, data, (0, 0, 0))
+        assert vol.get_section_bbox(1) == [40, 70, 50, 75]
+        assert sorted(os.listdir(join(zarr_dir, "0"))) == ["1"]
+        assert sorted(os.listdir(join(zarr_dir, "0", "1"))) == ["2"]
+        assert_array_equal(vol.get_section_data(1), data)
+
+        empty = np.zeros((1, 60, 60), dtype=np.uint8)
+        vol.write_section(2, empty, (1, -50, -10))
+        assert vol.get_section_bbox(2) is None
+        assert not exists(join(zarr_dir, "1"))
+        assert_array_equal(vol.get_section_data(2), empty)
+        assert_array_equal(vol.get_section_data(1), data)
+
+        # Only the chunk within the bounding box of section 1 is read.
+        get_block = zarr.Array.get_block_selection
+        with mock.patch.object(
+            zarr.Array, "get_block_selection", autospec=True, side_effect=get_block
+        ) as read:
+            region = vol.read_region([0, -50, -10, 2, 100, 200])
+        assert read.call_count == 1
+        assert_array_equal(region[0, 50:, 10:], data[0])
+        assert not np.any(region[1])
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load.get_section_bbox(1) == [40, 70, 50, 75]
+        assert vol_load.get_section_bbox(2) is None
+        vol_load.remove_section(1)
+        assert 1 not in vol_load.get_section_nums()
+
+    def test_negative_offsets_without_copy(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+        )
+        data = np.random.randint(1, 255, size=(1, 50, 60), dtype=np.uint8)
+        vol.write_section(1, data, (0, 0, 0))
+
+        data1 = np.random.randint(1, 255, size=(1, 50, 60), dtype=np.uint8)
+        with mock.patch.object(vol, "_write_data", wraps=vol._write_data) as write:
+            vol.write_section(2, data1, (1, -40, -5))
+        slices, written = write.call_args[0]
+        assert written is data1
+        assert slices == (slice(1, 2), slice(24, 74), slice(27, 87))
+        assert_array_equal(vol.get_section_data(1), data)
+        assert_array_equal(vol.get_section_data(2), data1)
+        assert np.all(vol.get_zarr_volume()["0"][1, :24] == 0)
+
+    def test_read_region(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            n_workers=3,
+            chunks=(1, 32, 32),
+            z_indirection=True,
+        )
+        data = np.random.randint(1, 255, size=(3, 100, 120), dtype=np.uint8)
+        vol.write_section(1, data[:1], (0, 0, 0))
+        vol.write_section(3, data[2:], (1, -10, 0))
+        vol.write_section(2, data[1:2], (1, 0, -20))
+        # The volume in logical z order, relative to the origin (-10, -20).
+        expected = np.zeros((3, 110, 140), dtype=np.uint8)
+        expected[0, 10:, 20:] = data[0]
+        expected[1, 10:, :120] = data[1]
+        expected[2, :100, 20:] = data[2]
+
+        region = vol.read_region([0, -5, -20, 3, 60, 70])
+        assert_array_equal(region, expected[:, 5:70, :90])
+        assert len(vol._chunk_cache) > 0
+
+        with mock.patch.object(vol, "_fetch_chunks", wraps=vol._fetch_chunks):
+            with mock.patch("zarr.Array.get_block_selection") as fetch:
+                region = vol.read_region([1, 0, 0, 3, 30, 30])
+                fetch.assert_not_called()
+        assert_array_equal(region, expected[1:3, 10:40, 20:50])
+
+        # Outside of the volume
+        region = vol.read_region([2, -50, 100, 5, -5, 130])
+        assert region.shape == (3, 45, 30)
+        assert_array_equal(region[0, 40:, :20], expected[2, :5, 120:])
+        assert np.all(region[0, :, 20:] == 0)
+        assert np.all(region[1:] == 0)
+
+        # Slabs span the whole chunk-aligned storage
+        oy, ox = vol.get_origin()[1:]
+        slab = vol.read_slab("xz", 50)
+        assert slab.shape == (3, vol.get_zarr_volume()["0"].shape[2])
+        assert_array_equal(slab[:, ox - 20 : ox + 120], expected[:, 60])
+        slab = vol.read_slab("yz", -3)
+        assert_array_equal(slab[:, oy - 10 : oy + 100], expected[:, :, 17])
+
+        vol.remove_section(2)
+        assert len(vol._chunk_cache) == 0
+        slab = vol.read_slab("xz", 50)
+        assert_array_equal(slab[:, ox - 20 : ox + 120], expected[[0, 2], 60])
+
+    def test_multiscale_levels(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            n_workers=2,
+            chunks=(1, 32, 32),
+            n_levels=3,
+        )
+
+        def assert_pyramid():
+            level_0 = vol.get_zarr_volume()["0"][:]
+            for level in [1, 2]:
+                f = 2**level
+                array = vol.get_zarr_volume()[str(level)]
+                assert array.chunks == (1, 32 // f, 32 // f)
+                assert_array_equal(array[:], level_0[:, ::f, ::f])
+
+        data = np.random.randint(1, 255, size=(4, 90, 110), dtype=np.uint8)
+        vol.write_section(0, data[:1], (0, 0, 0))
+        assert_pyramid()
+        vol.write_section(1, data[1:2], (1, -40, 7))
+        assert_pyramid()
+        vol.write_section(2, data[2:3], (1, 3, -3))
+        assert_pyramid()
+        assert_array_equal(vol.get_section_data(1), data[1:2])
+        vol.remove_section(0)
+        assert_pyramid()
+        assert vol.get_zarr_volume()["2"].shape[0] == 2
+
+        # Only the chunks touched by a section are downsampled.
+        with mock.patch("zarr.Array.set_block_selection") as update:
+            vol.write_section(3, data[3:4, :20, :20], (2, 0, 0))
+            # One chunk of level 0 -> one chunk on each of the two lower levels
+            assert update.call_count == 2
+
+        datasets = vol.get_zarr_volume().attrs["multiscales"][0]["datasets"]
+        assert [d["path"] for d in datasets] == ["0", "1", "2"]
+        assert datasets[2]["coordinateTransformations"] == [
+            {"type": "scale", "scale": [1.0, 4.0, 4.0]},
+            {"type": "translation", "translation": [-0.0, -64.0, -32.0]},
+        ]
+        assert_array_equal(vol.get_origin(), np.array([0, 64, 32]))
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load._n_levels == 3
+
+    def test_concurrent_writers(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+            n_levels=2,
+        )
+        vol.preallocate((6, 100, 120), (0, 10, 20))
+        vol.save()
+        volume_path = join(self.tmp_dir, "test-volume", "volume.yaml")
+
+        data = np.random.randint(1, 255, size=(6, 1, 80, 90), dtype=np.uint8)
+        jobs = [
+            (volume_path, [(z, data[z], (z, z, -z)) for z in range(w, 6, 3)])
+            for w in range(3)
+        ]
+        with multiprocessing.get_context("spawn").Pool(3) as pool:
+            pool.map(_concurrent_writer, jobs)
+
+        assert len(glob(join(self.tmp_dir, "test-volume", "journals", "*"))) == 3
+        # Z-positions in unmerged journals are used.
+        with self.assertRaises(AssertionError):
+            vol.write_section_concurrent(9, data[1], (0, 0, 0), writer_id="w")
+        assert sorted(vol.merge_journals()) == list(range(6))
+        assert glob(join(self.tmp_dir, "test-volume", "journals", "*")) == []
+
+        vol_load = Volume.load(volume_path)
+        assert vol_load.get_section_list() == list(range(6))
+        for z in range(6):
+            assert_array_equal(vol_load.get_section_data(z), data[z])
+            assert_array_equal(vol_load.get_section_offsets(z), [z, z, -z])
+        level_0 = vol_load.get_zarr_volume()["0"][:]
+        assert_array_equal(vol_load.get_zarr_volume()["1"][:], level_0[:, ::2, ::2])
+
+        # Writing an occupied z-position is detected before writing.
+        with self.assertRaises(AssertionError):
+            vol_load.write_section_concurrent(7, data[0], (2, 0, 0), writer_id="w")
+        assert_array_equal(vol_load.get_section_data(2), data[2])
+        assert glob(join(self.tmp_dir, "test-volume", "journals", "*")) == []
+
+        # Sections must fit into the preallocated volume.
+        with self.assertRaises(AssertionError):
+            vol_load.write_section_concurrent(8, data[0], (5, 50, 0))
+
+        # Conflicting journals are restored.
+        journal_dir = join(self.tmp_dir, "test-volume", "journals")
+        entry = {"op": "write", "offsets": [1, 0, 0], "shape": [1, 80, 90]}
+        entry["bbox"] = None
+        with open(join(journal_dir, "a.jsonl"), "w") as f:
+            f.write(json.dumps(dict(entry, section_num=10, seq=1)) + "\n")
+        with open(join(journal_dir, "b.jsonl"), "w") as f:
+            f.write(json.dumps(dict(entry, section_num=11, seq=1)) + "\n")
+        with self.assertRaises(RuntimeError):
+            vol_load.merge_journals()
+        assert sorted(os.listdir(journal_dir)) == ["a.jsonl", "b.jsonl"]
+        assert vol_load.get_section_list() == list(range(6))
+
+    def test_concurrent_writers_same_z(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+        )
+        vol.preallocate((2, 64, 64))
+        vol.save()
+        volume_path = join(self.tmp_dir, "test-volume", "volume.yaml")
+        data = np.random.randint(1, 255, size=(3, 1, 64, 64), dtype=np.uint8)
+
+        write_data = Volume._write_data
+
+        def slow_write(self, slices, data):
+            time.sleep(0.2)
+            write_data(self, slices, data)
+
+        errors = {}
+
+        def write(section_num):
+            try:
+                vol_w = Volume.load(volume_path)
+                vol_w.write_section_concurrent(
+                    section_num,
+                    data[section_num],
+                    (0, 0, 0),
+                    writer_id=str(section_num),
+                )
+            except AssertionError as e:
+                errors[section_num] = e
+
+        # The second writer fails before writing any pixel.
+        with mock.patch.object(Volume, "_write_data", slow_write):
+            threads = [threading.Thread(target=write, args=(i,)) for i in [1, 2]]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert len(errors) == 1
+        winner = 3 - list(errors.keys())[0]
+
+        # Reservations of sections which are still written are kept.
+        journal_dir = join(self.tmp_dir, "test-volume", "journals")
+        with open(join(journal_dir, "w.jsonl"), "w") as f:
+            f.write(
+                json.dumps({"op": "reserve", "section_num": 0, "offsets": [1, 0, 0]})
+            )
+            f.write("\n")
+        assert vol.merge_journals() == [winner]
+        assert vol.get_section_list() == [winner, None]
+        assert_array_equal(vol.get_section_data(winner), data[winner])
+        assert os.listdir(journal_dir) == ["w.jsonl"]
+        with self.assertRaises(AssertionError):
+            vol.write_section_concurrent(2, data[2], (1, 0, 0))
+
+        assert vol.merge_journals(drop_reservations=True) == []
+        assert os.listdir(journal_dir) == []
+
+    def test_metadata_journal(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+            z_indirection=True,
+            journal=True,
+            compact_every=8,
+        )
+        vol_dir = join(self.tmp_dir, "test-volume")
+        with open(join(vol_dir, "volume.yaml")) as f:
+            snapshot = f.read()
+
+        data = np.random.randint(1, 255, size=(5, 1, 40, 50), dtype=np.uint8)
+        vol.write_section(0, data[0], (0, 0, 0))
+        vol.write_section(1, data[1], (1, -40, 5))
+        vol.save()
+        vol.write_section(2, data[2], (1, 3, 3))
+        vol.remove_section(0)
+        vol.save()
+
+        # Saves only append to the journal.
+        with open(join(vol_dir, "volume.yaml")) as f:
+            assert f.read() == snapshot
+        assert exists(join(vol_dir, "volume.journal.jsonl"))
+
+        def assert_same(vol_a, vol_b):
+            assert vol_a.get_section_list() == vol_b.get_section_list()
+            assert vol_a.get_z_map() == vol_b.get_z_map()
+            assert vol_a._free_slots == vol_b._free_slots
+            assert_array_equal(vol_a.get_origin(), vol_b.get_origin())
+            for s in vol_a.get_section_list():
+                assert_array_equal(
+                    vol_a.get_section_offsets(s), vol_b.get_section_offsets(s)
+                )
+                assert vol_a.get_section_shape(s) == vol_b.get_section_shape(s)
+                assert vol_a.get_section_bbox(s) == vol_b.get_section_bbox(s)
+
+        vol_load = Volume.load(join(vol_dir, "volume.yaml"))
+        assert_same(vol, vol_load)
+        assert_array_equal(vol_load.get_section_data(1), data[1])
+        assert_array_equal(vol_load.get_section_data(2), data[2])
+
+        # Unsaved operations are not visible.
+        vol.write_section(3, data[3], (0, 0, 0))
+        vol_load = Volume.load(join(vol_dir, "volume.yaml"))
+        assert 3 not in vol_load.get_section_list()
+
+        # The journal is compacted into the snapshot.
+        vol.write_section(4, data[4], (3, 0, 0))
+        vol.save()
+        assert not exists(join(vol_dir, "volume.journal.jsonl"))
+        vol_load = Volume.load(join(vol_dir, "volume.yaml"))
+        assert_same(vol, vol_load)
+
+        # Entries already contained in the snapshot are skipped.
+        vol.remove_section(4)
+        vol.save()
+        shutil.copy(
+            join(vol_dir, "volume.journal.jsonl"), join(self.tmp_dir, "journal")
+        )
+        vol.compact()
+        shutil.copy(
+            join(self.tmp_dir, "journal"), join(vol_dir, "volume.journal.jsonl")
+        )
+        vol_load = Volume.load(join(vol_dir, "volume.yaml"))
+        assert_same(vol, vol_load)
+
+    def test_read_only(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+            n_levels=2,
+        )
+        data = np.random.randint(1, 255, size=(2, 64, 64), dtype=np.uint8)
+        vol.write_section(1, data[:1], (0, 0, 0))
+        vol.write_section(2, data[1:], (1, -10, 5))
+        vol.save()
+        vol_dir = join(self.tmp_dir, "test-volume")
+        assert ".zmetadata" in vol.get_zarr_volume().store
+
+        before = sorted(glob(join(vol_dir, "**"), recursive=True))
+        with mock.patch("os.makedirs") as makedirs:
+            vol_load = Volume.load(join(vol_dir, "volume.yaml"), read_only=True)
+            makedirs.assert_not_called()
+        assert_array_equal(vol_load.get_section_data(2), data[1:])
+        assert_array_equal(
+            vol_load.read_region([0, -10, 0, 2, 64, 69], level=1),
+            vol.read_region([0, -10, 0, 2, 64, 69], level=1),
+        )
+
+        with self.assertRaises(AssertionError):
+            vol_load.write_section(3, data[:1], (2, 0, 0))
+        with self.assertRaises(AssertionError):
+            vol_load.remove_section(1)
+        with self.assertRaises(AssertionError):
+            vol_load.save()
+        assert sorted(glob(join(vol_dir, "**"), recursive=True)) == before
+
+    def test_to_dask(self):
+        for z_indirection in [False, True]:
+            vol = Volume(
+                name=f"test-volume-{z_indirection}",
+                description="description",
+                documentation="documentation",
+                authors=[Author(name="author 1", affiliation="aff 1")],
+                root_dir=self.tmp_dir,
+                exist_ok=False,
+                license="license",
+                cite=[Citation(doi="doi", text="text", url="url")],
+                logger=logging,
+                chunks=(1, 32, 32),
+                n_levels=2,
+                z_indirection=z_indirection,
+            )
+            data = np.random.randint(1, 255, size=(3, 64, 64), dtype=np.uint8)
+            vol.write_section(1, data[:1], (0, 0, 0))
+            vol.write_section(3, data[2:], (2, -10, 0))
+            vol.write_section(2, data[1:2], (1, 0, 20))
+            vol.remove_section(2)
+            vol.write_section(4, data[1:2], (0, 5, 5))
+
+            for level in range(2):
+                volume = vol.to_dask(level)
+                assert volume.chunks[1][0] == 32 // 2**level
+                oy, ox = vol.get_origin()[1:] // 2**level
+                z_max = len(vol.get_section_list())
+                y_max, x_max = volume.shape[1] - oy, volume.shape[2] - ox
+                bbox = [0, -oy, -ox, z_max, y_max, x_max]
+                expected = vol.read_region(bbox, level=level)
+                assert_array_equal(volume.compute(), expected)
+
+            volume = vol.to_dask()
+            oy, ox = vol.get_origin()[1:]
+            assert_array_equal(volume[0, 5 + oy : 69 + oy, 5 + ox : 69 + ox], data[1])
+
+    def test_remove_sections(self):
+        for z_indirection in [False, True]:
+            vol = Volume(
+                name=f"test-volume-{z_indirection}",
+                description="description",
+                documentation="documentation",
+                authors=[Author(name="author 1", affiliation="aff 1")],
+                root_dir=self.tmp_dir,
+                exist_ok=False,
+                license="license",
+                cite=[Citation(doi="doi", text="text", url="url")],
+                logger=logging,
+                chunks=(1, 32, 32),
+                n_levels=2,
+                z_indirection=z_indirection,
+                n_workers=3,
+                journal=True,
+            )
+            data = np.random.randint(1, 255, size=(10, 64, 64), dtype=np.uint8)
+            for z in range(10):
+                vol.write_section(z, data[z : z + 1], (z, z, 0))
+            vol.save()
+
+            with mock.patch("sbem.storage.Volume.move", wraps=shutil.move) as moves:
+                vol.remove_sections([1, 8, 4, 5])
+            # Every remaining slab above the first removed one moves once
+            # per level, with z-indirection only the slabs in the top slots.
+            n_moved = 3 if z_indirection else 5
+            assert moves.call_count == 2 * n_moved
+
+            assert vol.get_section_list() == [0, 2, 3, 6, 7, 9]
+            assert vol.get_zarr_volume()["0"].shape[0] == 6
+            assert vol.get_zarr_volume()["1"].shape[0] == 6
+            assert_array_equal(vol.get_section_offsets(9), [5, 9, 0])
+            for s in vol.get_section_list():
+                assert_array_equal(vol.get_section_data(s), data[s : s + 1])
             assert_array_equal(
-                vol._section_shape_map[k], vol_load._section_shape_map[k]
+                vol.to_dask(1).compute(), vol.to_dask(0).compute()[:, ::2, ::2]
+            )
+
+            vol.save()
+            vol_load = Volume.load(join(self.tmp_dir, vol.get_name(), "volume.yaml"))
+            assert vol_load.get_section_list() == vol.get_section_list()
+            assert vol_load.get_z_map() == vol.get_z_map()
+            assert vol_load._free_slots == []
+
+    def test_check_and_repair(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+            n_levels=2,
+            n_workers=2,
+        )
+        data = np.zeros((4, 64, 64), dtype=np.uint8)
+        data[:, 10:30, 10:30] = 1
+        for z in range(4):
+            vol.write_section(z, data[z : z + 1], (z, 0, 0))
+        report = vol.check()
+        assert all(len(v) == 0 for v in report.values())
+
+        zarr_dir = join(self.tmp_dir, "test-volume", "ngff_volume.zarr")
+        # An interrupted removal of section 1 which moved section 2 only.
+        shutil.rmtree(join(zarr_dir, "0", "1"))
+        shutil.rmtree(join(zarr_dir, "1", "1"))
+        shutil.move(join(zarr_dir, "0", "2"), join(zarr_dir, "0", "1"))
+        shutil.move(join(zarr_dir, "1", "2"), join(zarr_dir, "1", "1"))
+        # A chunk outside of the bounding box of section 3 and a slab above.
+        os.makedirs(join(zarr_dir, "0", "3", "1"))
+        shutil.copy(
+            join(zarr_dir, "0", "3", "0", "0"), join(zarr_dir, "0", "3", "1", "0")
+        )
+        shutil.copytree(join(zarr_dir, "0", "3"), join(zarr_dir, "0", "4"))
+
+        with mock.patch("zarr.Array.get_block_selection") as read:
+            report = vol.check()
+            read.assert_not_called()
+        assert report["orphaned_slabs"] == [(0, 4)]
+        assert report["orphaned_chunks"] == [(0, 3, 1, 0)]
+        assert report["missing_sections"] == [2]
+        assert report["shape_mismatch"] == []
+
+        vol.check(repair=True)
+        assert not exists(join(zarr_dir, "0", "4"))
+        assert not exists(join(zarr_dir, "0", "3", "1", "0"))
+        report = vol.check()
+        assert report["missing_sections"] == [2]
+        assert len(report["orphaned_slabs"]) == 0
+        assert len(report["orphaned_chunks"]) == 0
+
+        # An interrupted reshape of level 0.
+        storage = vol.get_zarr_volume()["0"]
+        vol._reshape_multiscale_level([5, 64, 64], storage)
+        assert vol.check()["shape_mismatch"] == [0]
+        vol.check(repair=True)
+        assert vol.get_zarr_volume()["0"].shape == (4, 64, 64)
+
+    def test_chunk_stats(self):
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+            chunk_stats=True,
+        )
+        data = np.zeros((3, 64, 64), dtype=np.uint8)
+        data[0, 10:20, 10:20] = 100
+        data[1] = np.random.randint(50, 200, size=(64, 64))
+        vol.write_section(1, data[:1], (0, 0, 0))
+        vol.write_section(2, data[1:2], (1, -40, 10))
+        vol.write_section(3, data[2:], (2, 0, 0))
+
+        storage = vol.get_zarr_volume()["0"]
+        for z, section_num in enumerate(vol.get_section_list()):
+            stats = vol.get_chunk_stats(section_num)
+            cy, cx = stats["chunk_start"]
+            for iy, ix in np.ndindex(stats["mean"].shape):
+                chunk = storage.get_block_selection((z, cy + iy, cx + ix))
+                assert stats["max"][iy, ix] == chunk.max()
+                # Edge chunks are reduced over the full chunk shape.
+                assert stats["mean"][iy, ix] == chunk.sum() / 32**2
+                assert stats["nonzero"][iy, ix] == np.count_nonzero(chunk) / 32**2
+        assert np.all(vol.get_chunk_stats(3)["nonzero"] == 0)
+
+        lo, hi = vol.get_contrast_range()
+        assert 32 <= lo <= 64 and 192 <= hi <= 224
+        with self.assertRaises(AssertionError):
+            vol.get_contrast_range([])
+        os.remove(join(self.tmp_dir, "test-volume", "chunk_stats", "3.npz"))
+        with self.assertRaises(AssertionError):
+            vol.get_contrast_range()
+        vol.update_chunk_stats()
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load.get_contrast_range([1]) == (96, 112)
+        vol_load.remove_section(1)
+        assert not exists(join(self.tmp_dir, "test-volume", "chunk_stats", "1.npz"))
+
+    def test_compressor_per_level(self):
+        compressors = [Blosc(cname="lz4", clevel=5, shuffle=Blosc.BITSHUFFLE), Zstd(1)]
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            exist_ok=False,
+            license="license",
+            cite=[Citation(doi="doi", text="text", url="url")],
+            logger=logging,
+            chunks=(1, 32, 32),
+            n_levels=2,
+            compressor=compressors,
+        )
+        data = np.random.randint(0, 255, size=(1, 64, 64), dtype=np.uint8)
+        vol.write_section(1, data, (0, 0, 0))
+        assert vol.get_zarr_volume()["0"].compressor == compressors[0]
+        assert vol.get_zarr_volume()["1"].compressor == compressors[1]
+        assert_array_equal(vol.get_section_data(1), data)
+
+        vol.save()
+        vol_load = Volume.load(join(self.tmp_dir, "test-volume", "volume.yaml"))
+        assert vol_load.get_compressor(0) == compressors[0]
+        assert vol_load.get_compressor(1) == compressors[1]
+
+        with self.assertRaises(AssertionError):
+            Volume(
+                name="test-volume-2",
+                description="description",
+                documentation="documentation",
+                authors=[],
+                root_dir=self.tmp_dir,
+                n_levels=3,
+                compressor=compressors,
             )
@@ -0,0 +1,118 @@
+import logging
+import shutil
+import tempfile
+from os.path import exists, join
+from unittest import TestCase
+
+import numpy as np
+import zarr
+from numpy.testing import assert_array_equal
+
+from sbem.record.Author import Author
+from sbem.record.Section import Section
+from sbem.record.Tile import Tile
+from sbem.storage.Volume import Volume
+from sbem.storage.volume_utils import (
+    chunk_blocks,
+    chunk_statistics,
+    plan_volume_extent,
+    rechunk_array,
+    suggest_chunks,
+    write_chunks,
+)
+
+
+class VolumeUtilsTest(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_plan_and_preallocate(self):
+        sec_0 = Section(None, "s0", False, False, "run_0", 10, 1, 25, 100, 200, 10)
+        Tile(sec_0, 0, "/fake.tif", 1000, 500, 11.0)
+        Tile(sec_0, 1, "/fake.tif", 1190, 500, 11.0)
+        sec_1 = Section(None, "s1", False, False, "run_0", 11, 1, 25, 100, 200, 10)
+        Tile(sec_1, 0, "/fake.tif", 900, 590, 11.0)
+
+        plan = plan_volume_extent([sec_0, sec_1], margin_px=(5, 10))
+        assert plan["shape"] == (2, 190 + 10, 490 + 20)
+        assert plan["origin"] == (0, 5, 10)
+        assert plan["offsets"] == {10: (0, 0, 100), 11: (1, 90, 0)}
+
+        vol = Volume(
+            name="test-volume",
+            description="description",
+            documentation="documentation",
+            authors=[Author(name="author 1", affiliation="aff 1")],
+            root_dir=self.tmp_dir,
+            logger=logging,
+        )
+        vol.preallocate(plan["shape"], plan["origin"])
+        assert vol.get_zarr_volume()["0"].shape == plan["shape"]
+        assert vol.get_section_list() == [None, None]
+
+        data_1 = np.random.randint(0, 255, size=(1, 100, 200), dtype=np.uint8)
+        vol.write_section(11, data_1, plan["offsets"][11])
+        data_0 = np.random.randint(0, 255, size=(1, 100, 390), dtype=np.uint8)
+        vol.write_section(10, data_0, plan["offsets"][10])
+
+        # Written in place without reshapes
+        assert vol.get_zarr_volume()["0"].shape == plan["shape"]
+        assert vol.get_section_list() == [10, 11]
+        assert_array_equal(vol.get_origin(), np.array([0, 5, 10]))
+        assert_array_equal(vol.get_section_data(10), data_0)
+        assert_array_equal(vol.get_section_data(11), data_1)
+        assert_array_equal(vol.get_zarr_volume()["0"][1, 95:195, 10:210], data_1[0])
+        assert exists(
+            join(self.tmp_dir, "test-volume", "ngff_volume.zarr", "0", "1", "0", "0")
+        )
+
+    def test_write_chunks(self):
+        blocks = list(chunk_blocks((slice(0, 1), slice(3, 12)), (1, 5)))
+        assert blocks == [
+            (slice(0, 1), slice(3, 5)),
+            (slice(0, 1), slice(5, 10)),
+            (slice(0, 1), slice(10, 12)),
+        ]
+
+        array = zarr.zeros((2, 30, 40), chunks=(1, 7, 9), dtype=np.uint16)
+        data = np.random.randint(0, 255, size=(2, 20, 25), dtype=np.uint16)
+        write_chunks(array, (slice(0, 2), slice(3, 23), slice(4, 29)), data, 4)
+        assert_array_equal(array[:, 3:23, 4:29], data)
+        assert array[:, :3].sum() == 0
+        assert array[:, :, 29:].sum() == 0
+
+    def test_rechunk_array(self):
+        assert suggest_chunks((3000, 10000), np.uint8) == (1, 2880, 2880)
+        assert suggest_chunks((3000, 10000), np.uint8, "isotropic") == (
+            128,
+            128,
+            128,
+        )
+
+        src = zarr.zeros((9, 50, 70), chunks=(1, 50, 70), dtype=np.uint16)
+        src[:] = np.random.randint(0, 255, size=src.shape)
+        dst = zarr.zeros((9, 50, 70), chunks=(4, 16, 16), dtype=np.uint16)
+        rechunk_array(src, dst, max_memory=4 * 16 * 80 * 2 * 2, n_workers=2)
+        assert_array_equal(dst[:], src[:])
+
+    def test_chunk_statistics(self):
+        data = np.random.randint(0, 256, size=(1, 50, 70), dtype=np.uint8)
+        stats = chunk_statistics(data, (10, 40), (32, 32), n_bins=8, n_workers=2)
+        assert_array_equal(stats["chunk_start"], [0, 1])
+        assert stats["mean"].shape == (2, 3)
+
+        # The section in chunk-aligned storage filled with zeros.
+        storage = np.zeros((1, 64, 128), dtype=np.uint8)
+        storage[:, 10:60, 40:110] = data
+        chunk = storage[:, 32:64, 64:96]
+        assert stats["min"][1, 1] == 0
+        assert stats["max"][1, 1] == chunk.max()
+        assert stats["mean"][1, 1] == chunk.mean()
+        assert stats["nonzero"][1, 1] == np.count_nonzero(chunk) / chunk.size
+        assert_array_equal(
+            stats["histogram"][1, 1],
+            np.histogram(chunk[chunk != 0], bins=8, range=(0, 256))[0],
+        )